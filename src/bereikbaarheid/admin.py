@@ -1,5 +1,3 @@
-import json
-
 from django.contrib import admin
 from django.core.exceptions import PermissionDenied
 from django.template.response import TemplateResponse
@@ -23,6 +21,7 @@ from bereikbaarheid.models import (
     Vma,
 )
 from bereikbaarheid.resources.gebied_resource import GebiedResource
+from bereikbaarheid.resources.geojson_stream import iter_features
 from bereikbaarheid.resources.lastbeperking_resource import LastbeperkingResource
 from bereikbaarheid.resources.utils import GEOJSON, SCSV
 from bereikbaarheid.resources.venstertijdweg_resource import VenstertijdWegResource
@@ -30,6 +29,7 @@ from bereikbaarheid.resources.verkeersbord_resource import VerkeersBordResource
 from bereikbaarheid.resources.verkeerspaal_resource import VerkeersPaalResource
 from bereikbaarheid.resources.verkeerstelling_resource import VerkeersTellingResource
 from bereikbaarheid.resources.verrijking_resource import VerrijkingResource
+from bereikbaarheid.resources.vma_loader import load_vma
 from bereikbaarheid.resources.vma_resource import VmaResource
 
 from .validation import days_of_the_week_abbreviated
@@ -239,7 +239,8 @@ class VmaAdmin(ImportMixin, LeafletGeoAdminMixin, admin.ModelAdmin):
         """
         This method is overwritten to battle the exponential growth of loading time when
         chuck loading a large GEOJSON-file. To keep the same behavior we had to import the whole
-        method to not conflict with any other paths
+        method to not conflict with any other paths. A GEOJSON-file is not loaded
+        through the resource but copied into the database, see resources.vma_loader
 
         Perform a dry_run of the import to make sure the import will not
         result in errors.  If there are no errors, 'process_import' for the actual import.
@@ -258,33 +259,6 @@ class VmaAdmin(ImportMixin, LeafletGeoAdminMixin, admin.ModelAdmin):
                 input_format.encoding = self.from_encoding
             import_file = import_form.cleaned_data["import_file"]
 
-            def _read_data(import_file) -> dict:
-                """
-                This part is overwritten because the original chunking of the file would
-                have an exponential growth on loading time depending on the files size.
-                It got changed to read it for each row and create our own geojson dataset.
-                Which is then transformed in the custom dataframe loader(see: utils.GEOJSON)
-                to transform it to a dataframe to be used by the import-export module
-                """
-                data = {
-                    "type": "FeatureCollection",
-                    "name": "NAME_PLACEHOLDER",
-                    "crs": {
-                        "type": "name",
-                        "properties": {"name": "urn:ogc:def:crs:EPSG::28992"},
-                    },
-                    "features": [],
-                }
-                for line in import_file:
-                    s_line = (
-                        line.decode("utf-8").replace(",\n", "").replace("\n", "")
-                    )  # remove ,\n and decode to string
-                    if '"type": "Feature"' not in s_line:
-                        continue
-                    data["features"].append(json.loads(s_line))
-
-                return data
-
             # This setting means we are going to skip the import confirmation step.
             if True:
                 # Go ahead and process the file for import in a transaction
@@ -294,30 +268,35 @@ class VmaAdmin(ImportMixin, LeafletGeoAdminMixin, admin.ModelAdmin):
                 # silently skipped.
 
                 if input_format.get_title() == "geojson":
-                    data = _read_data(import_file)
+                    # the features are streamed into the database with COPY, see resources.vma_loader
+                    result = load_vma(iter_features(import_file))
+                    if not result.has_errors():
+                        return self.process_result(result, request)
+                    context["result"] = result
+
                 else:  # read other formats
                     data = bytes()
                     for chunk in import_file.chunks():
                         data += chunk
 
-                try:
-                    dataset = input_format.create_dataset(data)
-                except Exception as e:
-                    self.add_data_read_fail_error_to_form(import_form, e)
-                if not import_form.errors:
-                    result = self.process_dataset(
-                        dataset,
-                        import_form,
-                        request,
-                        *args,
-                        raise_errors=False,
-                        rollback_on_validation_errors=True,
-                        **kwargs,
-                    )
-                    if not result.has_errors() and not result.has_validation_errors():
-                        return self.process_result(result, request)
-                    else:
-                        context["result"] = result
+                    try:
+                        dataset = input_format.create_dataset(data)
+                    except Exception as e:
+                        self.add_data_read_fail_error_to_form(import_form, e)
+                    if not import_form.errors:
+                        result = self.process_dataset(
+                            dataset,
+                            import_form,
+                            request,
+                            *args,
+                            raise_errors=False,
+                            rollback_on_validation_errors=True,
+                            **kwargs,
+                        )
+                        if not result.has_errors() and not result.has_validation_errors():
+                            return self.process_result(result, request)
+                        else:
+                            context["result"] = result
 
         else:
             res_kwargs = self.get_import_resource_kwargs(request, form=import_form, **kwargs)
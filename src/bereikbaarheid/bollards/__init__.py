@@ -1,5 +1,7 @@
 from .bollards import get_bollards
+from .snapshot import snapshot_response
 
 __all__ = [
     "get_bollards",
+    "snapshot_response",
 ]
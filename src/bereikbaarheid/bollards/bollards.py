@@ -1,5 +1,7 @@
 from django.db import connection
 
+from bereikbaarheid.routing import bollard_route, nearest_bollard_target, use_memory_engine, use_memory_snapping
+from bereikbaarheid.routing.snapping import raw_query_nearest_bollard_target
 from bereikbaarheid.utils import django_query_db
 
 # The query calculates a route to the provided lat/lon and returns
@@ -25,6 +27,8 @@ from bereikbaarheid.utils import django_query_db
 #     with bollard(s) if all other options are exhausted.
 # - The provided lat/lon is used to search for the closest target node
 # - The closest target node is used for calculating routes
+# - With the memory routing engine the same costs are used, the route is a walk back
+#     through the shortest path tree of the time window (bereikbaarheid.routing.bollards)
 
 # :param day_of_the_week: e.g "di"
 # :type day_of_the_week: string or None
@@ -39,30 +43,40 @@ from bereikbaarheid.utils import django_query_db
 # :return: object - bollards encountered while routing to a lat/lon
 #             on a given day, start and end time.
 
-raw_query = """
+# the features of the bollards in the "bollards" CTE
+# the "or parameter_name is null" makes sure the bollards are
+# returned when the optional parameters are not present
+raw_query_features = """
+        select json_build_object(
+            'geometry', ST_AsGeoJson( ST_Transform(bollards.geometry, 4326))::json,
+            'properties', json_build_object(
+                'id', bollards.paal_nr,
+                'type', bollards.type,
+                'location', bollards.standplaats,
+                'days', bollards.dagen,
+                'start_time', bollards.begin_tijd,
+                'end_time', bollards.eind_tijd,
+                'entry_system', bollards.toegangssysteem
+            ),
+            'type', 'Feature'
+        )
+        from bollards
+
+        where (
+                %(day_of_the_week)s <> ANY(bollards.dagen)
+                or %(day_of_the_week)s is null
+            )
+            and (%(time_from)s <= bollards.begin_tijd or %(time_from)s is null)
+            and (%(time_to)s <= bollards.eind_tijd or %(time_to)s is null)
+"""
+
+raw_query = f"""
         with bollards as (
             select pp.*
             from pgr_dijkstra(
                 %(pgr_dijkstra_cost_query)s,
                 902205,
-                (
-                    select target
-                    from bereikbaarheid_out_vma_directed a
-                    where cost > 0 or car_network is false
-                    order by st_length(
-                        st_transform(
-                            st_shortestline(
-                                st_setsrid(
-                                    ST_MakePoint(%(lon)s, %(lat)s),
-                                    4326
-                                ),
-                                st_linemerge(a.geom4326)
-                            ),
-                            28992
-                        )
-                    ) asc
-                    limit 1
-                )
+                ({{nearest_target}})
             ) as routing
 
             left join bereikbaarheid_out_vma_directed g
@@ -82,30 +96,19 @@ raw_query = """
 
             order by seq
         )
+        {raw_query_features}
+    """
 
-        select json_build_object(
-            'geometry', ST_AsGeoJson( ST_Transform(bollards.geometry, 4326))::json,
-            'properties', json_build_object(
-                'id', bollards.paal_nr,
-                'type', bollards.type,
-                'location', bollards.standplaats,
-                'days', bollards.dagen,
-                'start_time', bollards.begin_tijd,
-                'end_time', bollards.eind_tijd,
-                'entry_system', bollards.toegangssysteem
-            ),
-            'type', 'Feature'
+# the links of the route are calculated by the memory engine, see bereikbaarheid.routing.bollards
+raw_query_route = f"""
+        with bollards as (
+            select pp.*, route.seq
+            from unnest(%(link_nrs)s::integer[]) with ordinality as route(link_nr, seq)
+            join bereikbaarheid_verkeerspaal pp
+            on route.link_nr = pp.link_nr
         )
-        from bollards
-
-        -- the "or parameter_name is null" makes sure the bollards are
-        -- returned when the optional parameters are not present
-        where (
-                %(day_of_the_week)s <> ANY(bollards.dagen)
-                or %(day_of_the_week)s is null
-            )
-            and (%(time_from)s <= bollards.begin_tijd or %(time_from)s is null)
-            and (%(time_to)s <= bollards.eind_tijd or %(time_to)s is null)
+        {raw_query_features}
+        order by bollards.seq
     """
 
 raw_query_all = """
@@ -254,16 +257,33 @@ def get_bollards(data: dict):
     _time_from = data.get("time_from", None)
     _time_to = data.get("time_to", None)
 
-    results = django_query_db(
-        raw_query,
-        {
-            "pgr_dijkstra_cost_query": prepare_pgr_dijkstra_cost_query(_day_of_the_week, _time_from, _time_to),
-            "lat": _lat,
-            "lon": _lon,
-            "day_of_the_week": _day_of_the_week,
-            "time_from": _time_from,
-            "time_to": _time_to,
-        },
-    )
+    parameters = {
+        "lat": _lat,
+        "lon": _lon,
+        "day_of_the_week": _day_of_the_week,
+        "time_from": _time_from,
+        "time_to": _time_to,
+    }
+
+    nearest_target_query = raw_query_nearest_bollard_target
+    if use_memory_snapping():
+        nearest_target_query = "%(target_node)s"
+        parameters["target_node"] = nearest_bollard_target(float(_lat), float(_lon))
+
+    if use_memory_engine():
+        if use_memory_snapping():
+            target_node = parameters["target_node"]
+        else:
+            result = django_query_db(raw_query_nearest_bollard_target, parameters, single=True)
+            target_node = result[0] if result else None
+
+        parameters["link_nrs"] = (
+            bollard_route(target_node, _day_of_the_week, _time_from, _time_to) if target_node is not None else []
+        )
+        results = django_query_db(raw_query_route, parameters)
+        return _transform_results(results)
+
+    parameters["pgr_dijkstra_cost_query"] = prepare_pgr_dijkstra_cost_query(_day_of_the_week, _time_from, _time_to)
+    results = django_query_db(raw_query.format(nearest_target=nearest_target_query), parameters)
 
     return _transform_results(results)
@@ -0,0 +1,144 @@
+import gzip
+import threading
+from dataclasses import dataclass
+
+import brotli
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from bereikbaarheid.geojson_writer import encode_feature_collection
+from bereikbaarheid.versioning import current_network_version
+
+from .bollards import get_bollards
+
+# the compressed variants, the smallest first
+ENCODINGS = ("br", "gzip")
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    The encoded FeatureCollection of all bollards and its brotli and gzip variants
+    """
+
+    version: int | None
+    content: bytes
+    br_content: bytes
+    gzip_content: bytes
+
+    def encoded(self, encoding: str | None) -> bytes:
+        """
+        :param encoding: "br", "gzip" or None for the identity variant
+        :return:
+        """
+        return {"br": self.br_content, "gzip": self.gzip_content}.get(encoding, self.content)
+
+    def etag(self, encoding: str | None) -> str | None:
+        """
+        Strong ETag, the variants differ because their bytes differ
+        The identity variant matches the ETag of network_condition
+        :param encoding: "br", "gzip" or None for the identity variant
+        """
+        if self.version is None:
+            return None
+        return f'"network-{self.version}-{encoding}"' if encoding else f'"network-{self.version}"'
+
+
+def _build_snapshot(version: int | None) -> Snapshot:
+    content = encode_feature_collection(get_bollards(None))
+    # built once per network version, so the slowest and smallest compression
+    return Snapshot(
+        version=version,
+        content=content,
+        br_content=brotli.compress(content, quality=11),
+        gzip_content=gzip.compress(content, compresslevel=9),
+    )
+
+
+def _accepted_encodings(accept_encoding: str) -> dict[str, float]:
+    """
+    The codings of the Accept-Encoding header with their q-value
+    :param accept_encoding: value of the Accept-Encoding header, e.g. "br;q=0, gzip"
+    :return:
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def _content_encoding(accept_encoding: str) -> str | None:
+    """
+    The variant with the highest q-value the client accepts, the smallest one when they are equal
+    A coding with q=0 is not accepted, * stands for the codings that are not listed
+    :param accept_encoding: value of the Accept-Encoding header
+    :return: "br", "gzip" or None for the identity variant
+    """
+    qualities = _accepted_encodings(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+
+    encoding = max(ENCODINGS, key=lambda coding: qualities.get(coding, wildcard))
+    quality = qualities.get(encoding, wildcard)
+    if quality <= 0 or quality < qualities.get("identity", 0.0):
+        return None
+    return encoding
+
+
+def get_snapshot() -> Snapshot:
+    """
+    The snapshot of the current network version, built once per version per worker
+    :return:
+    """
+    global _snapshot
+
+    version = current_network_version()
+    version = version.versie if version else None
+
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _build_snapshot(version)
+        return _snapshot
+
+
+def snapshot_response(request: HttpRequest) -> HttpResponse:
+    """
+    All bollards, compressed with brotli or gzip when the client accepts it
+    :param request:
+    :return:
+    """
+    snapshot = get_snapshot()
+    encoding = _content_encoding(request.headers.get("Accept-Encoding", ""))
+    etag = snapshot.etag(encoding)
+
+    if etag and etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(
+            snapshot.encoded(encoding),
+            status=200,
+            content_type="application/json",
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+
+    if etag:
+        response.headers["ETag"] = etag
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
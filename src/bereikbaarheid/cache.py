@@ -0,0 +1,215 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+
+from bereikbaarheid.versioning import current_network_version
+
+# every ResponseCache, cleared together when the network changes
+_caches = []
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of encoded responses, entries expire after ttl seconds
+
+    The key holds the generation of the cache and the network version. clear() starts
+    a new generation so a response that was being computed during a refresh in this
+    worker is never served afterwards, the network version catches refreshes in
+    other processes.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        :param maxsize: maximum number of responses, the least recently used is evicted first
+        :param ttl: seconds a response is valid
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    def make_key(self, data: dict) -> str:
+        """
+        Canonical key of the serialized request data
+        :param data: serialized data
+        :return:
+        """
+        version = current_network_version()
+        return json.dumps(
+            [self.generation, version.versie if version else None, data],
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires, content = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return content
+
+    def set(self, key: str, content: bytes) -> None:
+        with self._lock:
+            if not key.startswith(f"[{self.generation},"):
+                # computed before the last clear()
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl, content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SourceTreeCache:
+    """
+    In-process LRU cache of shortest path trees: the aggregated cost to every reached node from a source node
+
+    A tree is stored as bytes: the number of nodes (int32), the nodes (int32) and the costs (float32).
+    With a persistent cache (an alias of CACHES) the trees are shared between the workers and kept
+    after a restart, the key of the persistent cache holds the network version so a changed network
+    is never served from it.
+    """
+
+    def __init__(self, maxsize: int, persistent: str = "", timeout: float = None):
+        """
+        :param maxsize: maximum number of trees in memory, the least recently used is evicted first
+        :param persistent: alias of the persistent cache, only the memory is used when empty
+        :param timeout: seconds a tree is kept in the persistent cache
+        """
+        self.maxsize = maxsize
+        self.persistent = persistent
+        self.timeout = timeout
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    def make_key(self, source: int, max_cost: float | None) -> tuple:
+        """
+        :param source: node of the network
+        :param max_cost: bound of the search, None for the complete tree
+        :return:
+        """
+        version = current_network_version()
+        return self.generation, version.versie if version else None, source, max_cost
+
+    @staticmethod
+    def _persistent_key(key: tuple) -> str | None:
+        generation, version, source, max_cost = key
+        if version is None:
+            return None
+        return f"source-tree:{version}:{source}:{max_cost}"
+
+    @staticmethod
+    def encode(nodes, costs) -> bytes:
+        nodes = np.asarray(nodes, dtype=np.int32)
+        costs = np.asarray(costs, dtype=np.float32)
+        return np.int32(len(nodes)).tobytes() + nodes.tobytes() + costs.tobytes()
+
+    @staticmethod
+    def decode(content: bytes) -> tuple[np.ndarray, np.ndarray]:
+        size = int(np.frombuffer(content, dtype=np.int32, count=1)[0])
+        nodes = np.frombuffer(content, dtype=np.int32, count=size, offset=4)
+        costs = np.frombuffer(content, dtype=np.float32, count=size, offset=4 + 4 * size)
+        return nodes, costs
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, key: tuple) -> tuple[np.ndarray, np.ndarray] | None:
+        """
+        :param key: of make_key
+        :return: the nodes and their aggregated costs, None when the tree is not cached
+        """
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                return self.decode(content)
+
+        persistent_key = self._persistent_key(key)
+        if not self.persistent or persistent_key is None:
+            return None
+
+        content = caches[self.persistent].get(persistent_key)
+        if content is None:
+            return None
+
+        self._remember(key, content)
+        return self.decode(content)
+
+    def set(self, key: tuple, nodes, costs) -> tuple[np.ndarray, np.ndarray]:
+        """
+        :param key: of make_key
+        :param nodes:
+        :param costs: aggregated cost of each node
+        :return: the tree as it is stored, a computed tree gives the same response as a cached one
+        """
+        content = self.encode(nodes, costs)
+        if self._remember(key, content):
+            persistent_key = self._persistent_key(key)
+            if self.persistent and persistent_key is not None:
+                caches[self.persistent].set(persistent_key, content, self.timeout)
+
+        return self.decode(content)
+
+    def _remember(self, key: tuple, content: bytes) -> bool:
+        with self._lock:
+            if key[0] != self.generation:
+                # computed before the last clear()
+                return False
+
+            self._entries[key] = content
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def clear_response_caches() -> None:
+    """
+    Clear every response (and source tree) cache, called after the network has changed
+    """
+    for cache in _caches:
+        cache.clear()
+
+
+prohibitory_cache = ResponseCache(settings.PROHIBITORY_CACHE_SIZE, settings.PROHIBITORY_CACHE_TTL)
+tile_cache = ResponseCache(settings.TILE_CACHE_SIZE, settings.TILE_CACHE_TTL)
+# the reachable nodes (int32 bytes) per vehicle, shared by the tiles of a map view
+reachable_nodes_cache = ResponseCache(settings.REACHABLE_NODES_CACHE_SIZE, settings.TILE_CACHE_TTL)
+source_tree_cache = SourceTreeCache(
+    settings.SOURCE_TREE_CACHE_SIZE, settings.SOURCE_TREE_CACHE_ALIAS, settings.SOURCE_TREE_CACHE_TTL
+)
@@ -0,0 +1,65 @@
+import itertools
+import json
+from functools import partial
+from typing import Iterable, Iterator
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+_dumps = partial(json.dumps, cls=DjangoJSONEncoder, separators=(",", ":"))
+
+
+class RawJSON(str):
+    """
+    JSON text, e.g. the result of ST_AsGeoJSON, that is written to the output as is
+    instead of being decoded and encoded again
+    """
+
+
+def encode_feature(feature: dict | RawJSON) -> str:
+    """
+    Encode a feature, its RawJSON values (e.g. the geometry) are spliced into the output
+    :param feature:
+    :return:
+    """
+    if isinstance(feature, RawJSON):
+        return feature
+
+    raw = {key: value for key, value in feature.items() if isinstance(value, RawJSON)}
+    if not raw:
+        return _dumps(feature)
+
+    encoded = _dumps({key: value for key, value in feature.items() if key not in raw})
+    fragments = ",".join(f"{_dumps(key)}:{value}" for key, value in raw.items())
+    return f"{encoded[:-1]}{',' if len(encoded) > 2 else ''}{fragments}}}"
+
+
+def encode_feature_collection(features) -> bytes:
+    """
+    Encode the features as a FeatureCollection in one pass
+    :param features: list of features, any other value is encoded as is
+    :return:
+    """
+    if isinstance(features, (list, tuple)):
+        encoded = f"[{','.join(map(encode_feature, features))}]"
+    else:
+        encoded = _dumps(features)
+
+    return f'{{"features":{encoded},"type":"FeatureCollection"}}'.encode()
+
+
+def iter_feature_collection(features: Iterable[dict], batch_size: int = 500) -> Iterator[bytes]:
+    """
+    Encode the features as a FeatureCollection incrementally, for a StreamingHttpResponse
+    :param features: iterable of features
+    :param batch_size: number of features encoded per chunk
+    :return: chunks of the FeatureCollection
+    """
+    yield b'{"features":['
+
+    features = iter(features)
+    separator = ""
+    while batch := list(itertools.islice(features, batch_size)):
+        yield f"{separator}{','.join(map(encode_feature, batch))}".encode()
+        separator = ","
+
+    yield b'],"type":"FeatureCollection"}'
@@ -1,5 +1,7 @@
-from .isochrones import get_isochrones
+from .isochrones import get_isochrone_bands, get_isochrones, iter_isochrones
 
 __all__ = [
+    "get_isochrone_bands",
     "get_isochrones",
+    "iter_isochrones",
 ]
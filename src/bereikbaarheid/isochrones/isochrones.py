@@ -1,38 +1,50 @@
-from bereikbaarheid.utils import django_query_db
+from typing import Iterator
 
-raw_query = """
-select
-    abs(sub.id) as id,
-    min(totalcost)::int as totalcost,
-    geom::json as geometry
-from (
-    select id,
-    (0.5 * cost+source.agg_cost) * 3600 as totalcost
-    from bereikbaarheid_out_vma_directed bebording
+from bereikbaarheid.cache import source_tree_cache
+from bereikbaarheid.routing import aggregated_costs, nearest_node, use_memory_engine, use_memory_snapping
+from bereikbaarheid.routing.snapping import raw_query_nearest_node
+from bereikbaarheid.utils import django_query_db, django_query_db_iter
 
-    left join (
+routing_query_pgrouting = """
         SELECT end_vid, agg_cost
         FROM pgr_dijkstraCost('
             select id, source ,target, cost
             from bereikbaarheid_out_vma_directed',
-            (
-                select x.node
-                from (
-                    select node, geom
-                    from bereikbaarheid_out_vma_node
-                ) as x
-                order by st_distance(
-                    x.geom,
-                    st_setsrid(ST_MakePoint(%(lon)s, %(lat)s), 4326)
-                ) asc
-                limit 1
-            ),
+            ({nearest_node}),
             array(
                 select node
                 from bereikbaarheid_out_vma_node
             )
         )
-    ) as source
+"""
+
+# only the nodes within max_cost (hours) are searched and returned, including the start node
+routing_query_driving_distance = """
+        SELECT node as end_vid, agg_cost
+        FROM pgr_drivingDistance('
+            select id, source ,target, cost
+            from bereikbaarheid_out_vma_directed',
+            ({nearest_node}),
+            %(max_cost)s
+        )
+"""
+
+routing_query_costs = """
+        select end_vid, agg_cost
+        from unnest(%(nodes)s::integer[], %(agg_costs)s::double precision[]) as costs(end_vid, agg_cost)
+"""
+
+raw_query = """
+select
+    abs(sub.id) as id,
+    min(totalcost)::int as totalcost,
+    {geometry} as geometry
+from (
+    select id,
+    (0.5 * cost+source.agg_cost) * 3600 as totalcost
+    from bereikbaarheid_out_vma_directed bebording
+
+    {source_join} ({routing_query}) as source
     on source.end_vid =  bebording.source
     where cost > 0
 ) as sub
@@ -48,6 +60,38 @@ group by a.geom, abs(sub.id)
 
 """
 
+# one concave hull per band of the links reached within the minutes of the band
+# (totalcost is in seconds), the bands of the longer times contain the shorter ones
+raw_query_bands = """
+select
+    band as minutes,
+    ST_ConcaveHull(ST_Collect(isochrones.geometry), {concavity})::json as geometry
+from unnest(%(bands)s::integer[]) as band
+join ({isochrones_query}) as isochrones
+    on isochrones.totalcost <= band * 60
+group by band
+order by band
+"""
+
+# fraction of the convex hull, between 0 (the most concave) and 1 (the convex hull)
+BAND_CONCAVITY = 0.2
+
+
+def _transform_row(row: tuple) -> dict:
+    """
+    Transform a row to the expected GeoJson feature
+    :param row:
+    :return:
+    """
+    return {
+        "properties": {
+            "id": row[0],
+            "totalcost": row[1],
+        },
+        "geometry": row[2],
+        "type": "Feature",
+    }
+
 
 def _transform_results(results: list) -> list[dict]:
     """
@@ -55,17 +99,100 @@ def _transform_results(results: list) -> list[dict]:
     :param results:
     :return:
     """
-    return [
-        {
-            "properties": {
-                "id": row[0],
-                "totalcost": row[1],
-            },
-            "geometry": row[2],
-            "type": "Feature",
-        }
-        for row in results
-    ]
+    return [_transform_row(row) for row in results]
+
+
+def _transform_band_row(row: tuple) -> dict:
+    """
+    Transform a row of raw_query_bands to a GeoJson feature
+    :param row:
+    :return:
+    """
+    return {
+        "properties": {
+            "minutes": row[0],
+        },
+        "geometry": row[1],
+        "type": "Feature",
+    }
+
+
+def _source_tree(start_node: int | None, routing_query_template: str, max_cost: float | None) -> tuple[list, list]:
+    """
+    The nodes reached from the start node and their aggregated costs, from source_tree_cache when
+    an earlier request snapped to the same node
+    :param start_node:
+    :param routing_query_template: of pgRouting, used when the memory engine is not in use
+    :param max_cost: bound of the search in hours, None for the complete tree
+    :return:
+    """
+    if start_node is None:
+        return [], []
+
+    def compute() -> tuple[list, list]:
+        if use_memory_engine():
+            return aggregated_costs(start_node, max_cost=max_cost)
+        results = django_query_db(
+            routing_query_template.format(nearest_node="%(start_node)s"),
+            {"start_node": start_node, "max_cost": max_cost},
+        )
+        return [row[0] for row in results], [row[1] for row in results]
+
+    if not source_tree_cache.enabled:
+        return compute()
+
+    key = source_tree_cache.make_key(start_node, max_cost)
+    tree = source_tree_cache.get(key)
+    if tree is None:
+        tree = source_tree_cache.set(key, *compute())
+
+    nodes, costs = tree
+    return nodes.tolist(), costs.tolist()
+
+
+def _prepare_query(data: dict, geometry: str = "geom::json") -> tuple[str, dict]:
+    """
+    The query and its parameters for the routing and snapping engines in use
+    With max_minutes the search is bounded and only the links reached within it are returned.
+    With the memory engine or source_tree_cache the costs of the nodes are passed as arrays,
+    the query then only joins them with the links
+    :param data:
+    :param geometry: expression of the returned geometry of the links
+    :return:
+    """
+    routing_query_template = routing_query_pgrouting
+    parameters = {**data}
+    max_cost = None
+
+    if data.get("max_minutes"):
+        routing_query_template = routing_query_driving_distance
+        # the costs are in hours
+        max_cost = parameters["max_cost"] = data["max_minutes"] / 60
+
+    routing_query = routing_query_template.format(nearest_node=raw_query_nearest_node)
+
+    if use_memory_snapping():
+        routing_query = routing_query_template.format(nearest_node="%(start_node)s")
+        parameters["start_node"] = nearest_node(data["lat"], data["lon"])
+
+    if use_memory_engine() or source_tree_cache.enabled:
+        if use_memory_snapping():
+            start_node = parameters["start_node"]
+        else:
+            result = django_query_db(raw_query_nearest_node, data, single=True)
+            start_node = result[0] if result else None
+
+        routing_query = routing_query_costs
+        parameters["nodes"], parameters["agg_costs"] = _source_tree(start_node, routing_query_template, max_cost)
+
+    return (
+        raw_query.format(
+            routing_query=routing_query,
+            geometry=geometry,
+            source_join="left join" if max_cost is None else "join",
+        ),
+        parameters,
+    )
 
 
 def get_isochrones(data: dict) -> list[dict]:
@@ -74,7 +201,31 @@ def get_isochrones(data: dict) -> list[dict]:
     :param data:
     :return:
     """
-
-    results = django_query_db(raw_query, {**data})
+    results = django_query_db(*_prepare_query(data))
 
     return _transform_results(results)
+
+
+def iter_isochrones(data: dict) -> Iterator[dict]:
+    """
+    Like get_isochrones, the rows are fetched from a server-side cursor while iterating
+    :param data:
+    :return:
+    """
+    return map(_transform_row, django_query_db_iter(*_prepare_query(data)))
+
+
+def get_isochrone_bands(data: dict) -> list[dict]:
+    """
+    The isochrones as one polygon per band instead of the links
+    :param data: with the bands in minutes
+    :return:
+    """
+    # the links beyond the largest band are not part of any band
+    data = {**data, "max_minutes": max(data["bands"])}
+    isochrones_query, parameters = _prepare_query(data, geometry="geom")
+    results = django_query_db(
+        raw_query_bands.format(isochrones_query=isochrones_query, concavity=BAND_CONCAVITY),
+        parameters,
+    )
+    return [_transform_band_row(row) for row in results]
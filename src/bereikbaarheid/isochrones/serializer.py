@@ -1,7 +1,33 @@
-from marshmallow import Schema, fields, validate
+from marshmallow import Schema, ValidationError, fields, validate
 
 from bereikbaarheid.validation import bbox_adam
 
+MAX_BANDS = 10
+# the longest travel time of the bands and max_minutes
+MAX_MINUTES = 120
+
+
+class Bands(fields.Field):
+    """
+    Time bands in minutes as "5,10,15" (GET) or a list of the minutes (POST)
+    """
+
+    def _deserialize(self, value, attr, data, **kwargs) -> list[int]:
+        if isinstance(value, str):
+            value = value.split(",")
+
+        try:
+            bands = sorted({int(band) for band in value})
+        except (TypeError, ValueError) as e:
+            raise ValidationError("Moet een lijst van minuten zijn, bijvoorbeeld 5,10,15") from e
+
+        if not bands or len(bands) > MAX_BANDS:
+            raise ValidationError(f"Moet 1 tot {MAX_BANDS} banden bevatten")
+        if bands[0] < 1 or bands[-1] > MAX_MINUTES:
+            raise ValidationError(f"Moet tussen 1 en {MAX_MINUTES} minuten liggen")
+
+        return bands
+
 
 class IsochronesSerializer(Schema):
     lat = fields.Float(
@@ -13,3 +39,12 @@ class IsochronesSerializer(Schema):
         required=True,
         validate=[validate.Range(min=bbox_adam["lon"]["min"], max=bbox_adam["lon"]["max"])],
     )
+
+    bands = Bands(load_default=None)
+
+    # bounded search, only the links reached within the minutes are returned
+    max_minutes = fields.Integer(
+        load_default=None,
+        data_key="maxMinutes",
+        validate=[validate.Range(min=1, max=MAX_MINUTES)],
+    )
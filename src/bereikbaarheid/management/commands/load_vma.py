@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bereikbaarheid.resources.geojson_stream import iter_features
+from bereikbaarheid.resources.vma_loader import load_vma
+
+
+class Command(BaseCommand):
+    help = "Replace the VMA network (bereikbaarheid_vma) by a geojson file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="geojson file in RD (EPSG:28992)")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="validate the file without changing the network",
+        )
+
+    def handle(self, *args, **options):
+        with open(options["path"], "rb") as import_file:
+            result = load_vma(
+                iter_features(import_file),
+                dry_run=options["dry_run"],
+                progress=lambda count: self.stdout.write(f"{count} features copied"),
+            )
+
+        if result.has_errors():
+            raise CommandError("\n".join(str(error.error) for error in result.base_errors))
+
+        self.stdout.write(f"Loaded {result.total_rows} features{' (dry run)' if options['dry_run'] else ''}")
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bereikbaarheid.routing.engine import get_network
+from bereikbaarheid.routing.reachability import (
+    all_profiles,
+    count_profiles,
+    precompute_reachability,
+    refresh_reachability,
+)
+
+
+class Command(BaseCommand):
+    help = "Precompute the reachable nodes per vehicle profile (bereikbaarheid_bereikbareknopen)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="compute every combination of the restriction thresholds in the network",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=10000,
+            help="maximum number of profiles computed with --all",
+        )
+
+    def handle(self, *args, **options):
+        if not options["all"]:
+            refresh_reachability()
+            self.stdout.write("Recomputed the stored profiles")
+            return
+
+        edges = get_network().edges
+        count = count_profiles(edges)
+        if count > options["limit"]:
+            raise CommandError(f"{count} profiles exceed the limit of {options['limit']}")
+
+        stored = precompute_reachability(all_profiles(edges))
+        self.stdout.write(f"Stored {stored} profiles")
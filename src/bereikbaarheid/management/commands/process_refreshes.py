@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from bereikbaarheid.refresh import network_scheduler, reachability_scheduler
+
+
+class Command(BaseCommand):
+    help = "Run the refreshes that are still pending (bereikbaarheid_refreshopdracht)"
+
+    def handle(self, *args, **options):
+        # the network first, its refresh schedules the reachability
+        for scheduler in (network_scheduler, reachability_scheduler):
+            count = scheduler.resume()
+            scheduler.flush()
+            self.stdout.write(f"Refreshed {scheduler.name}, {count} pending request(s)")
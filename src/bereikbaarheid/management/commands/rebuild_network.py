@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from bereikbaarheid.resources.utils import refresh_network
+
+
+class Command(BaseCommand):
+    help = "Rebuild the directed network and refresh all materialized views of the road network"
+
+    def handle(self, *args, **options):
+        refreshed = refresh_network()
+        self.stdout.write(f"Refreshed {', '.join(refreshed)}")
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.7 on 2026-10-18 10:12
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bereikbaarheid", "0011_alter_venstertijdweg_e_type_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BereikbareKnopen",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("profiel", models.CharField(max_length=255, unique=True)),
+                (
+                    "knopen",
+                    django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=None),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Bereikbare knopen",
+                "verbose_name_plural": "Bereikbare knopen",
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bereikbaarheid", "0012_bereikbareknopen"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX IF NOT EXISTS bereikbaarheid_out_vma_undirected_geom_idx
+                    ON bereikbaarheid_out_vma_undirected USING gist (geom);
+                CREATE INDEX IF NOT EXISTS bereikbaarheid_out_vma_directed_geom_idx
+                    ON bereikbaarheid_out_vma_directed USING gist (geom);
+                CREATE INDEX IF NOT EXISTS bereikbaarheid_out_vma_directed_geom4326_idx
+                    ON bereikbaarheid_out_vma_directed USING gist (geom4326);
+                CREATE INDEX IF NOT EXISTS bereikbaarheid_out_vma_node_geom_idx
+                    ON bereikbaarheid_out_vma_node USING gist (geom);
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS bereikbaarheid_out_vma_undirected_geom_idx;
+                DROP INDEX IF EXISTS bereikbaarheid_out_vma_directed_geom_idx;
+                DROP INDEX IF EXISTS bereikbaarheid_out_vma_directed_geom4326_idx;
+                DROP INDEX IF EXISTS bereikbaarheid_out_vma_node_geom_idx;
+            """,
+        )
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.7 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bereikbaarheid", "0013_spatial_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NetwerkVersie",
+            fields=[
+                ("versie", models.BigAutoField(primary_key=True, serialize=False)),
+                ("aantal_rijen", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Netwerkversie",
+                "verbose_name_plural": "Netwerkversies",
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 6.0.7 on 2026-10-18 11:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bereikbaarheid", "0014_netwerkversie"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            CREATE MATERIALIZED VIEW bereikbaarheid_out_load_unload AS
+            WITH load_unload AS (
+                SELECT abs(bd.link_nr) AS linknr_abs,
+                    CASE
+                        WHEN x.azimuth < 45 THEN 'noord'
+                        WHEN x.azimuth < 45 + 90 THEN 'oost'
+                        WHEN x.azimuth < 45 + 180 THEN 'zuid'
+                        WHEN x.azimuth < 45 + 270 THEN 'west'
+                        WHEN x.azimuth > 45 + 270 THEN 'noord'
+                        ELSE 'geen'
+                    END AS richting,
+                    bd.link_nr,
+                    bd.dagen,
+                    bd.begin_tijd,
+                    bd.eind_tijd,
+                    vma.geom,
+                    vma.name,
+                    bord.rvv_modelnummer,
+                    bord.onderbord_tekst
+                FROM bereikbaarheid_venstertijdweg bd
+                LEFT JOIN bereikbaarheid_out_vma_undirected vma
+                    ON abs(bd.link_nr) = vma.link_nr
+                LEFT JOIN bereikbaarheid_verkeersbord bord
+                    ON bd.verkeersbord = bord.bord_id
+                -- direction of the road section, the link is reversed for negative link numbers
+                LEFT JOIN LATERAL (
+                    SELECT CASE
+                        WHEN bd.link_nr > 0 THEN degrees(
+                            st_azimuth(st_startpoint(st_linemerge(vma.geom)), st_endpoint(st_linemerge(vma.geom)))
+                        )
+                        WHEN bd.link_nr < 0 THEN degrees(
+                            st_azimuth(st_endpoint(st_linemerge(vma.geom)), st_startpoint(st_linemerge(vma.geom)))
+                        )
+                    END AS azimuth
+                ) x ON true
+            )
+            SELECT load_unload.linknr_abs AS id,
+                json_build_object(
+                    'geometry', st_asgeojson(st_transform(load_unload.geom, 4326))::json,
+                    'properties', json_build_object(
+                        'id', load_unload.linknr_abs,
+                        'street_name', load_unload.name,
+                        'load_unload', json_agg(json_build_object(
+                            'road_section_id', load_unload.link_nr,
+                            'direction', load_unload.richting,
+                            'additional_info', load_unload.rvv_modelnummer,
+                            'text', load_unload.onderbord_tekst,
+                            'days', load_unload.dagen,
+                            'start_time', load_unload.begin_tijd,
+                            'end_time', load_unload.eind_tijd
+                        ) ORDER BY load_unload.eind_tijd ASC)
+                    ),
+                    'type', 'Feature'
+                )::text AS feature
+            FROM load_unload
+            WHERE load_unload.geom IS NOT NULL
+            GROUP BY load_unload.geom, load_unload.linknr_abs, load_unload.name;
+
+            CREATE INDEX IF NOT EXISTS bereikbaarheid_out_load_unload_id_idx
+                ON bereikbaarheid_out_load_unload (id);
+            """,
+            reverse_sql="DROP MATERIALIZED VIEW IF EXISTS bereikbaarheid_out_load_unload;",
+        )
+    ]
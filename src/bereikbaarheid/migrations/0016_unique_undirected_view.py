@@ -0,0 +1,106 @@
+import importlib
+
+from django.db import migrations
+
+# the definitions of the views that select from the undirected view, they are recreated with it
+undirected_view = importlib.import_module("bereikbaarheid.migrations.0002_vma_undirected_view")
+directed_view = importlib.import_module("bereikbaarheid.migrations.0003_vma_directed_view")
+node_view = importlib.import_module("bereikbaarheid.migrations.0004_vma_node_view")
+spatial_indexes = importlib.import_module("bereikbaarheid.migrations.0013_spatial_indexes")
+load_unload_view = importlib.import_module("bereikbaarheid.migrations.0015_load_unload_view")
+
+# the select of 0002_vma_undirected_view, a link is selected once when it intersects several gebieden
+UNDIRECTED_SELECT = """
+        SELECT v.link_nr::integer AS link_nr,
+            v.name,
+            v.anode::integer AS source,
+            v.bnode::integer AS target,
+            v.geom,
+            v.wegtype_ab,
+            v.wegtype_ba,
+            st_length(v.geom) AS lengte,
+                CASE
+                    WHEN v.speedab IS NULL THEN '-1'::integer::double precision
+                    WHEN v.speedab = 0::double precision THEN '-1'::integer::double precision
+                    ELSE st_length(v.geom) / (v.speedab / (10000 / 3600)::double precision)
+                END AS cost,
+                CASE
+                    WHEN v.speedba IS NULL THEN '-1'::integer::double precision
+                    WHEN v.speedba = 0::double precision THEN '-1'::integer::double precision
+                    ELSE st_length(v.geom) / (v.speedba / (10000 / 3600)::double precision)
+                END AS reverse_cost,
+                CASE
+                    WHEN v.speedab IS NULL AND v.speedba IS NULL THEN false
+                    WHEN v.speedab = 0::double precision AND v.speedba = 0::double precision THEN false
+                    WHEN v.speedab IS NULL AND v.speedba = 0::double precision THEN false
+                    WHEN v.speedab = 0::double precision AND v.speedba IS NULL THEN false
+                    ELSE true
+                END AS car_network,
+            b.binnen_amsterdam,
+            b.binnen_polygoon_awb,
+            b.milieuzone,
+            b.zone_zwaar_verkeer_bus,
+            b.zone_zwaar_verkeer_non_bus,
+            b.zone_zwaar_verkeer_detail,
+            b.tunnelcategorie_gevaarlijke_stoffen,
+            b.tunnelnamen,
+            b.route_gevaarlijke_stoffen,
+            b.beleidsnet_auto,
+            b.beleidsnet_ov,
+            b.beleidsnet_fiets,
+            b.beleidsnet_lopen,
+            b.hoofdroute_taxi,
+            b.touringcar_aanbevolen_routes,
+            b.wettelijke_snelheid_actueel,
+            b.wettelijke_snelheid_wens,
+            b.wegcategorie_actueel,
+            b.wegcategorie_wens,
+            b.frc,
+            '4.50'::text AS vma_netwerk_versie
+           FROM bereikbaarheid_vma v
+             LEFT JOIN bereikbaarheid_verrijking b ON v.link_nr = b.link_nr::double precision
+          WHERE (EXISTS ( SELECT 1
+                   FROM bereikbaarheid_gebied p
+                  WHERE st_intersects(p.geom, v.geom) = true)) AND ((v.wegtypeab::text <> ALL (ARRAY['voedingslink'::character varying, 'BTM'::character varying, 'loop en fietsveer'::character varying, 'trein'::character varying, 'loopverbinding_halte'::character varying, 'tram'::character varying, 'loopverbinding_knoop'::character varying]::text[])) OR (v.wegtypeba::text <> ALL (ARRAY['voedingslink'::character varying, 'BTM'::character varying, 'loop en fietsveer'::character varying, 'trein'::character varying, 'loopverbinding_halte'::character varying, 'tram'::character varying, 'loopverbinding_knoop'::character varying]::text[])))
+"""
+
+DEPENDENT_VIEWS_DROP = """
+    DROP MATERIALIZED VIEW bereikbaarheid_out_vma_node;
+    DROP MATERIALIZED VIEW bereikbaarheid_out_vma_directed;
+    DROP MATERIALIZED VIEW bereikbaarheid_out_load_unload;
+    DROP MATERIALIZED VIEW bereikbaarheid_out_vma_undirected;
+"""
+
+DEPENDENT_VIEWS_CREATE = f"""
+    {directed_view.Migration.operations[0].sql}
+    {node_view.Migration.operations[0].sql}
+    {spatial_indexes.Migration.operations[0].sql}
+    {load_unload_view.Migration.operations[0].sql}
+"""
+
+
+class Migration(migrations.Migration):
+    """
+    bereikbaarheid_out_vma_undirected selected a link once per gebied it intersects,
+    it is recreated unique on link_nr before the unique indexes (0017_unique_view_indexes)
+    and the primary key of the directed table (0018_directed_network_table) are created.
+    """
+
+    dependencies = [
+        ("bereikbaarheid", "0015_load_unload_view"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=f"""
+                {DEPENDENT_VIEWS_DROP}
+                CREATE MATERIALIZED VIEW bereikbaarheid_out_vma_undirected AS {UNDIRECTED_SELECT};
+                {DEPENDENT_VIEWS_CREATE}
+            """,
+            reverse_sql=f"""
+                {DEPENDENT_VIEWS_DROP}
+                {undirected_view.Migration.operations[0].sql}
+                {DEPENDENT_VIEWS_CREATE}
+            """,
+        )
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Unique indexes make REFRESH MATERIALIZED VIEW CONCURRENTLY possible,
+    see refresh_materialized in resources/utils.py. The migration fails when a view is not unique,
+    the undirected view is unique since 0016_unique_undirected_view
+    """
+
+    dependencies = [
+        ("bereikbaarheid", "0016_unique_undirected_view"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE UNIQUE INDEX IF NOT EXISTS bereikbaarheid_out_vma_undirected_link_nr_uniq
+                    ON bereikbaarheid_out_vma_undirected (link_nr);
+                CREATE UNIQUE INDEX IF NOT EXISTS bereikbaarheid_out_vma_directed_id_uniq
+                    ON bereikbaarheid_out_vma_directed (id);
+                CREATE UNIQUE INDEX IF NOT EXISTS bereikbaarheid_out_vma_node_node_uniq
+                    ON bereikbaarheid_out_vma_node (node, geom, geom_28992);
+                CREATE UNIQUE INDEX IF NOT EXISTS bereikbaarheid_out_load_unload_id_uniq
+                    ON bereikbaarheid_out_load_unload (id);
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS bereikbaarheid_out_vma_undirected_link_nr_uniq;
+                DROP INDEX IF EXISTS bereikbaarheid_out_vma_directed_id_uniq;
+                DROP INDEX IF EXISTS bereikbaarheid_out_vma_node_node_uniq;
+                DROP INDEX IF EXISTS bereikbaarheid_out_load_unload_id_uniq;
+            """,
+        )
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.7 on 2026-10-18 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bereikbaarheid", "0018_directed_network_table"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bereikbareknopen",
+            name="netwerk_versie",
+            field=models.IntegerField(null=True),
+        ),
+    ]
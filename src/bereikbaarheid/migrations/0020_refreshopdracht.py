@@ -0,0 +1,40 @@
+# Generated by Django 6.0.7 on 2026-10-18 17:05
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bereikbaarheid", "0019_bereikbareknopen_netwerk_versie"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RefreshOpdracht",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("naam", models.CharField(max_length=64)),
+                ("model", models.CharField(max_length=255)),
+                (
+                    "link_nrs",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.BigIntegerField(), null=True, size=None
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Refresh-opdracht",
+                "verbose_name_plural": "Refresh-opdrachten",
+            },
+        ),
+    ]
@@ -238,3 +238,56 @@ class VerkeersPaal(TimeStampMixin):
     camera = models.CharField(max_length=255, blank=True, null=True)
     beheerorganisatie = models.CharField(max_length=255, blank=True, null=True)
     bijzonderheden = models.CharField(max_length=500, blank=True, null=True)
+
+
+class BereikbareKnopen(models.Model):
+    """
+    Knopen die vanaf het startpunt (902205) bereikbaar zijn per voertuigprofiel
+    profiel = gekwantiseerd voertuigprofiel, zie bereikbaarheid.routing.reachability
+    netwerk_versie = versie van het netwerk waarop de knopen zijn berekend, zie NetwerkVersie
+    """
+
+    class Meta:
+        verbose_name = "Bereikbare knopen"
+        verbose_name_plural = "Bereikbare knopen"
+
+    profiel = models.CharField(max_length=255, unique=True)
+    knopen = ArrayField(models.IntegerField())
+    netwerk_versie = models.IntegerField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class NetwerkVersie(models.Model):
+    """
+    Versie van het netwerk, wordt opgehoogd bij iedere refresh van de materialized views
+    en bij wijzigingen in de tabellen die de endpoints direct gebruiken
+    aantal_rijen = aantal rijen per brontabel op het moment van de versie
+    """
+
+    class Meta:
+        verbose_name = "Netwerkversie"
+        verbose_name_plural = "Netwerkversies"
+
+    versie = models.BigAutoField(primary_key=True)
+    aantal_rijen = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class RefreshOpdracht(models.Model):
+    """
+    Openstaande refresh, zie bereikbaarheid.refresh.RefreshScheduler
+    Wordt verwijderd als de refresh is gelukt, opdrachten die bij een herstart van de worker
+    zijn blijven staan worden bij het opstarten of met `manage.py process_refreshes` uitgevoerd
+    naam = naam van de RefreshScheduler
+    model = gewijzigd model (app_label.ModelName)
+    link_nrs = gewijzigde links, leeg (null) voor alle links
+    """
+
+    class Meta:
+        verbose_name = "Refresh-opdracht"
+        verbose_name_plural = "Refresh-opdrachten"
+
+    naam = models.CharField(max_length=64)
+    model = models.CharField(max_length=255)
+    link_nrs = ArrayField(models.BigIntegerField(), null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -1,5 +1,6 @@
-from .permits import get_permits
+from .permits import get_permits, get_permits_batch
 
 __all__ = [
     "get_permits",
+    "get_permits_batch",
 ]
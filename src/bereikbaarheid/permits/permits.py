@@ -1,7 +1,67 @@
+import json
+
+from bereikbaarheid.routing import (
+    nearest_link,
+    reachability_profile,
+    reachable_nodes,
+    use_memory_engine,
+    use_memory_snapping,
+    use_precomputed_engine,
+)
+from bereikbaarheid.routing.snapping import raw_query_nearest_link, raw_query_nearest_link_template
 from bereikbaarheid.utils import convert_to_bool, django_query_db
 
-raw_query = """
-    select v.id,
+routing_query_pgrouting = """
+            SELECT start_vid as source,
+            end_vid as target,
+            agg_cost FROM pgr_dijkstraCost('
+                select id, source, target, cost
+                from bereikbaarheid_out_vma_directed
+                where (%(lengte)s < c17 or c17 is null)
+                and (%(breedte)s < c18 or c18 is null)
+                and (%(hoogte)s < c19 or c19 is null)
+                and (%(aslast_gewicht)s < c20 or c20 is null)
+                and (%(totaal_gewicht)s < c21 or c21 is null)
+                and (c01 is false)
+                and (
+                        c07 is false
+                        or (c07 is true and %(bedrijfsauto)s is false)
+                        or (
+                            c07 is true
+                            and %(bedrijfsauto)s is true
+                            and %(max_massa)s <= 3500
+                        )
+                    )
+                    and (
+                        c07a is false
+                        or (c07a is true and %(bus)s is false)
+                    )
+                    and (
+                        c10 is false
+                        or (c10 is true and %(aanhanger)s is false)
+
+                )',
+                902205,
+                array(
+                    select node
+                    from bereikbaarheid_out_vma_node
+                )
+            )
+"""
+
+routing_query_reachable = """
+            select unnest(%(reachable_nodes)s::integer[]) as target, 0 as agg_cost
+"""
+
+routing_query_precomputed = """
+            select unnest(knopen) as target, 0 as agg_cost
+            from bereikbaarheid_bereikbareknopen
+            where profiel = %(profile_key)s
+"""
+
+# the columns of the permit of a location, {lon} and {lat} are parameters or columns
+raw_query_columns = """
+    v.id,
     case
         when v.milieuzone = false and %(permit_zone_milieu)s = false
             then 'false'
@@ -37,14 +97,14 @@ raw_query = """
     end as boolean_in_amsterdam,
 
     ST_closestpoint(
-        v.geom,st_setsrid(ST_MakePoint(%(lon)s, %(lat)s), 4326)
+        v.geom,st_setsrid(ST_MakePoint({lon}, {lat}), 4326)
     )::json as geom,
 
     st_length(
         st_transform(
             st_shortestline(
                 v.geom,
-                st_setsrid(ST_MakePoint(%(lon)s, %(lat)s), 4326)
+                st_setsrid(ST_MakePoint({lon}, {lat}), 4326)
             ),
             28992
         )
@@ -58,8 +118,10 @@ raw_query = """
             then 'true'
         else 'false'
     end as zone_7_5_detail
+"""
 
-    from (
+# the status of the roads for the vehicle, {link_filter} restricts the roads
+raw_query_links = """
         select
             abs(n.id) as id,
             max(
@@ -84,43 +146,7 @@ raw_query = """
             g.zone_7_5,
             g.milieuzone
         from bereikbaarheid_out_vma_directed n
-        left join (
-            SELECT start_vid as source,
-            end_vid as target,
-            agg_cost FROM pgr_dijkstraCost('
-                select id, source, target, cost
-                from bereikbaarheid_out_vma_directed
-                where (%(lengte)s < c17 or c17 is null)
-                and (%(breedte)s < c18 or c18 is null)
-                and (%(hoogte)s < c19 or c19 is null)
-                and (%(aslast_gewicht)s < c20 or c20 is null)
-                and (%(totaal_gewicht)s < c21 or c21 is null)
-                and (c01 is false)
-                and (
-                        c07 is false
-                        or (c07 is true and %(bedrijfsauto)s is false)
-                        or (
-                            c07 is true
-                            and %(bedrijfsauto)s is true
-                            and %(max_massa)s <= 3500
-                        )
-                    )
-                    and (
-                        c07a is false
-                        or (c07a is true and %(bus)s is false)
-                    )
-                    and (
-                        c10 is false
-                        or (c10 is true and %(aanhanger)s is false)
-
-                )',
-                902205,
-                array(
-                    select node
-                    from bereikbaarheid_out_vma_node
-                )
-            )
-        ) as routing on n.source=routing.target
+        left join ({routing_query}) as routing on n.source = routing.target
 
         left join bereikbaarheid_out_vma_directed g
             on abs(n.id) = g.id
@@ -129,33 +155,40 @@ raw_query = """
                 where binnen_amsterdam is true and id > 0
             )
             and n.cost > 0
+            {link_filter}
 
         group by abs(n.id), g.geom4326,g.zone_7_5, g.milieuzone
-        order by abs(n.id)) v
+        order by abs(n.id)
+"""
 
+raw_query_joins = """
         left join bereikbaarheid_venstertijdweg as ven
         on v.id = abs(ven.link_nr)
 
         left join bereikbaarheid_out_vma_undirected as tiles
             on v.id=tiles.link_nr
-            where v.id = (
-                SELECT id
-                from bereikbaarheid_out_vma_directed a
-                where id > 0 and car_network is true
-                order by st_length(
-                    st_transform(
-                        st_shortestline(
-                            st_setsrid(
-                                ST_MakePoint(%(lon)s, %(lat)s),
-                                4326
-                            ),
-                            st_linemerge(a.geom4326)
-                        ),
-                        28992
-                    )
-                ) asc
-                limit 1
-            )
+"""
+
+raw_query = f"""
+    select {raw_query_columns}
+    from ({raw_query_links}) v
+{raw_query_joins}
+            where v.id = ({{nearest_link}})
+"""
+
+# all locations are snapped in the locations cte and the status is only determined for their roads,
+# the routing is done once. A road can have more than one time window, one row per location is returned
+raw_query_batch = f"""
+    with locations as (
+        select l.nr, l.lat, l.lon, ({{nearest_link}}) as link_id
+        from json_to_recordset(%(locations)s::json)
+            as l(nr integer, lat double precision, lon double precision, link_id integer)
+    )
+    select distinct on (loc.nr) loc.nr, {raw_query_columns}
+    from locations loc
+    left join ({raw_query_links}) v on v.id = loc.link_id
+{raw_query_joins}
+    order by loc.nr
 """
 
 
@@ -184,11 +217,84 @@ def _transform_results(result: tuple) -> dict:
         return {}
 
 
+def _routing_query(data: dict, parameters: dict) -> str:
+    """
+    The routing subquery of the engine in use, its parameters are added
+    :param data:
+    :param parameters:
+    :return:
+    """
+    if use_memory_engine():
+        parameters["reachable_nodes"] = reachable_nodes(data)
+        return routing_query_reachable
+    elif use_precomputed_engine():
+        parameters["profile_key"] = reachability_profile(data)
+        if parameters["profile_key"] is not None:
+            return routing_query_precomputed
+        # not precomputed, calculated like the memory engine does
+        parameters["reachable_nodes"] = reachable_nodes(data)
+        return routing_query_reachable
+    return routing_query_pgrouting
+
+
 def get_permits(data: dict) -> dict:
     """
     Query the permits from the database
     :param data:
     :return:
     """
-    results = django_query_db(raw_query, {**data}, single=True)
+    parameters = {**data}
+    routing_query = _routing_query(data, parameters)
+
+    nearest_link_query = raw_query_nearest_link
+    if use_memory_snapping():
+        nearest_link_query = "%(link_id)s"
+        parameters["link_id"] = nearest_link(data["lat"], data["lon"])
+
+    results = django_query_db(
+        raw_query.format(
+            routing_query=routing_query,
+            nearest_link=nearest_link_query,
+            lon="%(lon)s",
+            lat="%(lat)s",
+            link_filter="",
+        ),
+        parameters,
+        single=True,
+    )
     return _transform_results(results)
+
+
+def get_permits_batch(data: dict) -> list[dict]:
+    """
+    Query the permits of many locations for one vehicle from the database,
+    the routing is done once and the locations are snapped in the same query
+    :param data: the vehicle and a list of locations (lat, lon)
+    :return: the permits in the order of the locations, empty for a location without road
+    """
+    parameters = {key: value for key, value in data.items() if key != "locations"}
+    routing_query = _routing_query(data, parameters)
+
+    locations = [
+        {"nr": nr, "lat": location["lat"], "lon": location["lon"]} for nr, location in enumerate(data["locations"])
+    ]
+
+    nearest_link_query = raw_query_nearest_link_template.format(lon="l.lon", lat="l.lat")
+    if use_memory_snapping():
+        nearest_link_query = "l.link_id"
+        for location in locations:
+            location["link_id"] = nearest_link(location["lat"], location["lon"])
+    parameters["locations"] = json.dumps(locations)
+
+    results = django_query_db(
+        raw_query_batch.format(
+            routing_query=routing_query,
+            nearest_link=nearest_link_query,
+            lon="loc.lon",
+            lat="loc.lat",
+            link_filter="and abs(n.id) in (select link_id from locations)",
+        ),
+        parameters,
+    )
+    # the query returns a row per location: nr followed by the columns of raw_query
+    return [_transform_results(result[1:]) if result[1] is not None else {} for result in results]
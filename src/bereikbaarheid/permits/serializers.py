@@ -8,8 +8,11 @@ from bereikbaarheid.validation import (
     voertuig,
 )
 
+# maximum number of locations of a batch request
+MAX_LOCATIONS = 100
 
-class PermitSerializer(Schema):
+
+class LocationSerializer(Schema):
     lat = fields.Float(
         required=True,
         validate=[validate.Range(min=bbox_adam["lat"]["min"], max=bbox_adam["lat"]["max"])],
@@ -20,6 +23,8 @@ class PermitSerializer(Schema):
         validate=[validate.Range(min=bbox_adam["lon"]["min"], max=bbox_adam["lon"]["max"])],
     )
 
+
+class PermitVehicleSerializer(Schema):
     permit_zone_milieu = fields.Boolean(required=True, data_key="permitLowEmissionZone")
     permit_zone_7_5 = fields.Boolean(required=True, data_key="permitZzv")
 
@@ -102,3 +107,15 @@ class PermitSerializer(Schema):
         data["bedrijfsauto"] = is_company_car(vehicle_type)
         data["bus"] = is_bus(vehicle_type)
         return data
+
+
+class PermitSerializer(LocationSerializer, PermitVehicleSerializer):
+    pass
+
+
+class PermitsBatchSerializer(PermitVehicleSerializer):
+    locations = fields.List(
+        fields.Nested(LocationSerializer),
+        required=True,
+        validate=[validate.Length(min=1, max=MAX_LOCATIONS)],
+    )
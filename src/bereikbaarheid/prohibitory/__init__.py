@@ -1,5 +1,15 @@
-from .prohibitory import get_prohibitory
+from .prohibitory import (
+    get_prohibitory,
+    get_prohibitory_profiles,
+    get_prohibitory_tile,
+    iter_prohibitory,
+    iter_prohibitory_profiles,
+)
 
 __all__ = [
     "get_prohibitory",
+    "get_prohibitory_profiles",
+    "get_prohibitory_tile",
+    "iter_prohibitory",
+    "iter_prohibitory_profiles",
 ]
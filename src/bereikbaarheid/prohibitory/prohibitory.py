@@ -1,86 +1,21 @@
 import json
+from typing import Iterator
 
-from bereikbaarheid.utils import django_query_db
+import numpy as np
 
-raw_query = """
-    select v.id,
-    case
-        when v.bereikbaar_status_code = 333 then 333
-        when v.milieuzone = true and v.zone_7_5 = true
-            and v.bereikbaar_status_code = 222
-            and %(permit_zone_milieu)s = true
-            and %(permit_zone_7_5)s = true
-            then 11111
-        when v.milieuzone = true and v.zone_7_5 = true
-            and v.bereikbaar_status_code <> 222
-            and %(permit_zone_milieu)s = true
-            and %(permit_zone_7_5)s = true
-            then 11110
-        when v.milieuzone = true and v.zone_7_5 = false
-            and v.bereikbaar_status_code <> 222
-            and %(permit_zone_milieu)s = true
-            then 11100
-        when v.milieuzone = true and v.zone_7_5 = false
-            and v.bereikbaar_status_code = 222
-            and %(permit_zone_milieu)s = true
-            or v.milieuzone = true and v.zone_7_5 = true
-            and v.bereikbaar_status_code = 222
-            and %(permit_zone_milieu)s = true
-            and %(permit_zone_7_5)s = false
-            then 11101
-        when v.milieuzone = false and v.zone_7_5 = true
-            and v.bereikbaar_status_code = 222
-            and %(permit_zone_7_5)s = true
-            or v.milieuzone = true and v.zone_7_5 = true
-            and v.bereikbaar_status_code = 222
-            and %(permit_zone_milieu)s = false
-            and %(permit_zone_7_5)s = true
-            then 11011
-        when v.milieuzone = false and v.zone_7_5 = true
-            and v.bereikbaar_status_code <> 222
-            and %(permit_zone_7_5)s = true
-            then 11010
-        when v.milieuzone = false and v.zone_7_5 = false
-            and v.bereikbaar_status_code = 222
-            or v.milieuzone = true and v.zone_7_5 = true
-            and v.bereikbaar_status_code = 222
-            and %(permit_zone_milieu)s = false
-            and %(permit_zone_7_5)s = false
-            or (
-                v.milieuzone = true and v.zone_7_5 = false
-                and v.bereikbaar_status_code = 222
-                and %(permit_zone_milieu)s = false
-            )
-            then 11001
-        else 999
-    end as bereikbaar_status_code,
-    v.geom from (
-        select
-            abs(n.id) as id,
-            max(
-                case
-                    when n.cost is NULL then 333
-                    when routing.agg_cost is null then 222
-                    when n.c07 is true and %(bedrijfsauto)s is true
-                        and %(max_massa)s > 3500
-                        or n.c07a is true and %(bus)s is true
-                        or n.c10 is true and %(aanhanger)s is true
-                        or n.c01 is true
-                        or n.c17 < %(lengte)s
-                        or n.c18 < %(breedte)s
-                        or n.c19 < %(hoogte)s
-                        or n.c20 < %(aslast_gewicht)s
-                        or n.c21 < %(totaal_gewicht)s
-                        then 222
-                    else 999
-                end
-            ) as bereikbaar_status_code,
-            ST_AsGeoJSON(g.geom4326) as geom,
-            g.zone_7_5,
-            g.milieuzone,
-            g.binnen_amsterdam
-        from bereikbaarheid_out_vma_directed n
-        left join (
+from bereikbaarheid.cache import reachable_nodes_cache
+from bereikbaarheid.geojson_writer import RawJSON
+from bereikbaarheid.routing import (
+    reachability_profile,
+    reachable_nodes,
+    reachable_nodes_per_graph,
+    use_memory_engine,
+    use_precomputed_engine,
+)
+from bereikbaarheid.utils import django_query_db, django_query_db_iter
+from bereikbaarheid.viewport import bbox_filter, bbox_parameters, geometry_column, tile_bbox
+
+routing_query_pgrouting = """
             SELECT start_vid as source,
             end_vid as target,
             agg_cost FROM pgr_dijkstraCost('
@@ -118,7 +53,122 @@ raw_query = """
                     from bereikbaarheid_out_vma_node
                 )
             )
-        ) as routing on n.source = routing.target
+"""
+
+routing_query_reachable = """
+            select unnest(%(reachable_nodes)s::integer[]) as target, 0 as agg_cost
+"""
+
+routing_query_precomputed = """
+            select unnest(knopen) as target, 0 as agg_cost
+            from bereikbaarheid_bereikbareknopen
+            where profiel = %(profile_key)s
+"""
+
+# the vehicle properties used in the status codes below, they are parameters or columns of a profile
+PROFILE_FIELDS = (
+    "permit_zone_milieu",
+    "permit_zone_7_5",
+    "bedrijfsauto",
+    "max_massa",
+    "bus",
+    "aanhanger",
+    "lengte",
+    "breedte",
+    "hoogte",
+    "aslast_gewicht",
+    "totaal_gewicht",
+)
+
+# the status of a directed road for the vehicle
+raw_query_link_status = """
+max(
+    case
+        when n.cost is NULL then 333
+        when routing.agg_cost is null then 222
+        when n.c07 is true and {bedrijfsauto} is true
+            and {max_massa} > 3500
+            or n.c07a is true and {bus} is true
+            or n.c10 is true and {aanhanger} is true
+            or n.c01 is true
+            or n.c17 < {lengte}
+            or n.c18 < {breedte}
+            or n.c19 < {hoogte}
+            or n.c20 < {aslast_gewicht}
+            or n.c21 < {totaal_gewicht}
+            then 222
+        else 999
+    end
+)
+"""
+
+# the status code of a road for the vehicle and its permits
+raw_query_permit_status = """
+case
+    when v.bereikbaar_status_code = 333 then 333
+    when v.milieuzone = true and v.zone_7_5 = true
+        and v.bereikbaar_status_code = 222
+        and {permit_zone_milieu} = true
+        and {permit_zone_7_5} = true
+        then 11111
+    when v.milieuzone = true and v.zone_7_5 = true
+        and v.bereikbaar_status_code <> 222
+        and {permit_zone_milieu} = true
+        and {permit_zone_7_5} = true
+        then 11110
+    when v.milieuzone = true and v.zone_7_5 = false
+        and v.bereikbaar_status_code <> 222
+        and {permit_zone_milieu} = true
+        then 11100
+    when v.milieuzone = true and v.zone_7_5 = false
+        and v.bereikbaar_status_code = 222
+        and {permit_zone_milieu} = true
+        or v.milieuzone = true and v.zone_7_5 = true
+        and v.bereikbaar_status_code = 222
+        and {permit_zone_milieu} = true
+        and {permit_zone_7_5} = false
+        then 11101
+    when v.milieuzone = false and v.zone_7_5 = true
+        and v.bereikbaar_status_code = 222
+        and {permit_zone_7_5} = true
+        or v.milieuzone = true and v.zone_7_5 = true
+        and v.bereikbaar_status_code = 222
+        and {permit_zone_milieu} = false
+        and {permit_zone_7_5} = true
+        then 11011
+    when v.milieuzone = false and v.zone_7_5 = true
+        and v.bereikbaar_status_code <> 222
+        and {permit_zone_7_5} = true
+        then 11010
+    when v.milieuzone = false and v.zone_7_5 = false
+        and v.bereikbaar_status_code = 222
+        or v.milieuzone = true and v.zone_7_5 = true
+        and v.bereikbaar_status_code = 222
+        and {permit_zone_milieu} = false
+        and {permit_zone_7_5} = false
+        or (
+            v.milieuzone = true and v.zone_7_5 = false
+            and v.bereikbaar_status_code = 222
+            and {permit_zone_milieu} = false
+        )
+        then 11001
+    else 999
+end
+"""
+
+raw_query = f"""
+    select v.id,
+    {raw_query_permit_status} as bereikbaar_status_code,
+    v.geom from (
+        select
+            abs(n.id) as id,
+            {raw_query_link_status} as bereikbaar_status_code,
+            {{geom_output}} as geom,
+            g.zone_7_5,
+            g.milieuzone,
+            g.binnen_amsterdam
+        from bereikbaarheid_out_vma_directed n
+        left join ({{routing_query}}) as routing on n.source = routing.target
 
         left join bereikbaarheid_out_vma_directed g
             on abs(n.id) = g.id
@@ -127,13 +177,198 @@ raw_query = """
                 where id > 0
             )
             and n.cost > 0
-            
-        group by abs(n.id), g.geom4326, g.zone_7_5, g.milieuzone,g.binnen_amsterdam
+            {{bbox_filter}}
+
+        group by abs(n.id), g.{{geom}}, g.zone_7_5, g.milieuzone,g.binnen_amsterdam
         order by abs(n.id)
     ) v
     where v.bereikbaar_status_code <> 999 and v.binnen_amsterdam is true
 """
 
+# the routing of every profile, pgr_dijkstraCost runs once per graph: the profiles with the same values
+# of the edge filter of routing_query_pgrouting share a graph, the values are formatted into its edge query
+routing_query_profiles_pgrouting = """
+            with graphs as (
+                select * from json_to_recordset(%(graphs)s::json) as g(
+                    graph integer,
+                    lengte double precision,
+                    breedte double precision,
+                    hoogte double precision,
+                    aslast_gewicht integer,
+                    totaal_gewicht integer,
+                    c07 boolean,
+                    bus boolean,
+                    aanhanger boolean
+                )
+            )
+            select p.nr, routing.target, routing.agg_cost
+            from profiles p
+            join (
+                select g.graph, r.end_vid as target, r.agg_cost
+                from graphs g
+                cross join lateral pgr_dijkstraCost(
+                    format('
+                        select id, source, target, cost
+                        from bereikbaarheid_out_vma_directed
+                        where cost > 0
+                        and (%%s < c17 or c17 is null)
+                        and (%%s < c18 or c18 is null)
+                        and (%%s < c19 or c19 is null)
+                        and (%%s < c20 or c20 is null)
+                        and (%%s < c21 or c21 is null)
+                        and (c01 is false)
+                        and (c07 is false or %%s is false)
+                        and (c07a is false or %%s is false)
+                        and (c10 is false or %%s is false)',
+                        -.01 + g.lengte,
+                        -.01 + g.breedte,
+                        -.01 + g.hoogte,
+                        -1 + g.aslast_gewicht,
+                        -1 + g.totaal_gewicht,
+                        g.c07,
+                        g.bus,
+                        g.aanhanger
+                    ),
+                    902205,
+                    array(
+                        select node
+                        from bereikbaarheid_out_vma_node
+                    )
+                ) as r
+            ) routing on routing.graph = p.graph
+"""
+
+# the reachable nodes per graph, see reachable_nodes_per_graph
+raw_query_graphs = """
+            with graphs as (
+                select * from json_to_recordset(%(graphs)s::json) as g(
+                    graph integer,
+                    reachable_nodes integer[]
+                )
+            )
+"""
+
+routing_query_profiles_reachable = f"""
+            {raw_query_graphs}
+            select p.nr, unnest(g.reachable_nodes) as target, 0 as agg_cost
+            from profiles p
+            join graphs g on g.graph = p.graph
+"""
+
+# the reachable nodes of a profile that is not precomputed are calculated like the memory engine does
+routing_query_profiles_precomputed = f"""
+            {raw_query_graphs}
+            select p.nr, unnest(coalesce(k.knopen, g.reachable_nodes)) as target, 0 as agg_cost
+            from profiles p
+            left join bereikbaarheid_bereikbareknopen k on k.profiel = p.profile_key
+            left join graphs g on g.graph = p.graph
+"""
+
+# the status codes of all profiles in one pass over the network, a road is returned when it would be
+# returned for one of the profiles. The status code is 999 for the profiles it is not returned for
+raw_query_profiles = f"""
+    with profiles as (
+        select * from json_to_recordset(%(profiles)s::json) as p(
+            nr integer,
+            lengte double precision,
+            breedte double precision,
+            hoogte double precision,
+            aslast_gewicht integer,
+            totaal_gewicht integer,
+            max_massa integer,
+            bedrijfsauto boolean,
+            bus boolean,
+            aanhanger boolean,
+            permit_zone_milieu boolean,
+            permit_zone_7_5 boolean,
+            profile_key text,
+            graph integer
+        )
+    ),
+    routing as ({{routing_query}})
+
+    select v.id,
+    array_agg(
+        case
+            when v.bereikbaar_status_code = 999 then 999
+            else {raw_query_permit_status}
+        end
+        order by p.nr
+    ) as bereikbaar_status_codes,
+    v.geom from (
+        select
+            abs(n.id) as id,
+            p.nr,
+            {raw_query_link_status} as bereikbaar_status_code,
+            ST_AsGeoJSON(g.{{geom}}) as geom,
+            g.zone_7_5,
+            g.milieuzone,
+            g.binnen_amsterdam
+        from bereikbaarheid_out_vma_directed n
+        cross join profiles p
+        left join routing on routing.nr = p.nr and n.source = routing.target
+
+        left join bereikbaarheid_out_vma_directed g
+            on abs(n.id) = g.id
+            where abs(n.id) in (
+                select id from bereikbaarheid_out_vma_directed
+                where id > 0
+            )
+            and n.cost > 0
+            {{bbox_filter}}
+
+        group by abs(n.id), p.nr, g.{{geom}}, g.zone_7_5, g.milieuzone,g.binnen_amsterdam
+    ) v
+    join profiles p on p.nr = v.nr
+    where v.binnen_amsterdam is true
+    group by v.id, v.geom
+    having bool_or(v.bereikbaar_status_code <> 999)
+    order by v.id
+"""
+
+# the prohibitory roads of a tile, the status code is an attribute of the features
+raw_query_tile = """
+    select ST_AsMVT(tile, 'prohibitory', 4096, 'geom')
+    from ({query}) as tile
+    where tile.geom is not null
+"""
+
+# the vehicle properties of the pgr_dijkstraCost query above
+ROUTING_FIELDS = (
+    "lengte",
+    "breedte",
+    "hoogte",
+    "aslast_gewicht",
+    "totaal_gewicht",
+    "bedrijfsauto",
+    "max_massa",
+    "bus",
+    "aanhanger",
+)
+
+# same edge filter as the pgr_dijkstraCost query above, including its margins
+routing_options = {"dimension_margin": 0.01, "weight_margin": 1, "positive_cost_only": True}
+
+
+_parameter_fields = {field: f"%({field})s" for field in PROFILE_FIELDS}
+_profile_fields = {field: f"p.{field}" for field in PROFILE_FIELDS}
+
+
+def _transform_row(row: tuple) -> dict:
+    """
+    Transform a row to the expected Geojson feature
+    :param row:
+    :return:
+    """
+    return {
+        "type": "Feature",
+        "properties": {
+            "bereikbaar_status_code": row[1],  # bereikbaar_status_code
+            "id": row[0],
+        },  # id
+        "geometry": RawJSON(row[2]),  # geom
+    }
+
 
 def _transform_results(results: list) -> list[dict]:
     """
@@ -141,17 +376,65 @@ def _transform_results(results: list) -> list[dict]:
     :param results:
     :return:
     """
-    return [
-        {
-            "type": "Feature",
-            "properties": {
-                "bereikbaar_status_code": row[1],  # bereikbaar_status_code
-                "id": row[0],
-            },  # id
-            "geometry": json.loads(row[2]),  # geom
-        }
-        for row in results
-    ]
+    return [_transform_row(row) for row in results]
+
+
+def _cached_reachable_nodes(data: dict) -> list[int]:
+    """
+    The nodes reachable for the vehicle, calculated once per vehicle and network version
+    so the tiles of a map view do not each route through the whole network
+    :param data:
+    :return:
+    """
+    key = reachable_nodes_cache.make_key({field: data.get(field) for field in ROUTING_FIELDS})
+    content = reachable_nodes_cache.get(key)
+
+    if content is None:
+        if use_memory_engine() or use_precomputed_engine():
+            nodes = reachable_nodes(data, **routing_options)
+        else:
+            nodes = [row[1] for row in django_query_db(routing_query_pgrouting, data)]
+        content = np.asarray(nodes, dtype=np.int32).tobytes()
+        reachable_nodes_cache.set(key, content)
+
+    return np.frombuffer(content, dtype=np.int32).tolist()
+
+
+def _prepare_query(
+    data: dict, geom_output: str = "ST_AsGeoJSON(g.{geom})", cached_routing: bool = False
+) -> tuple[str, dict]:
+    """
+    The query and its parameters for the routing engine in use
+    :param data:
+    :param geom_output: expression of the returned geometry of the roads, {geom} is the geometry column of the roads
+    :param cached_routing: use the reachable nodes of _cached_reachable_nodes, a precomputed profile is still used
+    :return:
+    """
+    routing_query = routing_query_pgrouting
+    parameters = {**data}
+
+    if use_precomputed_engine():
+        parameters["profile_key"] = reachability_profile(data, **routing_options)
+
+    if parameters.get("profile_key") is not None:
+        routing_query = routing_query_precomputed
+    elif cached_routing:
+        routing_query = routing_query_reachable
+        parameters["reachable_nodes"] = _cached_reachable_nodes(data)
+    elif use_memory_engine() or use_precomputed_engine():
+        # with the precomputed engine a profile that is not precomputed is calculated like the memory engine does
+        routing_query = routing_query_reachable
+        parameters["reachable_nodes"] = reachable_nodes(data, **routing_options)
+
+    parameters.update(bbox_parameters(data))
+    query = raw_query.format(
+        routing_query=routing_query,
+        geom=geometry_column(data),
+        geom_output=geom_output.format(geom=geometry_column(data)),
+        bbox_filter=bbox_filter(data, "n.geom4326"),
+        **_parameter_fields,
+    )
+    return query, parameters
 
 
 def get_prohibitory(data: dict) -> list[dict]:
@@ -160,6 +443,129 @@ def get_prohibitory(data: dict) -> list[dict]:
     :param data:
     :return:
     """
-
-    result = django_query_db(raw_query, {**data})
+    result = django_query_db(*_prepare_query(data))
     return _transform_results(result)
+
+
+def iter_prohibitory(data: dict) -> Iterator[dict]:
+    """
+    Like get_prohibitory, the rows are fetched from a server-side cursor while iterating
+    :param data:
+    :return:
+    """
+    return map(_transform_row, django_query_db_iter(*_prepare_query(data)))
+
+
+def get_prohibitory_tile(data: dict, z: int, x: int, y: int) -> bytes:
+    """
+    The prohibitory roads of the tile as Mapbox Vector Tile
+    Only the roads in the tile are returned, simplified below SIMPLIFY_ZOOM
+    :param data: like the data of get_prohibitory
+    :param z:
+    :param x:
+    :param y:
+    :return:
+    """
+    data = {**data, "bbox": tile_bbox(z, x, y), "zoom": z}
+    query, parameters = _prepare_query(
+        data,
+        geom_output="ST_AsMVTGeom(st_transform(g.{geom}, 3857), ST_TileEnvelope(%(z)s, %(x)s, %(y)s))",
+        cached_routing=True,
+    )
+    result = django_query_db(raw_query_tile.format(query=query), {**parameters, "z": z, "x": x, "y": y}, single=True)
+    # ST_AsMVT of no roads can be NULL, the tile is empty
+    if not result or result[0] is None:
+        return b""
+    return bytes(result[0])
+
+
+def _transform_profiles_row(row: tuple) -> dict:
+    """
+    Transform a row to a Geojson feature with the status code of every profile
+    :param row:
+    :return:
+    """
+    return {
+        "type": "Feature",
+        "properties": {
+            "bereikbaar_status_codes": row[1],  # bereikbaar_status_codes, in the order of the profiles
+            "id": row[0],
+        },  # id
+        "geometry": RawJSON(row[2]),  # geom
+    }
+
+
+def _pgrouting_graph(profile: dict) -> dict:
+    """
+    The values of the edge filter of routing_query_profiles_pgrouting
+    :param profile:
+    :return:
+    """
+    return {
+        "lengte": profile.get("lengte"),
+        "breedte": profile.get("breedte"),
+        "hoogte": profile.get("hoogte"),
+        "aslast_gewicht": profile.get("aslast_gewicht"),
+        "totaal_gewicht": profile.get("totaal_gewicht"),
+        "c07": bool(profile.get("bedrijfsauto") and (profile.get("max_massa") or 0) > 3500),
+        "bus": profile.get("bus"),
+        "aanhanger": profile.get("aanhanger"),
+    }
+
+
+def _prepare_profiles_query(data: dict) -> tuple[str, dict]:
+    """
+    The query and its parameters to compare the profiles, for the routing engine in use
+    Every distinct graph is searched once, the profiles with the same graph share its reachable nodes
+    :param data:
+    :return:
+    """
+    routing_query = routing_query_profiles_pgrouting
+    profiles = [{"nr": nr, **profile} for nr, profile in enumerate(data["profiles"])]
+    graphs = []
+
+    if use_memory_engine() or use_precomputed_engine():
+        routing_query = routing_query_profiles_reachable
+        if use_precomputed_engine():
+            routing_query = routing_query_profiles_precomputed
+            for profile in profiles:
+                profile["profile_key"] = reachability_profile(profile, **routing_options)
+
+        routed = [profile for profile in profiles if profile.get("profile_key") is None]
+        indexes, nodes = reachable_nodes_per_graph(routed, **routing_options)
+        for profile, graph in zip(routed, indexes):
+            profile["graph"] = graph
+        graphs = [{"graph": graph, "reachable_nodes": reachable} for graph, reachable in enumerate(nodes)]
+    else:
+        keys = {}
+        for profile in profiles:
+            graph = _pgrouting_graph(profile)
+            profile["graph"] = keys.setdefault(json.dumps(graph, sort_keys=True), len(keys))
+            if profile["graph"] == len(graphs):
+                graphs.append({"graph": profile["graph"], **graph})
+
+    query = raw_query_profiles.format(
+        routing_query=routing_query,
+        geom=geometry_column(data),
+        bbox_filter=bbox_filter(data, "n.geom4326"),
+        **_profile_fields,
+    )
+    return query, {"profiles": json.dumps(profiles), "graphs": json.dumps(graphs), **bbox_parameters(data)}
+
+
+def get_prohibitory_profiles(data: dict) -> list[dict]:
+    """
+    Query the Prohibitory of several vehicles at once, the features have a status code per vehicle
+    :param data: the profiles, each like the data of get_prohibitory
+    :return:
+    """
+    return [_transform_profiles_row(row) for row in django_query_db(*_prepare_profiles_query(data))]
+
+
+def iter_prohibitory_profiles(data: dict) -> Iterator[dict]:
+    """
+    Like get_prohibitory_profiles, the rows are fetched from a server-side cursor while iterating
+    :param data:
+    :return:
+    """
+    return map(_transform_profiles_row, django_query_db_iter(*_prepare_profiles_query(data)))
@@ -6,9 +6,13 @@ from bereikbaarheid.validation import (
     is_company_car,
     voertuig,
 )
+from bereikbaarheid.viewport import ViewportSerializer
 
+# maximum number of vehicles compared in one request
+MAX_PROFILES = 10
 
-class ProhibitorySerializer(Schema):
+
+class ProhibitoryVehicleSerializer(Schema):
     permit_zone_milieu = fields.Boolean(required=True, data_key="permitLowEmissionZone")
     permit_zone_7_5 = fields.Boolean(required=True, data_key="permitZzv")
 
@@ -91,3 +95,15 @@ class ProhibitorySerializer(Schema):
         data["bedrijfsauto"] = is_company_car(vehicle_type)
         data["bus"] = is_bus(vehicle_type)
         return data
+
+
+class ProhibitorySerializer(ProhibitoryVehicleSerializer, ViewportSerializer):
+    pass
+
+
+class ProhibitoryCompareSerializer(ViewportSerializer):
+    profiles = fields.List(
+        fields.Nested(ProhibitoryVehicleSerializer),
+        required=True,
+        validate=[validate.Length(min=1, max=MAX_PROFILES)],
+    )
@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from typing import Callable
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from bereikbaarheid.models import RefreshOpdracht
+from bereikbaarheid.resources.utils import refresh_network
+from bereikbaarheid.routing import refresh_reachability
+
+log = logging.getLogger(__name__)
+
+
+class RefreshScheduler:
+    """
+    Coalesces refresh requests into one refresh after a debounce window
+
+    Every request marks the changed models dirty and postpones the refresh until no request
+    has come in for `delay` seconds. The refresh runs in a background thread, outside
+    the request thread; requests that come in during a refresh lead to one more refresh.
+    refresh is called with all models and links that changed since the previous refresh.
+
+    Every request is stored as a RefreshOpdracht in the transaction of the change and deleted once
+    its refresh has succeeded. A refresh that was pending when the worker stopped (a restart within
+    the debounce window, harakiri) or that failed is picked up again by resume().
+    """
+
+    def __init__(self, name: str, refresh: Callable[..., None], delay: float):
+        self.name = name
+        self.refresh = refresh
+        self.delay = delay
+        self.pending = 0
+        self.dirty = set()
+        # None when all links are dirty
+        self.link_nrs = set()
+        # the pk's of the RefreshOpdracht rows of the dirty models
+        self.jobs = set()
+        self.deadline = 0.0
+        self.last_duration = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def schedule(self, model, link_nrs=None):
+        """
+        Mark model dirty, the refresh is scheduled when the transaction is committed
+        :param model: the changed model
+        :param link_nrs: the links changed by the model, None for all links
+        :return:
+        """
+        if link_nrs is not None:
+            link_nrs = {int(float(link_nr)) for link_nr in link_nrs if link_nr not in (None, "")}
+        job = RefreshOpdracht.objects.create(
+            naam=self.name,
+            model=model._meta.label,
+            link_nrs=None if link_nrs is None else sorted(link_nrs),
+        )
+        transaction.on_commit(lambda: self._request(model, link_nrs, job.pk))
+
+    def resume(self) -> int:
+        """
+        Schedule the refreshes that are still pending in the database
+        :return: number of pending requests
+        """
+        jobs = list(RefreshOpdracht.objects.filter(naam=self.name).order_by("pk"))
+        for job in jobs:
+            self._request(apps.get_model(job.model), job.link_nrs, job.pk)
+        return len(jobs)
+
+    def _request(self, model, link_nrs=None, job=None):
+        jobs = set() if job is None else {job}
+        if self.delay <= 0:
+            self._run(1, {model}, None if link_nrs is None else set(link_nrs), jobs)
+            return
+
+        with self._lock:
+            self.pending += 1
+            self.dirty.add(model)
+            self.jobs.update(jobs)
+            if link_nrs is None or self.link_nrs is None:
+                self.link_nrs = None
+            else:
+                self.link_nrs.update(link_nrs)
+            self.deadline = time.monotonic() + self.delay
+            log.info(f"refresh {self.name} scheduled, queue depth {self.pending}")
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name=f"refresh-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _take(self) -> tuple[int, set, set | None, set]:
+        # the caller holds the lock
+        taken = (self.pending, self.dirty, self.link_nrs, self.jobs)
+        self.pending, self.dirty, self.link_nrs, self.jobs = 0, set(), set(), set()
+        return taken
+
+    def _worker(self):
+        try:
+            while True:
+                with self._lock:
+                    wait = self.deadline - time.monotonic()
+                    if wait <= 0:
+                        pending, dirty, link_nrs, jobs = self._take()
+                        if pending == 0:
+                            self._thread = None
+                            return
+
+                if wait > 0:
+                    time.sleep(wait)
+                else:
+                    self._run(pending, dirty, link_nrs, jobs)
+        finally:
+            # the thread has its own database connection
+            connections.close_all()
+
+    def _run(self, pending: int, dirty: set, link_nrs: set | None, jobs: set):
+        start = time.monotonic()
+        try:
+            self.refresh(*sorted(dirty, key=lambda model: model.__name__), link_nrs=link_nrs)
+            if jobs:
+                RefreshOpdracht.objects.filter(pk__in=jobs).delete()
+        except Exception:
+            # the jobs are kept, see resume()
+            log.exception(f"refresh {self.name} failed, {pending} request(s) coalesced")
+            return
+
+        self.last_duration = time.monotonic() - start
+        log.info(f"refresh {self.name} took {self.last_duration:.1f}s, {pending} request(s) coalesced")
+
+    def flush(self):
+        """
+        Run a pending refresh now, in the calling thread
+        :return:
+        """
+        with self._lock:
+            pending, dirty, link_nrs, jobs = self._take()
+        if pending:
+            self._run(pending, dirty, link_nrs, jobs)
+
+    def stats(self) -> dict:
+        """
+        Queue depth and duration of the last refresh
+        :return:
+        """
+        with self._lock:
+            return {
+                "name": self.name,
+                "pending": self.pending,
+                "dirty": sorted(model.__name__ for model in self.dirty),
+                "link_nrs": None if self.link_nrs is None else len(self.link_nrs),
+                "running": self._thread is not None,
+                "last_duration": self.last_duration,
+            }
+
+
+network_scheduler = RefreshScheduler("network", refresh_network, settings.REFRESH_DEBOUNCE)
+
+
+def _refresh_reachability(*models, link_nrs=None):
+    refresh_reachability()
+
+
+# recomputing the stored profiles takes long, it is never run in the request that refreshed the network
+reachability_scheduler = RefreshScheduler("reachability", _refresh_reachability, settings.REFRESH_DEBOUNCE)
+
+
+def resume_pending() -> None:
+    """
+    Schedule the refreshes that a previous worker left pending, called when a worker starts
+    """
+    try:
+        for scheduler in (network_scheduler, reachability_scheduler):
+            count = scheduler.resume()
+            if count:
+                log.info(f"refresh {scheduler.name} resumed, {count} pending request(s)")
+    except DatabaseError:
+        log.exception("pending refreshes could not be resumed")
@@ -2,7 +2,10 @@ from django.contrib.gis.geos import GEOSGeometry
 from import_export.resources import ModelResource
 
 from bereikbaarheid.models import Gebied
-from bereikbaarheid.resources.utils import refresh_materialized
+from bereikbaarheid.resources.utils import (
+    import_has_changes,
+    refresh_network,
+)
 
 
 class GebiedResource(ModelResource):
@@ -13,10 +16,8 @@ class GebiedResource(ModelResource):
         # import_export Version 4 change: param dry-run passed in kwargs
         # refresh materialized vieuws when dry_run = False
         dry_run = kwargs.get("dry_run", False)
-        if not dry_run:
-            refresh_materialized("bereikbaarheid_out_vma_undirected")
-            refresh_materialized("bereikbaarheid_out_vma_directed")
-            refresh_materialized("bereikbaarheid_out_vma_node")
+        if not dry_run and import_has_changes(result):
+            refresh_network(Gebied)
 
     class Meta:
         model = Gebied
@@ -0,0 +1,118 @@
+import codecs
+import io
+import json
+from typing import Iterator
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+
+
+class _Reader:
+    """
+    Buffer over a text or binary stream that decodes one json value at a time,
+    only the not yet decoded part of the stream is kept in memory
+    """
+
+    def __init__(self, in_stream, chunk_size: int = CHUNK_SIZE):
+        if isinstance(in_stream, str):
+            in_stream = io.StringIO(in_stream)
+        elif isinstance(in_stream, (bytes, bytearray)):
+            in_stream = io.BytesIO(in_stream)
+
+        self._stream = in_stream
+        self._chunk_size = chunk_size
+        self._utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int = None) -> bool:
+        if self._eof:
+            return False
+
+        chunk = self._stream.read(size or self._chunk_size)
+        if isinstance(chunk, bytes):
+            chunk = self._utf8.decode(chunk, final=not chunk)
+        if not chunk:
+            self._eof = True
+
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return not self._eof
+
+    def peek(self) -> str:
+        """
+        The next character that is not whitespace, empty at the end of the stream
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _whitespace:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos : self._pos + 1]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"invalid geojson: expected `{char}` at `{self._buffer[self._pos : self._pos + 20]}`")
+        self._pos += 1
+
+    def value(self):
+        """
+        Decode the next json value, more of the stream is read until it is complete
+        The read size doubles each time, a large value is not decoded again for each chunk
+        """
+        self.peek()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+                # a number at the end of the buffer might continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill(size)
+            size *= 2
+
+
+def iter_features(in_stream, members: dict = None, chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """
+    The features of a geojson FeatureCollection, decoded one at a time while the stream is read
+
+    The other members of the collection (e.g. crs) are stored in members when they are read,
+    the ones before "features" are known when the first feature is yielded
+    :param in_stream: text or binary file, str or bytes
+    :param members: dict for the other members of the FeatureCollection
+    :param chunk_size: number of characters/bytes read at a time
+    :return:
+    """
+    members = {} if members is None else members
+    reader = _Reader(in_stream, chunk_size)
+
+    reader.expect("{")
+    first = True
+    while reader.peek() != "}":
+        if not first:
+            reader.expect(",")
+        first = False
+
+        key = reader.value()
+        reader.expect(":")
+
+        if key != "features":
+            members[key] = reader.value()
+            continue
+
+        reader.expect("[")
+        first_feature = True
+        while reader.peek() != "]":
+            if not first_feature:
+                reader.expect(",")
+            first_feature = False
+            yield reader.value()
+        reader.expect("]")
+
+    reader.expect("}")
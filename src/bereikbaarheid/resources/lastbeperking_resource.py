@@ -2,13 +2,17 @@ from import_export.resources import ModelResource
 
 from bereikbaarheid.models import Lastbeperking
 from bereikbaarheid.resources.utils import (
+    ImportDiffMixin,
     clean_dataset_headers,
     convert_str,
-    refresh_materialized,
+    import_has_changes,
+    refresh_network,
 )
 
 
-class LastbeperkingResource(ModelResource):
+class LastbeperkingResource(ImportDiffMixin, ModelResource):
+    link_field = "link_nr"
+
     def before_import(self, dataset, **kwargs):
         col_mapping = {
             "linknr": "link_nr",
@@ -38,10 +42,8 @@ class LastbeperkingResource(ModelResource):
         # import_export Version 4 change: param dry-run passed in kwargs
         # refresh materialized vieuws when dry_run = False
         dry_run = kwargs.get("dry_run", False)
-        if not dry_run:
-            refresh_materialized("bereikbaarheid_out_vma_undirected")
-            refresh_materialized("bereikbaarheid_out_vma_directed")
-            refresh_materialized("bereikbaarheid_out_vma_node")
+        if not dry_run and import_has_changes(result):
+            refresh_network(Lastbeperking, link_nrs=self.changed_link_nrs)
 
     class Meta:
         model = Lastbeperking
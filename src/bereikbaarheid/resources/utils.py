@@ -1,12 +1,69 @@
 import csv
 import datetime
-import json
+import logging
+from graphlib import TopologicalSorter
 
-import pandas as pd
 import tablib
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import connection
+from django.db import DatabaseError, IntegrityError, connection, transaction
 from import_export.formats.base_formats import CSV, TablibFormat
+from import_export.results import RowResult
+
+from bereikbaarheid.cache import clear_response_caches
+from bereikbaarheid.models import BereikbareKnopen, Gebied, Lastbeperking, VenstertijdWeg, VerkeersBord, Verrijking, Vma
+from bereikbaarheid.resources.geojson_stream import iter_features
+from bereikbaarheid.routing import reset_bollard_network, reset_network, reset_snapper
+from bereikbaarheid.versioning import bump_network_version
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CRS = {
+    "type": "name",
+    "properties": {"name": "urn:ogc:def:crs:EPSG::28992"},
+}
+
+UNDIRECTED_VIEW = "bereikbaarheid_out_vma_undirected"
+# a table maintained per link, see update_directed, with its definition in DIRECTED_SOURCE_VIEW
+DIRECTED_VIEW = "bereikbaarheid_out_vma_directed"
+DIRECTED_SOURCE_VIEW = "bereikbaarheid_out_vma_directed_source"
+NODE_VIEW = "bereikbaarheid_out_vma_node"
+LOAD_UNLOAD_VIEW = "bereikbaarheid_out_load_unload"
+
+# the columns of the unique index of each materialized view, REFRESH ... CONCURRENTLY needs it
+UNIQUE_KEYS = {
+    UNDIRECTED_VIEW: "link_nr",
+    NODE_VIEW: "node, geom, geom_28992",
+    LOAD_UNLOAD_VIEW: "id",
+}
+
+# the tables and views each materialized view (and the directed network table) is selected from
+VIEW_DEPENDENCIES = {
+    UNDIRECTED_VIEW: (Vma._meta.db_table, Gebied._meta.db_table, Verrijking._meta.db_table),
+    DIRECTED_VIEW: (UNDIRECTED_VIEW, VerkeersBord._meta.db_table, Lastbeperking._meta.db_table),
+    NODE_VIEW: (DIRECTED_VIEW,),
+    LOAD_UNLOAD_VIEW: (VenstertijdWeg._meta.db_table, UNDIRECTED_VIEW, VerkeersBord._meta.db_table),
+}
+
+# materialized views of the road network, in order of dependency
+NETWORK_VIEWS = tuple(view for view in TopologicalSorter(VIEW_DEPENDENCIES).static_order() if view in VIEW_DEPENDENCIES)
+
+# the node view only changes when the topology of the directed view changes
+raw_query_topology_checksum = f"""
+    SELECT md5(string_agg(concat_ws(',', source, target, st_astext(geom)), ';' ORDER BY id))
+    FROM {DIRECTED_VIEW}
+    """
+
+raw_query_rebuild_directed = f"""
+    DELETE FROM {DIRECTED_VIEW};
+    INSERT INTO {DIRECTED_VIEW} SELECT * FROM {DIRECTED_SOURCE_VIEW};
+    """
+
+# both directions of a link: id = link_nr and id = -link_nr
+raw_query_update_directed = f"""
+    DELETE FROM {DIRECTED_VIEW} WHERE id = ANY(%(ids)s);
+    INSERT INTO {DIRECTED_VIEW} SELECT * FROM {DIRECTED_SOURCE_VIEW} WHERE id = ANY(%(ids)s);
+    """
 
 
 class GEOJSON(TablibFormat):
@@ -16,40 +73,52 @@ class GEOJSON(TablibFormat):
     def create_dataset(self, in_stream, **kwargs):
         """
         Create tablib.dataset from geojson.
+
+        The features are parsed one at a time while the file is read (see geojson_stream),
+        the file is never decoded as a whole. It is read twice: first for the headers, the properties
+        of all the features and geom, and the crs, which can follow the features in the file.
+        Then the rows are appended, a property that is missing in a feature is None.
         """
 
         if isinstance(in_stream, dict):
-            data = in_stream
+            members = in_stream
+
+            def features():
+                return iter(in_stream["features"])
+
         else:
-            data = json.load(tablib.utils.normalize_input(in_stream))
+            stream = tablib.utils.normalize_input(in_stream)
+            if not stream.seekable():
+                stream = tablib.utils.normalize_input(stream.read())
+            start = stream.tell()
+            members = {}
 
-        try:
-            crs = data["crs"]
-        except Exception:  # if not in Geojson -> default crs RD
-            crs = {
-                "type": "name",
-                "properties": {"name": "urn:ogc:def:crs:EPSG::28992"},
-            }
-
-        df = data["features"]
-        tmp = pd.DataFrame.from_records(df)
-        df_properties = pd.DataFrame.from_records(tmp["properties"])
-
-        # adds crs to geometry field -> necessary for function GEOSGeometry in resource.py
-        # function GEOSGeometry has a bug at this moment (6-3-2023) when reading geojson geometry-field;
-        # it defaults always to srid=4326 while we need srid=28992.
-        # solution: add crs of the geojson to the geometry-field.
-        tmp_list = []
-        for feature in df:
-            geometry = feature["geometry"]
-            geometry["crs"] = crs
-            tmp_list.append(str(geometry))
+            def features():
+                stream.seek(start)
+                return iter_features(stream, members)
+
+        headers = {}
+        for feature in features():
+            headers.update(dict.fromkeys(feature["properties"] or {}))
 
-        # json-field "geometry" is saved in tablib-field "geom"
-        df_properties["geom"] = tmp_list
+        # if not in Geojson -> default crs RD
+        crs = members.get("crs", DEFAULT_CRS)
 
         _dset = tablib.Dataset()
-        _dset.dict = df_properties.to_dict(orient="records")
+        for feature in features():
+            if not _dset.headers:
+                # json-field "geometry" is saved in tablib-field "geom"
+                _dset.headers = [*headers, "geom"]
+
+            # adds crs to geometry field -> necessary for function GEOSGeometry in resource.py
+            # function GEOSGeometry has a bug at this moment (6-3-2023) when reading geojson geometry-field;
+            # it defaults always to srid=4326 while we need srid=28992.
+            # solution: add crs of the geojson to the geometry-field.
+            geometry = feature["geometry"]
+            geometry["crs"] = crs
+
+            properties = feature["properties"] or {}
+            _dset.append([*(properties.get(header) for header in headers), str(geometry)])
 
         return _dset
 
@@ -109,17 +178,211 @@ def truncate(model):
         cursor.execute(raw_query, {})
 
 
-def refresh_materialized(db_table: str):
+# import types of the rows that change the table
+CHANGED_IMPORT_TYPES = (RowResult.IMPORT_TYPE_NEW, RowResult.IMPORT_TYPE_UPDATE, RowResult.IMPORT_TYPE_DELETE)
+
+
+def import_has_changes(result) -> bool:
+    """
+    True when the import has added, changed or deleted rows,
+    rows that are equal to the stored row are skipped (skip_unchanged)
+    """
+    return any(result.totals[import_type] for import_type in CHANGED_IMPORT_TYPES)
+
+
+class ImportDiffMixin:
+    """
+    Collects the links of the rows an import changes, the link before and after the change.
+    The resource refreshes only these links of the directed network and nothing
+    when no row has changed, use as follows:
+
+    def after_import(self, dataset, result, **kwargs):
+        dry_run = kwargs.get("dry_run", False)
+        if not dry_run and import_has_changes(result):
+            refresh_network(Model, link_nrs=self.changed_link_nrs)
+    """
+
+    link_field = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.changed_link_nrs = set()
+
+    def after_import_row(self, row, row_result, **kwargs):
+        super().after_import_row(row, row_result, **kwargs)
+        if row_result.import_type not in CHANGED_IMPORT_TYPES:
+            return
+
+        self.changed_link_nrs.add(row.get(self.link_field))
+        if row_result.original is not None:
+            self.changed_link_nrs.add(getattr(row_result.original, self.link_field))
+
+
+def _duplicate_keys(db_table: str, limit: int = 20) -> list[tuple]:
+    """
+    the keys of the unique index of materialized view db_table that its definition selects more than once
+    """
+    key = UNIQUE_KEYS.get(db_table)
+    if key is None:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_get_viewdef(%(db_table)s::regclass)", {"db_table": db_table})
+        definition = cursor.fetchone()[0].strip().rstrip(";")
+        # without parameters, the definition itself may contain %
+        cursor.execute(f"SELECT {key} FROM ({definition}) v GROUP BY {key} HAVING count(*) > 1 LIMIT {int(limit)}")
+        return cursor.fetchall()
+
+
+def refresh_materialized(db_table: str, concurrently: bool = None):
     """
     refreshes materialized view db_table
+
+    With concurrently (default settings.REFRESH_CONCURRENTLY) readers keep using the
+    old rows during the refresh. This needs a unique index on the view (see migrations
+    0016_unique_undirected_view and 0017_unique_view_indexes), when it is not possible
+    the view is refreshed without.
+    When the new rows violate the unique index the refresh fails, the duplicate keys are logged.
     """
+    if concurrently is None:
+        concurrently = settings.REFRESH_CONCURRENTLY
 
-    raw_query = f"""
-        REFRESH MATERIALIZED VIEW {db_table}
-        """
+    refreshed = False
+
+    if concurrently:
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {db_table}", {})
+            refreshed = True
+        except DatabaseError as e:
+            log.warning(f"refresh concurrently of {db_table} not possible, refreshing without: {e}")
+
+    if not refreshed:
+        raw_query = f"""
+            REFRESH MATERIALIZED VIEW {db_table}
+            """
+
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(raw_query, {})
+        except IntegrityError as e:
+            log.error(f"{db_table} is not refreshed, it is no longer unique: {e}")
+            log.error(f"duplicate keys of {db_table} ({UNIQUE_KEYS.get(db_table)}): {_duplicate_keys(db_table)}")
+            raise
+
+    _reset_derived()
+
+
+def _reset_derived():
+    # the in-memory routing network, snapping indexes and responses are built from the network views,
+    # they are reset once the refresh is committed so they are not rebuilt from the old rows
+    def reset():
+        reset_network()
+        reset_bollard_network()
+        reset_snapper()
+        clear_response_caches()
+
+    transaction.on_commit(reset)
+
+
+def rebuild_directed():
+    """
+    rebuilds the directed network table from its definition,
+    readers keep using the old rows until the rebuild is committed
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(raw_query_rebuild_directed, {})
+
+    _reset_derived()
+
+
+def update_directed(link_nrs):
+    """
+    recomputes the rows of the directed network table of link_nrs, in both directions
+    :param link_nrs: the changed links, the sign is ignored
+    """
+    link_nrs = {abs(int(float(link_nr))) for link_nr in link_nrs if link_nr not in (None, "")} - {0}
+    if not link_nrs:
+        return
 
+    ids = sorted(link_nrs | {-link_nr for link_nr in link_nrs})
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(raw_query_update_directed, {"ids": ids})
+
+    log.info(f"updated {len(ids)} rows of {DIRECTED_VIEW}")
+    _reset_derived()
+
+
+def dependent_views(db_tables) -> list[str]:
+    """
+    the materialized views that are (indirectly) selected from db_tables, in order of dependency
+    :param db_tables: changed tables or views
+    :return:
+    """
+    changed = set(db_tables)
+    views = []
+
+    for view in NETWORK_VIEWS:
+        if changed.intersection(VIEW_DEPENDENCIES[view]):
+            views.append(view)
+            changed.add(view)
+
+    return views
+
+
+def topology_checksum() -> str | None:
     with connection.cursor() as cursor:
-        cursor.execute(raw_query, {})
+        cursor.execute(raw_query_topology_checksum, {})
+        return cursor.fetchone()[0]
+
+
+def refresh_network(*models, link_nrs=None):
+    """
+    refreshes the materialized views that depend on the changed models,
+    all views when no models are given. The reachability that is precomputed from them
+    is recomputed afterwards in the background (reachability_scheduler)
+
+    With link_nrs only those links of the directed network are recomputed instead of all.
+    The node view is skipped when the topology of the directed network is unchanged,
+    which is only possible when the undirected view has changed.
+    :param models: the changed models
+    :param link_nrs: the links changed by the models, None for all links
+    :return: the refreshed views
+    """
+    if models:
+        views = dependent_views(model._meta.db_table for model in models)
+    else:
+        views = list(NETWORK_VIEWS)
+
+    checksum = None
+    if UNDIRECTED_VIEW in views and DIRECTED_VIEW in views and NODE_VIEW in views:
+        checksum = topology_checksum()
+
+    refreshed = []
+    for db_table in views:
+        if db_table == NODE_VIEW and (
+            UNDIRECTED_VIEW not in views or (checksum is not None and checksum == topology_checksum())
+        ):
+            log.info(f"topology unchanged, skipping refresh of {db_table}")
+            continue
+
+        if db_table == DIRECTED_VIEW:
+            if link_nrs is None:
+                rebuild_directed()
+            else:
+                update_directed(link_nrs)
+        else:
+            refresh_materialized(db_table)
+        refreshed.append(db_table)
+
+    if DIRECTED_VIEW in refreshed:
+        # imported here, bereikbaarheid.refresh imports this module
+        from bereikbaarheid.refresh import reachability_scheduler
+
+        reachability_scheduler.schedule(BereikbareKnopen)
+    bump_network_version()
+
+    return refreshed
 
 
 # -------------------------------------------
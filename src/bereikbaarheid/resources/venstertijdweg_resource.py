@@ -4,6 +4,8 @@ from bereikbaarheid.models import VenstertijdWeg
 from bereikbaarheid.resources.utils import (
     clean_dataset_headers,
     convert_to_time,
+    import_has_changes,
+    refresh_network,
     remove_chars_from_value,
 )
 
@@ -33,6 +35,18 @@ class VenstertijdWegResource(ModelResource):
 
         return super().skip_row(instance, original, row, import_validation_errors)
 
+    def before_save_instance(self, instance, row, **kwargs):
+        # import_export Version 4 change: param dry-run passed in kwargs
+        # during 'confirm' step, dry_run is True
+        instance.dry_run = kwargs.get("dry_run", False)
+
+    def after_import(self, dataset, result, **kwargs):
+        # import_export Version 4 change: param dry-run passed in kwargs
+        # refresh materialized view load/unload when dry_run = False
+        dry_run = kwargs.get("dry_run", False)
+        if not dry_run and import_has_changes(result):
+            refresh_network(VenstertijdWeg)
+
     class Meta:
         model = VenstertijdWeg
         skip_unchanged = True
@@ -2,10 +2,17 @@ from django.contrib.gis.geos import GEOSGeometry
 from import_export.resources import ModelResource
 
 from bereikbaarheid.models import VerkeersBord
-from bereikbaarheid.resources.utils import clean_dataset_headers, refresh_materialized
+from bereikbaarheid.resources.utils import (
+    ImportDiffMixin,
+    clean_dataset_headers,
+    import_has_changes,
+    refresh_network,
+)
 
 
-class VerkeersBordResource(ModelResource):
+class VerkeersBordResource(ImportDiffMixin, ModelResource):
+    link_field = "link_gevalideerd"
+
     def before_import(self, dataset, **kwargs):
         col_mapping = {
             "script_linknr": "link_nr",
@@ -34,10 +41,8 @@ class VerkeersBordResource(ModelResource):
         # import_export Version 4 change: param dry-run passed in kwargs
         # refresh materialized vieuws when dry_run = False
         dry_run = kwargs.get("dry_run", False)
-        if not dry_run:
-            refresh_materialized("bereikbaarheid_out_vma_undirected")
-            refresh_materialized("bereikbaarheid_out_vma_directed")
-            refresh_materialized("bereikbaarheid_out_vma_node")
+        if not dry_run and import_has_changes(result):
+            refresh_network(VerkeersBord, link_nrs=self.changed_link_nrs)
 
     class Meta:
         model = VerkeersBord
@@ -3,8 +3,10 @@ from import_export.resources import ModelResource
 from bereikbaarheid.models import VerkeersPaal
 from bereikbaarheid.resources.utils import (
     clean_dataset_headers,
+    import_has_changes,
     remove_chars_from_value,
 )
+from bereikbaarheid.versioning import bump_network_version
 
 
 class VerkeersPaalResource(ModelResource):
@@ -26,6 +28,18 @@ class VerkeersPaalResource(ModelResource):
         if row["paal_nr"] == "None":
             row["paal_nr"] = ""
 
+    def before_save_instance(self, instance, row, **kwargs):
+        # import_export Version 4 change: param dry-run passed in kwargs
+        # during 'confirm' step, dry_run is True
+        instance.dry_run = kwargs.get("dry_run", False)
+
+    def after_import(self, dataset, result, **kwargs):
+        # import_export Version 4 change: param dry-run passed in kwargs
+        # new network version (ETag) when dry_run = False
+        dry_run = kwargs.get("dry_run", False)
+        if not dry_run and import_has_changes(result):
+            bump_network_version()
+
     class Meta:
         model = VerkeersPaal
         skip_unchanged = True
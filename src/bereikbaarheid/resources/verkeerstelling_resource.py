@@ -1,7 +1,11 @@
 from import_export.resources import ModelResource
 
 from bereikbaarheid.models import VerkeersTelling
-from bereikbaarheid.resources.utils import clean_dataset_headers
+from bereikbaarheid.resources.utils import (
+    clean_dataset_headers,
+    import_has_changes,
+)
+from bereikbaarheid.versioning import bump_network_version
 
 
 class VerkeersTellingResource(ModelResource):
@@ -17,6 +21,18 @@ class VerkeersTellingResource(ModelResource):
 
         dataset.headers = clean_dataset_headers(dataset.headers, col_mapping)
 
+    def before_save_instance(self, instance, row, **kwargs):
+        # import_export Version 4 change: param dry-run passed in kwargs
+        # during 'confirm' step, dry_run is True
+        instance.dry_run = kwargs.get("dry_run", False)
+
+    def after_import(self, dataset, result, **kwargs):
+        # import_export Version 4 change: param dry-run passed in kwargs
+        # new network version (ETag) when dry_run = False
+        dry_run = kwargs.get("dry_run", False)
+        if not dry_run and import_has_changes(result):
+            bump_network_version()
+
     class Meta:
         model = VerkeersTelling
         skip_unchanged = True
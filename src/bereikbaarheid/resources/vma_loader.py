@@ -0,0 +1,231 @@
+import io
+import json
+import logging
+from typing import Callable, Iterable, Iterator
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, transaction
+from import_export.results import Error, Result, RowResult
+
+from bereikbaarheid.models import Vma
+from bereikbaarheid.resources.utils import clean_dataset_headers, refresh_network
+
+log = logging.getLogger(__name__)
+
+STAGING_TABLE = "bereikbaarheid_vma_staging"
+
+# the columns of bereikbaarheid_vma that are imported, geom is copied as geojson
+COLUMNS = (
+    "link_nr",
+    "name",
+    "direction",
+    "length",
+    "anode",
+    "bnode",
+    "wegtypeab",
+    "wegtypeba",
+    "speedab",
+    "speedba",
+    "wegtype_ab",
+    "wegtype_ba",
+)
+
+COL_MAPPING = {
+    "linknr": "link_nr",
+}
+
+PROGRESS_INTERVAL = 10000
+
+raw_query_create_staging = f"""
+    CREATE TEMP TABLE {STAGING_TABLE} (
+        rownr integer,
+        link_nr double precision,
+        name text,
+        direction double precision,
+        length double precision,
+        anode double precision,
+        bnode double precision,
+        wegtypeab text,
+        wegtypeba text,
+        speedab double precision,
+        speedba double precision,
+        wegtype_ab text,
+        wegtype_ba text,
+        geojson text
+    ) ON COMMIT DROP
+    """
+
+raw_query_copy = f"""
+    COPY {STAGING_TABLE} (rownr, {", ".join(COLUMNS)}, geojson) FROM STDIN
+    """
+
+raw_query_validate = f"""
+    SELECT rownr, 'link_nr is missing' FROM {STAGING_TABLE} WHERE link_nr IS NULL
+    UNION ALL
+    SELECT rownr, 'geometry is missing' FROM {STAGING_TABLE} WHERE geojson IS NULL
+    UNION ALL
+    SELECT min(rownr), 'link_nr ' || link_nr || ' is not unique' FROM {STAGING_TABLE}
+    WHERE link_nr IS NOT NULL GROUP BY link_nr HAVING count(*) > 1
+    ORDER BY 1
+    LIMIT 20
+    """
+
+# a geometry that is not a (multi)linestring or not valid geojson is an error of the import
+raw_query_geometry = f"""
+    ALTER TABLE {STAGING_TABLE} ADD COLUMN geom geometry(MultiLineString, 28992);
+    UPDATE {STAGING_TABLE} SET geom = st_multi(st_setsrid(st_geomfromgeojson(geojson), 28992));
+    """
+
+
+def _row_hash(alias: str) -> str:
+    """
+    content hash of a row of bereikbaarheid_vma or the staging table, keyed by link_nr
+    """
+    return f"md5(row({', '.join(f'{alias}.{column}' for column in COLUMNS[1:])}, st_asewkb({alias}.geom))::text)"
+
+
+# only the rows that differ from the stored rows are written, each query returns the changed links
+raw_query_delete = f"""
+    DELETE FROM {Vma._meta.db_table} v
+    WHERE NOT EXISTS (SELECT FROM {STAGING_TABLE} s WHERE s.link_nr = v.link_nr)
+    RETURNING v.link_nr
+    """
+
+raw_query_update = f"""
+    UPDATE {Vma._meta.db_table} v
+    SET {", ".join(f"{column} = s.{column}" for column in COLUMNS[1:])}, geom = s.geom
+    FROM {STAGING_TABLE} s
+    WHERE s.link_nr = v.link_nr AND {_row_hash("s")} <> {_row_hash("v")}
+    RETURNING v.link_nr
+    """
+
+raw_query_insert = f"""
+    INSERT INTO {Vma._meta.db_table} ({", ".join(COLUMNS)}, geom)
+        SELECT {", ".join(f"s.{column}" for column in COLUMNS)}, s.geom FROM {STAGING_TABLE} s
+        WHERE NOT EXISTS (SELECT FROM {Vma._meta.db_table} v WHERE v.link_nr = s.link_nr)
+        ORDER BY s.rownr
+    RETURNING link_nr
+    """
+
+
+def _copy_value(value) -> str:
+    """
+    value in the text format of COPY
+    """
+    if value is None or value == "":
+        return r"\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _copy_lines(features: Iterable[dict], progress: Callable[[int], None] = None) -> Iterator[str]:
+    rownr = 0
+    for rownr, feature in enumerate(features, start=1):
+        properties = feature.get("properties") or {}
+        row = dict(zip(clean_dataset_headers(list(properties), COL_MAPPING), properties.values()))
+        geometry = feature.get("geometry")
+
+        values = [rownr, *(row.get(column) for column in COLUMNS), json.dumps(geometry) if geometry else None]
+        yield "\t".join(map(_copy_value, values)) + "\n"
+
+        if rownr % PROGRESS_INTERVAL == 0:
+            log.info(f"vma import: {rownr} features copied")
+            if progress:
+                progress(rownr)
+
+    log.info(f"vma import: {rownr} features copied")
+    if progress:
+        progress(rownr)
+
+
+class _LinesFile(io.TextIOBase):
+    """
+    Read-only file of the lines, COPY reads it in blocks
+    """
+
+    def __init__(self, lines: Iterator[str]):
+        self._lines = lines
+        self._buffer = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size is None or size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+
+        if size is None or size < 0:
+            chunk, self._buffer = self._buffer, ""
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def load_vma(features: Iterable[dict], dry_run: bool = False, progress: Callable[[int], None] = None) -> Result:
+    """
+    Replace bereikbaarheid_vma by the features
+
+    The features are copied into a staging table with COPY and validated with SQL.
+    The rows that differ from bereikbaarheid_vma (by content hash per link_nr) are deleted,
+    updated or inserted in one transaction, the network is refreshed for the changed links only.
+    With dry_run everything is done except the commit.
+    :param features: geojson features in RD (EPSG:28992)
+    :param dry_run:
+    :param progress: called with the number of copied features
+    :return: result with the totals or the errors of the import
+    """
+    result = Result()
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(raw_query_create_staging, {})
+            cursor.copy_expert(raw_query_copy, _LinesFile(_copy_lines(features, progress)))
+
+            cursor.execute(raw_query_validate, {})
+            errors = cursor.fetchall()
+            for rownr, message in errors:
+                result.append_base_error(Error(ValidationError(f"feature {rownr}: {message}"), number=rownr))
+            if errors:
+                transaction.set_rollback(True)
+                return result
+
+            cursor.execute(raw_query_geometry, {})
+
+            changed_link_nrs = set()
+            for import_type, raw_query in (
+                (RowResult.IMPORT_TYPE_DELETE, raw_query_delete),
+                (RowResult.IMPORT_TYPE_UPDATE, raw_query_update),
+                (RowResult.IMPORT_TYPE_NEW, raw_query_insert),
+            ):
+                cursor.execute(raw_query, {})
+                link_nrs = [link_nr for (link_nr,) in cursor.fetchall()]
+                result.totals[import_type] = len(link_nrs)
+                changed_link_nrs.update(link_nrs)
+
+            cursor.execute(f"SELECT count(*) FROM {STAGING_TABLE}", {})
+            result.total_rows = cursor.fetchone()[0]
+            result.totals[RowResult.IMPORT_TYPE_SKIP] = (
+                result.total_rows
+                - result.totals[RowResult.IMPORT_TYPE_UPDATE]
+                - result.totals[RowResult.IMPORT_TYPE_NEW]
+            )
+
+            if dry_run:
+                transaction.set_rollback(True)
+    except (DatabaseError, ValueError) as e:
+        # ValueError: the file is not valid geojson
+        log.error(f"vma import failed: {e}")
+        result.append_base_error(Error(e))
+        return result
+
+    if dry_run:
+        return result
+
+    if changed_link_nrs:
+        refresh_network(Vma, link_nrs=changed_link_nrs)
+    else:
+        log.info("vma import: no changes, the network is not refreshed")
+
+    return result
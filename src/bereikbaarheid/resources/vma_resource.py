@@ -5,7 +5,7 @@ from import_export.resources import ModelResource
 from bereikbaarheid.models import Vma
 from bereikbaarheid.resources.utils import (
     clean_dataset_headers,
-    refresh_materialized,
+    refresh_network,
     truncate,
 )
 
@@ -31,9 +31,7 @@ class VmaResource(ModelResource):
         # refresh materialized vieuws when dry_run = False
         dry_run = kwargs.get("dry_run", False)
         if not dry_run:
-            refresh_materialized("bereikbaarheid_out_vma_undirected")
-            refresh_materialized("bereikbaarheid_out_vma_directed")
-            refresh_materialized("bereikbaarheid_out_vma_node")
+            refresh_network(Vma)
 
     class Meta:
         model = Vma
@@ -0,0 +1,35 @@
+from .bollards import bollard_route, reset_bollard_network
+from .engine import (
+    aggregated_costs,
+    reachable_nodes,
+    reachable_nodes_per_graph,
+    reset_network,
+    use_memory_engine,
+    use_precomputed_engine,
+)
+from .reachability import reachability_profile, refresh_reachability
+from .snapping import (
+    nearest_bollard_target,
+    nearest_link,
+    nearest_node,
+    reset_snapper,
+    use_memory_snapping,
+)
+
+__all__ = [
+    "aggregated_costs",
+    "bollard_route",
+    "nearest_bollard_target",
+    "nearest_link",
+    "nearest_node",
+    "reachable_nodes",
+    "reachable_nodes_per_graph",
+    "reachability_profile",
+    "refresh_reachability",
+    "reset_bollard_network",
+    "reset_network",
+    "reset_snapper",
+    "use_memory_engine",
+    "use_memory_snapping",
+    "use_precomputed_engine",
+]
@@ -0,0 +1,217 @@
+import threading
+from collections import OrderedDict
+from datetime import time
+
+import numpy as np
+from django.conf import settings
+
+from bereikbaarheid.utils import django_query_db
+from bereikbaarheid.versioning import current_network_versie
+
+from .engine import START_NODE
+from .network import Network
+
+# the network of pgr_dijkstra_cost_query in bereikbaarheid.bollards.bollards,
+# an edge is repeated for each bollard on its link
+raw_query = """
+    select v.id, v.source, v.target, v.cost,
+        v.car_network is true,
+        v.car_network is false,
+        p.paal_nr is not null,
+        p.dagen,
+        p.begin_tijd,
+        p.eind_tijd
+    from bereikbaarheid_out_vma_directed v
+    left join bereikbaarheid_verkeerspaal p
+    on abs(v.id) = abs(p.link_nr)
+    where (
+            car_network = true
+            or abs(v.id) in (
+                select link_nr from bereikbaarheid_venstertijdweg
+            )
+        )
+        and v.source is not null and v.target is not null
+"""
+
+# cost of a road section that is not accessible for cars, doubled when its bollard is blocked
+NO_CAR_COST = 10000 * 10000
+BOLLARD_FACTOR = 10000
+
+_bollard_network = None
+_bollard_network_versie = None
+_bollard_network_lock = threading.Lock()
+
+
+def _blocked(dagen: list, begin_tijd: time, eind_tijd: time, window: tuple) -> bool:
+    """
+    The bollard is blocked in the time window, the condition of pgr_dijkstra_cost_query
+    Like the SQL NULL a missing parameter never blocks
+    :param dagen: days of the bollard
+    :param begin_tijd:
+    :param eind_tijd:
+    :param window: day of the week, time from and time to, each of them can be None
+    :return:
+    """
+    day_of_the_week, time_from, time_to = window
+    return (
+        (day_of_the_week is not None and any(day is not None and day != day_of_the_week for day in dagen))
+        or (time_from is not None and begin_tijd is not None and time_from <= begin_tijd)
+        or (time_to is not None and eind_tijd is not None and time_to >= eind_tijd)
+    )
+
+
+class BollardNetwork:
+    """
+    The network of the bollard routes with a shortest path tree from START_NODE per set of blocked bollards
+
+    Only the cost of the road sections that are not accessible for cars and have a bollard
+    depends on the time window (day of the week, time from, time to). The trees of the
+    most recently used sets of blocked bollards are kept, the time windows that block the
+    same bollards share a tree. A route is then a walk back from its target.
+    """
+
+    def __init__(self, network: Network, maxsize: int):
+        """
+        :param network: with the attributes of raw_query
+        :param maxsize: maximum number of trees, the least recently used is evicted first
+        """
+        self.network = network
+        self.maxsize = maxsize
+        self._trees = OrderedDict()
+        self._lock = threading.Lock()
+
+        edges = network.edges
+        self._costs = edges["cost"].copy()
+        self._costs[edges["car"] & edges["bollard"]] *= BOLLARD_FACTOR
+        self._costs[edges["no_car"]] = NO_CAR_COST
+        # the only edges with a cost that depends on the time window
+        self._windowed = np.flatnonzero(edges["no_car"] & edges["bollard"])
+
+    def blocked(self, window: tuple) -> np.ndarray:
+        """
+        The edges (CSR order) with a bollard that is blocked in the time window
+        :param window: day of the week, time from and time to
+        :return:
+        """
+        edges = self.network.edges
+        return np.array(
+            [
+                edge
+                for edge in self._windowed
+                if _blocked(edges["dagen"][edge], edges["begin_tijd"][edge], edges["eind_tijd"][edge], window)
+            ],
+            dtype=np.int64,
+        )
+
+    def costs(self, window: tuple) -> np.ndarray:
+        """
+        The cost of the edges (CSR order) in the time window
+        :param window: day of the week, time from and time to
+        :return:
+        """
+        return self._blocked_costs(self.blocked(window))
+
+    def _blocked_costs(self, blocked: np.ndarray) -> np.ndarray:
+        costs = self._costs.copy()
+        costs[blocked] = 2 * NO_CAR_COST
+        return costs
+
+    def tree(self, window: tuple) -> np.ndarray:
+        """
+        The predecessors of the shortest path tree from START_NODE in the time window
+        :param window: day of the week, time from and time to
+        :return:
+        """
+        blocked = self.blocked(window)
+        key = blocked.tobytes()
+
+        with self._lock:
+            predecessors = self._trees.get(key)
+            if predecessors is not None:
+                self._trees.move_to_end(key)
+                return predecessors
+
+        _, predecessors = self.network.shortest_path_tree(START_NODE, costs=self._blocked_costs(blocked))
+        predecessors = predecessors.astype(np.int32)
+
+        with self._lock:
+            self._trees[key] = predecessors
+            self._trees.move_to_end(key)
+            while len(self._trees) > self.maxsize:
+                self._trees.popitem(last=False)
+        return predecessors
+
+    def route(self, target: int, window: tuple) -> list[int]:
+        """
+        The links of the shortest route from START_NODE to the target node, in route order
+        :param target: node id
+        :param window: day of the week, time from and time to
+        :return: link numbers
+        """
+        edges = self.network.path(self.tree(window), target)
+        return np.abs(self.network.edges["id"][edges]).tolist()
+
+
+def _load_bollard_network() -> BollardNetwork:
+    rows = django_query_db(raw_query, {})
+    columns = list(zip(*rows)) if rows else [()] * 10
+
+    def objects(column: tuple) -> np.ndarray:
+        # the days are lists, np.array would make a 2d array of them
+        values = np.empty(len(rows), dtype=object)
+        values[:] = column
+        return values
+
+    network = Network(
+        {
+            "id": np.array(columns[0], dtype=np.int64),
+            "source": np.array(columns[1], dtype=np.int64),
+            "target": np.array(columns[2], dtype=np.int64),
+            "cost": np.array(columns[3], dtype=np.float64),
+            "car": np.array(columns[4], dtype=bool),
+            "no_car": np.array(columns[5], dtype=bool),
+            "bollard": np.array(columns[6], dtype=bool),
+            "dagen": objects(columns[7]),
+            "begin_tijd": objects(columns[8]),
+            "eind_tijd": objects(columns[9]),
+        }
+    )
+    return BollardNetwork(network, settings.BOLLARD_TREE_CACHE_SIZE)
+
+
+def get_bollard_network() -> BollardNetwork:
+    """
+    The network of the bollard routes, loaded once per worker and network version
+    An import of the bollards (VerkeersPaal) only bumps the network version, the network
+    and its trees are then reloaded in every process
+    :return:
+    """
+    global _bollard_network, _bollard_network_versie
+    versie = current_network_versie()
+    with _bollard_network_lock:
+        if _bollard_network is None or _bollard_network_versie != versie:
+            _bollard_network = _load_bollard_network()
+            _bollard_network_versie = versie
+        return _bollard_network
+
+
+def reset_bollard_network() -> None:
+    """
+    Drop the loaded network and its trees, it is reloaded on the next request
+    """
+    global _bollard_network
+    with _bollard_network_lock:
+        _bollard_network = None
+
+
+def bollard_route(target: int, day_of_the_week: str = None, time_from: time = None, time_to: time = None) -> list[int]:
+    """
+    The links of the bollard route from START_NODE to the target node, like pgr_dijkstra
+    with pgr_dijkstra_cost_query the route avoids the bollards that are blocked in the time window
+    :param target: node id
+    :param day_of_the_week: e.g "di"
+    :param time_from:
+    :param time_to:
+    :return: link numbers in route order
+    """
+    return get_bollard_network().route(target, (day_of_the_week, time_from, time_to))
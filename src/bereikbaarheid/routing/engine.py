@@ -0,0 +1,226 @@
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from bereikbaarheid.utils import django_query_db
+from bereikbaarheid.versioning import current_network_versie
+
+from .network import Network
+
+ENGINE_PGROUTING = "pgrouting"
+ENGINE_MEMORY = "memory"
+ENGINE_PRECOMPUTED = "precomputed"
+
+# all reachability is calculated from this node, see the pgr_dijkstraCost queries
+START_NODE = 902205
+
+# restrictions with a threshold value (length, width, height, axle and total weight)
+THRESHOLD_COLUMNS = ("c17", "c18", "c19", "c20", "c21")
+# restrictions that depend on the vehicle type (bedrijfsauto, bus, trailer)
+SIGN_COLUMNS = ("c07", "c07a", "c10")
+
+raw_query = """
+    select id, source, target, cost,
+        c01, c07, c07a, c10,
+        c17, c18, c19, c20, c21
+    from bereikbaarheid_out_vma_directed
+    where source is not null and target is not null
+"""
+
+_network = None
+_network_versie = None
+_network_lock = threading.Lock()
+
+
+def use_memory_engine() -> bool:
+    return settings.ROUTING_ENGINE == ENGINE_MEMORY
+
+
+def use_precomputed_engine() -> bool:
+    return settings.ROUTING_ENGINE == ENGINE_PRECOMPUTED
+
+
+def _load_network() -> Network:
+    """
+    Load bereikbaarheid_out_vma_directed into a CSR network
+    NULL restriction values (c17 - c21) become NaN
+    :return:
+    """
+    rows = django_query_db(raw_query, {})
+    columns = list(zip(*rows)) if rows else [()] * 13
+    return Network(
+        {
+            "id": np.array(columns[0], dtype=np.int64),
+            "source": np.array(columns[1], dtype=np.int64),
+            "target": np.array(columns[2], dtype=np.int64),
+            "cost": np.array(columns[3], dtype=np.float64),
+            "c01": np.array(columns[4], dtype=bool),
+            "c07": np.array(columns[5], dtype=bool),
+            "c07a": np.array(columns[6], dtype=bool),
+            "c10": np.array(columns[7], dtype=bool),
+            "c17": np.array(columns[8], dtype=np.float64),
+            "c18": np.array(columns[9], dtype=np.float64),
+            "c19": np.array(columns[10], dtype=np.float64),
+            "c20": np.array(columns[11], dtype=np.float64),
+            "c21": np.array(columns[12], dtype=np.float64),
+        }
+    )
+
+
+def get_network() -> Network:
+    """
+    The directed network, loaded once per worker and network version
+    :return:
+    """
+    global _network, _network_versie
+    versie = current_network_versie()
+    with _network_lock:
+        if _network is None or _network_versie != versie:
+            _network = _load_network()
+            _network_versie = versie
+        return _network
+
+
+def reset_network() -> None:
+    """
+    Drop the loaded network, it is reloaded on the next request
+    """
+    global _network
+    with _network_lock:
+        _network = None
+
+
+def vehicle_profile(
+    edges: dict[str, np.ndarray],
+    data: dict,
+    dimension_margin: float = 0.0,
+    weight_margin: float = 0.0,
+    positive_cost_only: bool = False,
+) -> dict:
+    """
+    Quantize the vehicle to the restrictions that are present in the network
+
+    Every vehicle with the same profile is allowed on exactly the same edges.
+    For c17 - c21 the profile holds the highest threshold in the network the
+    vehicle does not fit under (None if it fits under all of them), the
+    c07, c07a and c10 values tell if these signs apply to the vehicle.
+    :param edges: edge attributes of the network
+    :param data: serialized vehicle properties
+    :param dimension_margin: subtracted from length, width and height before comparing
+    :param weight_margin: subtracted from axle and total weight before comparing
+    :param positive_cost_only: only use edges with a cost above 0
+    :return:
+    """
+    profile = {}
+
+    for column, key, margin in (
+        ("c17", "lengte", dimension_margin),
+        ("c18", "breedte", dimension_margin),
+        ("c19", "hoogte", dimension_margin),
+        ("c20", "aslast_gewicht", weight_margin),
+        ("c21", "totaal_gewicht", weight_margin),
+    ):
+        thresholds = np.unique(edges[column][~np.isnan(edges[column])])
+        index = int(np.searchsorted(thresholds, data[key] - margin, side="right"))
+        profile[column] = float(thresholds[index - 1]) if index else None
+
+    profile["c07"] = bool(data["bedrijfsauto"] and data["max_massa"] > 3500)
+    profile["c07a"] = bool(data["bus"])
+    profile["c10"] = bool(data["aanhanger"])
+    profile["positive_cost_only"] = positive_cost_only
+    return profile
+
+
+def profile_mask(edges: dict[str, np.ndarray], profile: dict) -> np.ndarray:
+    """
+    Edges a vehicle with the profile is allowed to use, the equivalent of
+    the edge filter in the pgr_dijkstraCost queries
+    :param edges: edge attributes of the network
+    :param profile: see vehicle_profile
+    :return: boolean array of allowed edges
+    """
+    mask = ~edges["c01"]
+
+    for column in THRESHOLD_COLUMNS:
+        if profile[column] is not None:
+            mask &= np.isnan(edges[column]) | (edges[column] > profile[column])
+
+    for column in SIGN_COLUMNS:
+        if profile[column]:
+            mask &= ~edges[column]
+
+    if profile["positive_cost_only"]:
+        mask &= edges["cost"] > 0
+
+    return mask
+
+
+def restriction_mask(edges: dict[str, np.ndarray], data: dict, **profile_options) -> np.ndarray:
+    """
+    Edges the vehicle is allowed to use
+    :param edges: edge attributes of the network
+    :param data: serialized vehicle properties
+    :param profile_options: see vehicle_profile
+    :return: boolean array of allowed edges
+    """
+    return profile_mask(edges, vehicle_profile(edges, data, **profile_options))
+
+
+def profile_reachable_nodes(profile: dict) -> list[int]:
+    """
+    Nodes reachable from START_NODE for a vehicle with the profile
+    Like pgr_dijkstraCost the start node itself is not part of the result
+    :param profile: see vehicle_profile
+    :return:
+    """
+    network = get_network()
+    agg_costs, _ = network.shortest_path_tree(START_NODE, profile_mask(network.edges, profile))
+    reachable = np.isfinite(agg_costs)
+    reachable &= network.nodes != START_NODE
+    return network.nodes[reachable].tolist()
+
+
+def reachable_nodes(data: dict, **profile_options) -> list[int]:
+    """
+    Nodes reachable from START_NODE for the vehicle
+    :param data: serialized vehicle properties
+    :param profile_options: see vehicle_profile
+    :return:
+    """
+    return profile_reachable_nodes(vehicle_profile(get_network().edges, data, **profile_options))
+
+
+def reachable_nodes_per_graph(vehicles: list[dict], **profile_options) -> tuple[list[int], list[list[int]]]:
+    """
+    Nodes reachable from START_NODE for several vehicles, the network is searched once per graph:
+    the vehicles with the same profile are allowed on the same edges
+    :param vehicles: serialized vehicle properties
+    :param profile_options: see vehicle_profile
+    :return: the graph of every vehicle (an index in the reachable nodes) and the reachable nodes per graph
+    """
+    edges = get_network().edges
+    profiles = {}
+    graphs = []
+    for data in vehicles:
+        profile = vehicle_profile(edges, data, **profile_options)
+        graphs.append(profiles.setdefault(tuple(profile.items()), len(profiles)))
+
+    return graphs, [profile_reachable_nodes(dict(profile)) for profile in profiles]
+
+
+def aggregated_costs(source: int, max_cost: float = None) -> tuple[list[int], list[float]]:
+    """
+    Aggregated cost from the source node to every reachable node
+    Like pgr_dijkstraCost the source node itself is not part of the result,
+    with max_cost the search stops there and like pgr_drivingDistance the source node is included
+    :param source: node id
+    :param max_cost: optional cost limit
+    :return: node ids and their aggregated cost
+    """
+    network = get_network()
+    agg_costs, _ = network.shortest_path_tree(source, max_cost=max_cost)
+    reachable = np.isfinite(agg_costs)
+    if max_cost is None:
+        reachable &= network.nodes != source
+    return network.nodes[reachable].tolist(), agg_costs[reachable].tolist()
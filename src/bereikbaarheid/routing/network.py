@@ -0,0 +1,116 @@
+import heapq
+import math
+
+import numpy as np
+
+
+class Network:
+    """
+    Directed road network in compressed sparse row (CSR) form
+
+    The outgoing edges of node index i are stored at positions
+    offsets[i]:offsets[i + 1] of the edge arrays. All edge attributes
+    passed to the constructor are reordered into that CSR order and
+    are available in `edges`, so boolean masks computed on them can be
+    passed directly to `shortest_path_tree`.
+    """
+
+    def __init__(self, edges: dict[str, np.ndarray]):
+        """
+        :param edges: edge attributes, at least "id", "source", "target" and "cost"
+        """
+        n_edges = len(edges["source"])
+        self.nodes, node_indices = np.unique(
+            np.concatenate([edges["source"], edges["target"]]),
+            return_inverse=True,
+        )
+        source_indices = node_indices[:n_edges]
+        order = np.argsort(source_indices, kind="stable")
+
+        self.edges = {name: np.asarray(values)[order] for name, values in edges.items()}
+        self.sources = source_indices[order]
+        self.targets = node_indices[n_edges:][order]
+        self.offsets = np.zeros(len(self.nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source_indices, minlength=len(self.nodes)), out=self.offsets[1:])
+
+        # plain lists are considerably faster than numpy scalars in the Dijkstra loop
+        self._offsets = self.offsets.tolist()
+        self._targets = self.targets.tolist()
+        self._costs = np.asarray(self.edges["cost"], dtype=np.float64).tolist()
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def node_index(self, node: int) -> int | None:
+        """
+        Index of the node id in the network, None when the node is unknown
+        """
+        index = int(np.searchsorted(self.nodes, node))
+        if index < len(self.nodes) and self.nodes[index] == node:
+            return index
+        return None
+
+    def shortest_path_tree(
+        self, source: int, mask: np.ndarray = None, max_cost: float = None, costs: np.ndarray = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Dijkstra from the source node to all nodes in the network
+
+        Like pgRouting, edges with a negative cost are ignored.
+        :param source: node id to start from
+        :param mask: optional boolean array (CSR order) of the edges that may be used
+        :param max_cost: optional cost limit, the search stops expanding beyond it
+        :param costs: optional cost of the edges (CSR order) instead of their "cost" attribute
+        :return: aggregated cost per node index (inf when unreachable) and
+            the CSR position of the edge used to reach each node (-1 when none)
+        """
+        n_nodes = len(self.nodes)
+        agg_costs = [math.inf] * n_nodes
+        predecessors = [-1] * n_nodes
+
+        start = self.node_index(source)
+        if start is not None:
+            offsets, targets = self._offsets, self._targets
+            costs = self._costs if costs is None else np.asarray(costs, dtype=np.float64).tolist()
+            allowed = mask.tolist() if mask is not None else None
+            limit = math.inf if max_cost is None else max_cost
+
+            agg_costs[start] = 0.0
+            heap = [(0.0, start)]
+            while heap:
+                agg_cost, node = heapq.heappop(heap)
+                if agg_cost > agg_costs[node]:
+                    continue
+
+                for edge in range(offsets[node], offsets[node + 1]):
+                    cost = costs[edge]
+                    if cost < 0 or (allowed is not None and not allowed[edge]):
+                        continue
+
+                    new_cost = agg_cost + cost
+                    target = targets[edge]
+                    if new_cost < agg_costs[target] and new_cost <= limit:
+                        agg_costs[target] = new_cost
+                        predecessors[target] = edge
+                        heapq.heappush(heap, (new_cost, target))
+
+        return np.array(agg_costs), np.array(predecessors, dtype=np.int64)
+
+    def path(self, predecessors: np.ndarray, target: int) -> list[int]:
+        """
+        The edges from the source of a shortest path tree to the target node, in route order
+        :param predecessors: of shortest_path_tree
+        :param target: node id
+        :return: CSR positions of the edges, empty when the target is not reached or is the source
+        """
+        index = self.node_index(target)
+        if index is None:
+            return []
+
+        edges = []
+        edge = int(predecessors[index])
+        while edge >= 0:
+            edges.append(edge)
+            edge = int(predecessors[self.sources[edge]])
+        edges.reverse()
+        return edges
@@ -0,0 +1,100 @@
+import itertools
+import json
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from bereikbaarheid.models import BereikbareKnopen
+from bereikbaarheid.versioning import current_network_versie
+
+from .engine import (
+    SIGN_COLUMNS,
+    THRESHOLD_COLUMNS,
+    get_network,
+    profile_reachable_nodes,
+    use_precomputed_engine,
+    vehicle_profile,
+)
+
+
+def profile_key(profile: dict) -> str:
+    """
+    The profile as stored in BereikbareKnopen.profiel
+    :param profile: see vehicle_profile
+    :return:
+    """
+    return json.dumps(profile, sort_keys=True, separators=(",", ":"))
+
+
+def reachability_profile(data: dict, **profile_options) -> str | None:
+    """
+    Map the vehicle to its profile, only the profiles stored by precompute_reachability
+    for the current network version are looked up: a request never computes or stores a profile.
+    After a refresh of the network the profiles are stale until refresh_reachability has recomputed them
+    :param data: serialized vehicle properties
+    :param profile_options: see vehicle_profile
+    :return: the profile key to look up in bereikbaarheid_bereikbareknopen, None when it is not stored or stale
+    """
+    key = profile_key(vehicle_profile(get_network().edges, data, **profile_options))
+
+    if not BereikbareKnopen.objects.filter(profiel=key, netwerk_versie=current_network_versie()).exists():
+        return None
+
+    return key
+
+
+def all_profiles(edges: dict[str, np.ndarray]) -> Iterator[dict]:
+    """
+    Every combination of the restriction thresholds present in the network
+    :param edges: edge attributes of the network
+    :return:
+    """
+    thresholds = [[None] + np.unique(edges[c][~np.isnan(edges[c])]).tolist() for c in THRESHOLD_COLUMNS]
+    flags = [(False, True)] * (len(SIGN_COLUMNS) + 1)
+    keys = (*THRESHOLD_COLUMNS, *SIGN_COLUMNS, "positive_cost_only")
+
+    for values in itertools.product(*thresholds, *flags):
+        yield dict(zip(keys, values))
+
+
+def count_profiles(edges: dict[str, np.ndarray]) -> int:
+    """
+    Number of profiles all_profiles yields
+    :param edges: edge attributes of the network
+    :return:
+    """
+    count = 2 ** (len(SIGN_COLUMNS) + 1)
+    for column in THRESHOLD_COLUMNS:
+        count *= len(np.unique(edges[column][~np.isnan(edges[column])])) + 1
+    return count
+
+
+def precompute_reachability(profiles: Iterable[dict]) -> int:
+    """
+    Compute and store the reachable nodes for the profiles, with the network version they are computed on
+    :param profiles: see vehicle_profile
+    :return: number of stored profiles
+    """
+    # the version of the network get_network loads
+    versie = current_network_versie()
+    count = 0
+    for profile in profiles:
+        BereikbareKnopen.objects.update_or_create(
+            profiel=profile_key(profile),
+            defaults={"knopen": profile_reachable_nodes(profile), "netwerk_versie": versie},
+        )
+        count += 1
+    return count
+
+
+def refresh_reachability() -> None:
+    """
+    Recompute the stored profiles after the network has changed, see reachability_scheduler
+    When the precomputed engine is not used they are removed instead
+    """
+    if not use_precomputed_engine():
+        BereikbareKnopen.objects.all().delete()
+        return
+
+    profiles = [json.loads(key) for key in BereikbareKnopen.objects.values_list("profiel", flat=True)]
+    precompute_reachability(profiles)
@@ -0,0 +1,301 @@
+import math
+import threading
+
+import numpy as np
+from django.conf import settings
+from pyproj import Transformer
+
+from bereikbaarheid.utils import django_query_db
+from bereikbaarheid.versioning import current_network_versie
+
+SNAPPING_DATABASE = "database"
+SNAPPING_MEMORY = "memory"
+
+# The raw_query_nearest_* queries are used as subqueries when snapping in the database,
+# with memory snapping the subquery is replaced by a parameter holding the snapped id
+
+# grid cell sizes, in degrees for the nodes and in meters (RD) for the roads
+NODE_CELL_SIZE = 0.001
+SEGMENT_CELL_SIZE = 100
+
+raw_query_nearest_node = """
+    select node
+    from bereikbaarheid_out_vma_node
+    order by geom <-> st_setsrid(ST_MakePoint(%(lon)s, %(lat)s), 4326)
+    limit 1
+"""
+
+# the road network used by the permits, the nearest road is returned
+# {lon} and {lat} are parameters or, when many locations are snapped in one query, columns
+raw_query_nearest_link_template = """
+    SELECT id
+    from (
+        -- index assisted (KNN) preselection of the nearest roads,
+        -- the exact distance below is only calculated for these
+        select id, geom4326
+        from bereikbaarheid_out_vma_directed
+        where id > 0 and car_network is true
+        order by geom <-> st_transform(
+            st_setsrid(ST_MakePoint({lon}, {lat}), 4326),
+            28992
+        )
+        limit 32
+    ) a
+    -- the KNN order only selects the candidates, they are ranked by the original distance
+    order by st_length(
+        st_transform(
+            st_shortestline(
+                st_setsrid(
+                    ST_MakePoint({lon}, {lat}),
+                    4326
+                ),
+                st_linemerge(a.geom4326)
+            ),
+            28992
+        )
+    ) asc
+    limit 1
+"""
+
+raw_query_nearest_link = raw_query_nearest_link_template.format(lon="%(lon)s", lat="%(lat)s")
+
+# the road network used by the bollards, the target node of the nearest road is returned
+raw_query_nearest_bollard_target = """
+    select target
+    from (
+        -- index assisted (KNN) preselection of the nearest roads,
+        -- the exact distance below is only calculated for these
+        select target, geom4326
+        from bereikbaarheid_out_vma_directed
+        where cost > 0 or car_network is false
+        order by geom <-> st_transform(
+            st_setsrid(ST_MakePoint(%(lon)s, %(lat)s), 4326),
+            28992
+        )
+        limit 32
+    ) a
+    -- the KNN order only selects the candidates, they are ranked by the original distance
+    order by st_length(
+        st_transform(
+            st_shortestline(
+                st_setsrid(
+                    ST_MakePoint(%(lon)s, %(lat)s),
+                    4326
+                ),
+                st_linemerge(a.geom4326)
+            ),
+            28992
+        )
+    ) asc
+    limit 1
+"""
+
+raw_query_nodes = """
+    select node, st_x(geom), st_y(geom)
+    from bereikbaarheid_out_vma_node
+"""
+
+raw_query_segments = """
+    select v.id,
+        v.target,
+        v.id > 0 and v.car_network is true as permits,
+        v.cost > 0 or v.car_network is false as bollards,
+        st_x(st_startpoint(s.geom)),
+        st_y(st_startpoint(s.geom)),
+        st_x(st_endpoint(s.geom)),
+        st_y(st_endpoint(s.geom))
+    from bereikbaarheid_out_vma_directed v,
+        st_dumpsegments(v.geom) s
+"""
+
+_to_rd = Transformer.from_crs("EPSG:4326", "EPSG:28992", always_xy=True)
+
+_snapper = None
+_snapper_versie = None
+_snapper_lock = threading.Lock()
+
+
+class SegmentIndex:
+    """
+    Uniform grid index over line segments (a point is a segment of length 0)
+
+    Every segment is registered in all grid cells its bounding box overlaps.
+    A lookup searches rings of cells around the cell of the location until
+    no unsearched cell can contain a segment closer than the best one found.
+    """
+
+    def __init__(self, values: np.ndarray, x1, y1, x2, y2, cell_size: float):
+        """
+        :param values: value returned for each segment
+        :param x1, y1, x2, y2: coordinates of the start and end of the segments
+        :param cell_size: size of a grid cell, in the unit of the coordinates
+        """
+        self.values = np.asarray(values)
+        self.x1, self.y1, self.x2, self.y2 = (np.asarray(c, dtype=np.float64) for c in (x1, y1, x2, y2))
+        self.cell_size = cell_size
+
+        if not len(self.values):
+            self.origin = (0.0, 0.0)
+            self.shape = (0, 0)
+            self.cell_keys = self.cell_segments = np.zeros(0, dtype=np.int64)
+            return
+
+        min_x, max_x = np.minimum(self.x1, self.x2), np.maximum(self.x1, self.x2)
+        min_y, max_y = np.minimum(self.y1, self.y2), np.maximum(self.y1, self.y2)
+        self.origin = (float(min_x.min()), float(min_y.min()))
+
+        cx0, cx1 = self._cell(min_x, 0), self._cell(max_x, 0)
+        cy0, cy1 = self._cell(min_y, 1), self._cell(max_y, 1)
+        self.shape = (int(cx1.max()) + 1, int(cy1.max()) + 1)
+
+        # one entry for every (cell, segment) combination
+        n_x = cx1 - cx0 + 1
+        counts = n_x * (cy1 - cy0 + 1)
+        segments = np.repeat(np.arange(len(self.values)), counts)
+        position = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        keys = (cx0[segments] + position % n_x[segments]) * self.shape[1] + cy0[segments] + position // n_x[segments]
+
+        order = np.argsort(keys, kind="stable")
+        self.cell_keys = keys[order]
+        self.cell_segments = segments[order]
+
+    def _cell(self, coordinate, axis: int) -> np.ndarray:
+        return np.floor((coordinate - self.origin[axis]) / self.cell_size).astype(np.int64)
+
+    def _ring(self, cx: int, cy: int, r: int) -> np.ndarray:
+        """
+        Segments registered in the cells at distance r (in cells) of the cell (cx, cy)
+        """
+        if r == 0:
+            cells = [(cx, cy)]
+        else:
+            cells = [(x, y) for x in range(cx - r, cx + r + 1) for y in (cy - r, cy + r)]
+            cells += [(x, y) for x in (cx - r, cx + r) for y in range(cy - r + 1, cy + r)]
+
+        keys = [x * self.shape[1] + y for x, y in cells if 0 <= x < self.shape[0] and 0 <= y < self.shape[1]]
+        if not keys:
+            return np.zeros(0, dtype=np.int64)
+
+        keys = np.array(keys)
+        starts = np.searchsorted(self.cell_keys, keys, side="left")
+        ends = np.searchsorted(self.cell_keys, keys, side="right")
+        return np.concatenate([self.cell_segments[s:e] for s, e in zip(starts, ends)])
+
+    def distances(self, segments: np.ndarray, x: float, y: float) -> np.ndarray:
+        """
+        Distance from (x, y) to each of the segments
+        """
+        x1, y1 = self.x1[segments], self.y1[segments]
+        dx, dy = self.x2[segments] - x1, self.y2[segments] - y1
+        length = dx * dx + dy * dy
+        t = np.clip(((x - x1) * dx + (y - y1) * dy) / np.where(length > 0, length, 1), 0, 1)
+        return np.hypot(x1 + t * dx - x, y1 + t * dy - y)
+
+    def nearest(self, x: float, y: float):
+        """
+        Value of the segment nearest to (x, y), None when the index is empty
+        """
+        if not len(self.values):
+            return None
+
+        cx = int(math.floor((x - self.origin[0]) / self.cell_size))
+        cy = int(math.floor((y - self.origin[1]) / self.cell_size))
+        max_ring = max(abs(cx), abs(cy), abs(self.shape[0] - cx), abs(self.shape[1] - cy)) + 1
+
+        best_segment, best_distance = None, math.inf
+        for r in range(max_ring + 1):
+            segments = self._ring(cx, cy, r)
+            if len(segments):
+                distances = self.distances(segments, x, y)
+                index = int(np.argmin(distances))
+                if distances[index] < best_distance:
+                    best_segment, best_distance = segments[index], float(distances[index])
+
+            # unsearched cells are at least r cells away from the location
+            if best_distance <= r * self.cell_size:
+                break
+
+        return self.values[best_segment].item()
+
+
+class Snapper:
+    """
+    Grid indexes over the nodes and roads of the materialized views
+    """
+
+    def __init__(self, nodes: list[tuple], segments: list[tuple]):
+        """
+        :param nodes: rows of raw_query_nodes
+        :param segments: rows of raw_query_segments
+        """
+        node, x, y = (np.array(c) for c in zip(*nodes)) if nodes else [np.zeros(0)] * 3
+        self.nodes = SegmentIndex(node, x, y, x, y, NODE_CELL_SIZE)
+
+        link, target, permits, bollards, x1, y1, x2, y2 = (
+            (np.array(c) for c in zip(*segments)) if segments else [np.zeros(0)] * 8
+        )
+        permits, bollards = permits.astype(bool), bollards.astype(bool)
+        self.links = SegmentIndex(link[permits], x1[permits], y1[permits], x2[permits], y2[permits], SEGMENT_CELL_SIZE)
+        self.bollard_targets = SegmentIndex(
+            target[bollards], x1[bollards], y1[bollards], x2[bollards], y2[bollards], SEGMENT_CELL_SIZE
+        )
+
+    def nearest_node(self, lat: float, lon: float) -> int | None:
+        return self.nodes.nearest(lon, lat)
+
+    def nearest_link(self, lat: float, lon: float) -> int | None:
+        return self.links.nearest(*_to_rd.transform(lon, lat))
+
+    def nearest_bollard_target(self, lat: float, lon: float) -> int | None:
+        return self.bollard_targets.nearest(*_to_rd.transform(lon, lat))
+
+
+def use_memory_snapping() -> bool:
+    return settings.SNAPPING_ENGINE == SNAPPING_MEMORY
+
+
+def get_snapper() -> Snapper:
+    """
+    The grid indexes, built once per worker and network version
+    :return:
+    """
+    global _snapper, _snapper_versie
+    versie = current_network_versie()
+    with _snapper_lock:
+        if _snapper is None or _snapper_versie != versie:
+            _snapper = Snapper(django_query_db(raw_query_nodes, {}), django_query_db(raw_query_segments, {}))
+            _snapper_versie = versie
+        return _snapper
+
+
+def reset_snapper() -> None:
+    """
+    Drop the grid indexes, they are rebuilt on the next request
+    """
+    global _snapper
+    with _snapper_lock:
+        _snapper = None
+
+
+def nearest_node(lat: float, lon: float) -> int | None:
+    """
+    Node of bereikbaarheid_out_vma_node nearest to the location,
+    the in-memory equivalent of raw_query_nearest_node
+    """
+    return get_snapper().nearest_node(lat, lon)
+
+
+def nearest_link(lat: float, lon: float) -> int | None:
+    """
+    Road (id > 0, car network) nearest to the location,
+    the in-memory equivalent of raw_query_nearest_link
+    """
+    return get_snapper().nearest_link(lat, lon)
+
+
+def nearest_bollard_target(lat: float, lon: float) -> int | None:
+    """
+    Target node of the road nearest to the location in the network used for bollards,
+    the in-memory equivalent of raw_query_nearest_bollard_target
+    """
+    return get_snapper().nearest_bollard_target(lat, lon)
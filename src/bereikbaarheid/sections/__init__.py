@@ -1,5 +1,6 @@
-from .sections import get_sections
+from .sections import get_sections, get_sections_tile
 
 __all__ = [
     "get_sections",
+    "get_sections_tile",
 ]
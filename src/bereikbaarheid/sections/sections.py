@@ -1,169 +1,61 @@
+from bereikbaarheid.geojson_writer import RawJSON
 from bereikbaarheid.utils import django_query_db
 
+# The features are precomputed in the bereikbaarheid_out_load_unload materialized view,
+# see migration 0015_load_unload_view. It is refreshed together with the network views
+# and after an import of venstertijdwegen.
 raw_query = """
-        with load_unload as (
-            select abs(bd.link_nr) as linknr_abs,
-            case
-                when bd.link_nr > 0
-                    and degrees(
-                        st_azimuth(
-                            st_startpoint(st_linemerge(vma.geom)),
-                            st_endpoint(st_linemerge(vma.geom))
-                        )
-                    ) < 45
-                    then 'noord'
-                
-                when bd.link_nr > 0
-                    and degrees(
-                        st_azimuth(
-                            st_startpoint(st_linemerge(vma.geom)),
-                            st_endpoint(st_linemerge(vma.geom))
-                        )
-                    ) < 45 + 90
-                    then 'oost'
-                
-                when bd.link_nr > 0
-                    and degrees(
-                        st_azimuth(
-                            st_startpoint(st_linemerge(vma.geom)),
-                            st_endpoint(st_linemerge(vma.geom))
-                        )
-                    ) < 45 + 180
-                    then 'zuid'
-                
-                when bd.link_nr > 0
-                    and degrees(
-                        st_azimuth(
-                            st_startpoint(st_linemerge(vma.geom)),
-                            st_endpoint(st_linemerge(vma.geom))
-                        )
-                    ) < 45 + 270
-                    then 'west'
-                
-                when bd.link_nr > 0
-                    and degrees(
-                        st_azimuth(
-                            st_startpoint(st_linemerge(vma.geom)),
-                            st_endpoint(st_linemerge(vma.geom))
-                        )
-                    ) > 45 + 270
-                    then 'noord'
-                
-                when bd.link_nr > 0 then 'geen'
-                
-                when bd.link_nr < 0
-                    and degrees(
-                        st_azimuth(
-                            st_endpoint(st_linemerge(vma.geom)),
-                            st_startpoint(st_linemerge(vma.geom))
-                        )
-                    ) < 45
-                    then 'noord'
-                
-                when bd.link_nr < 0
-                    and degrees(
-                        st_azimuth(
-                            st_endpoint(st_linemerge(vma.geom)),
-                            st_startpoint(st_linemerge(vma.geom))
-                        )
-                    ) < 45 + 90
-                    then 'oost'
-                
-                when bd.link_nr < 0
-                    and degrees(
-                        st_azimuth(
-                            st_endpoint(st_linemerge(vma.geom)),
-                            st_startpoint(st_linemerge(vma.geom))
-                        )
-                    ) < 45 + 180
-                    then 'zuid'
-                
-                when bd.link_nr < 0
-                    and degrees(
-                        st_azimuth(
-                            st_endpoint(st_linemerge(vma.geom)),
-                            st_startpoint(st_linemerge(vma.geom))
-                        )
-                    ) < 45 + 270
-                    then 'west'
-                
-                when bd.link_nr < 0
-                    and degrees(
-                        st_azimuth(
-                            st_endpoint(st_linemerge(vma.geom)),
-                            st_startpoint(st_linemerge(vma.geom))
-                        )
-                    ) > 45 + 270
-                    then 'noord'
-                else  'geen'
-            
-            end as richting,
-            
-            bd.link_nr,
-            bd.e_type,
-            
-            bd.dagen,
-            bd.begin_tijd,
-            bd.eind_tijd,
-            vma.car_network,
-            vma.geom,
-            vma.name,
-            bord.rvv_modelnummer,
-            bord.onderbord_tekst
-            from bereikbaarheid_venstertijdweg bd
-            left join bereikbaarheid_out_vma_undirected vma
-                on abs(bd.link_nr) = vma.link_nr
-            left join bereikbaarheid_verkeersbord bord
-                on bd.verkeersbord = bord.bord_id
-            order by bd.link_nr
-        )
-        
-        select
-        ST_Transform(load_unload.geom, 4326)::json as geometry,
-        load_unload.linknr_abs as id,
-        load_unload.name as street_name,
-        json_agg(json_build_object(
-            'road_section_id', load_unload.link_nr,
-            'direction', load_unload.richting,
-            'additional_info', load_unload.rvv_modelnummer,
-            'text', load_unload.onderbord_tekst,
-            'days', load_unload.dagen,
-            'start_time', load_unload.begin_tijd,
-            'end_time', load_unload.eind_tijd
-        )
-        order
-        by
-        load_unload.eind_tijd
-        asc) as load_unload
-        from load_unload
-        
-        where load_unload.geom is not null
-        group by load_unload.geom, load_unload.linknr_abs, load_unload.name
-        order by load_unload.linknr_abs
+        select feature
+        from bereikbaarheid_out_load_unload
+        order by id
     """
 
 
-def _transform_results(results: list) -> list[dict]:
+# the sections of a tile, the load_unload attribute holds the json array of the geojson properties
+raw_query_tile = """
+        select ST_AsMVT(tile, 'load_unload', 4096, 'geom')
+        from (
+            select s.id,
+                s.feature::json -> 'properties' ->> 'street_name' as street_name,
+                s.feature::json -> 'properties' ->> 'load_unload' as load_unload,
+                ST_AsMVTGeom(st_transform(u.geom, 3857), ST_TileEnvelope(%(z)s, %(x)s, %(y)s)) as geom
+            from bereikbaarheid_out_load_unload s
+            join bereikbaarheid_out_vma_undirected u on u.link_nr = s.id
+            where u.geom && st_transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s), 28992)
+        ) as tile
+        where tile.geom is not null
+    """
+
+
+def _transform_results(results: list) -> list[RawJSON]:
     """
     Transform the query results to the expected GeoJson results
     :param results:
     :return:
     """
 
-    return [
-        {
-            "geometry": row[0],
-            "properties": {"id": row[1], "street_name": row[2], "load_unload": row[3]},
-            "type": "Feature",
-        }
-        for row in results
-    ]
+    return [RawJSON(row[0]) for row in results]
 
 
-def get_sections() -> list[dict]:
+def get_sections() -> list[RawJSON]:
     """
     Queries database for road sections with load unload data
     :return:
     """
     results = django_query_db(raw_query, {})
     return _transform_results(results)
+
+
+def get_sections_tile(z: int, x: int, y: int) -> bytes:
+    """
+    The road sections with load unload data of the tile as Mapbox Vector Tile
+    :param z:
+    :param x:
+    :param y:
+    :return:
+    """
+    result = django_query_db(raw_query_tile, {"z": z, "x": x, "y": y}, single=True)
+    # ST_AsMVT of no road sections can be NULL, the tile is empty
+    if not result or result[0] is None:
+        return b""
+    return bytes(result[0])
@@ -1,17 +1,45 @@
 # signals.py is invoked by app.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 
-from bereikbaarheid.resources.utils import refresh_materialized
+from bereikbaarheid.refresh import network_scheduler
+from bereikbaarheid.versioning import bump_network_version
 
-from .models import Lastbeperking, VerkeersBord, Verrijking
+from .models import (
+    Lastbeperking,
+    VenstertijdWeg,
+    VerkeersBord,
+    VerkeersPaal,
+    VerkeersTelling,
+    Verrijking,
+)
+
+# the field with the link of the directed network each model changes
+LINK_FIELDS = {
+    Lastbeperking: "link_nr",
+    VerkeersBord: "link_gevalideerd",
+    Verrijking: "link_nr",
+}
+
+
+@receiver(pre_save, sender=Lastbeperking)
+@receiver(pre_save, sender=VerkeersBord)
+@receiver(pre_save, sender=Verrijking)
+def import_pre_save(sender, instance, **kwargs):
+    """When change by admin-panel: remember the link before the change, it is recomputed as well"""
+
+    if hasattr(instance, "dry_run") or instance.pk is None:
+        return
+
+    field = LINK_FIELDS[sender]
+    instance.previous_link_nr = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
 
 
 @receiver(post_save, sender=Lastbeperking)
 @receiver(post_save, sender=VerkeersBord)
 @receiver(post_save, sender=Verrijking)
 def import_post_save(sender, instance, **kwargs):
-    """When add/change by admin-panel: Refresh materialized views"""
+    """When add/change by admin-panel: Refresh materialized views, bursts are coalesced"""
 
     if hasattr(instance, "dry_run"):
         # existence of dry_run is signal that instance is created by import-export
@@ -21,7 +49,32 @@ def import_post_save(sender, instance, **kwargs):
             return
 
     else:
-        # instance is created by add/change
-        refresh_materialized("bereikbaarheid_out_vma_undirected")
-        refresh_materialized("bereikbaarheid_out_vma_directed")
-        refresh_materialized("bereikbaarheid_out_vma_node")
+        # instance is created by add/change, only its links of the directed network are recomputed
+        link_nrs = {getattr(instance, LINK_FIELDS[sender]), getattr(instance, "previous_link_nr", None)}
+        network_scheduler.schedule(sender, link_nrs=link_nrs - {None})
+
+
+@receiver(post_save, sender=VenstertijdWeg)
+def venstertijdweg_post_save(sender, instance, **kwargs):
+    """When add/change by admin-panel: Refresh materialized view load/unload"""
+
+    if hasattr(instance, "dry_run"):
+        # existence of dry_run is signal that instance is created by import-export
+        # refresh materialized view is handled in resource
+        return
+
+    # the directed network does not depend on the venstertijdwegen
+    network_scheduler.schedule(sender, link_nrs=())
+
+
+@receiver(post_save, sender=VerkeersPaal)
+@receiver(post_save, sender=VerkeersTelling)
+def data_post_save(sender, instance, **kwargs):
+    """When add/change by admin-panel: new network version"""
+
+    if hasattr(instance, "dry_run"):
+        # existence of dry_run is signal that instance is created by import-export
+        # the network version is handled in resource
+        return
+
+    bump_network_version()
@@ -1,4 +1,4 @@
-from marshmallow import Schema, fields, post_load, validate, validates
+from marshmallow import fields, post_load, validate, validates
 
 from bereikbaarheid.validation import (
     allowed_vehicle_types,
@@ -6,9 +6,10 @@ from bereikbaarheid.validation import (
     is_company_car,
     voertuig,
 )
+from bereikbaarheid.viewport import ViewportSerializer
 
 
-class TrafficSignsSerializer(Schema):
+class TrafficSignsSerializer(ViewportSerializer):
     verkeersborden_categorieen = fields.List(
         fields.String(
             required=True,
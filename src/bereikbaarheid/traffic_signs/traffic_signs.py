@@ -1,6 +1,6 @@
-import json
-
+from bereikbaarheid.geojson_writer import RawJSON
 from bereikbaarheid.utils import django_query_db
+from bereikbaarheid.viewport import bbox_filter, bbox_parameters
 
 from .query_conditions import transform_categories
 
@@ -76,7 +76,7 @@ def _transform_results(results: list) -> list[dict]:
                 "traffic_decree_id": row[7],  # verkeersbesluit
                 "view_direction_in_degrees": row[4],  # kijkrichtingen
             },
-            "geometry": json.loads(row[10]),  # geom
+            "geometry": RawJSON(row[10]),  # geom
         }
         for row in results
     ]
@@ -90,9 +90,11 @@ def get_traffic_signs(data: dict) -> list[dict]:
     """
     categories = transform_categories(data.pop("verkeersborden_categorieen"))
     results = django_query_db(
-        raw_query,
+        # the signs are points, the zoom level does not change them
+        raw_query + bbox_filter(data, "m.geometry", srid=28992),
         {
             **data,
+            **bbox_parameters(data),
             "verkeersborden_categorieen": tuple(categories),
         },
     )
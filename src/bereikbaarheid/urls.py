@@ -5,8 +5,12 @@ from .views import (
     BollardsView,
     ElementsView,
     IsochronesView,
+    PermitsBatchView,
     PermitsView,
     ProhibitorView,
+    ProhibitoryCompareView,
+    ProhibitoryTilesView,
+    SectionsTilesView,
     SectionsView,
     TrafficSignsView,
 )
@@ -14,9 +18,13 @@ from .views import (
 urlpatterns = [
     path("v1/traffic-signs/", TrafficSignsView.as_view()),
     path("v1/permits/", PermitsView.as_view()),
+    path("v1/permits/batch/", PermitsBatchView.as_view()),
     path("v1/road-elements/<int:element_id>/", ElementsView.as_view()),
     path("v1/road-sections/load-unload/", SectionsView.as_view()),
+    path("v1/road-sections/load-unload/tiles/<int:z>/<int:x>/<int:y>.pbf", SectionsTilesView.as_view()),
     path("v1/roads/prohibitory/", ProhibitorView.as_view()),
+    path("v1/roads/prohibitory/compare/", ProhibitoryCompareView.as_view()),
+    path("v1/roads/prohibitory/tiles/<int:z>/<int:x>/<int:y>.pbf", ProhibitoryTilesView.as_view()),
     path("v1/roads/isochrones/", IsochronesView.as_view()),
     path("v1/bollards/", BollardsView.as_view()),
     path(
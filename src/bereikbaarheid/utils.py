@@ -1,6 +1,8 @@
-from typing import Union
+import sys
+from typing import Iterator, Union
 
-from django.db import connection
+from django.conf import settings
+from django.db import connection, transaction
 
 
 def convert_to_bool(value: Union[str, int]) -> bool:
@@ -21,3 +23,48 @@ def django_query_db(raw_query_string: str, parameters: dict, single=False) -> Un
             return cursor.fetchone()
         else:
             return cursor.fetchall()
+
+
+def django_query_db_iter(raw_query_string: str, parameters: dict) -> Iterator[tuple]:
+    """
+    Query the database with a raw query through a server-side cursor
+    The query is executed right away, the rows are fetched in batches while iterating.
+    The cursor lives in a transaction that stays open until the rows are consumed or the
+    iterator is closed: outside a transaction the cursor would be WITH HOLD and PostgreSQL
+    would materialize the whole result when the query is committed
+    :param raw_query_string:
+    :param parameters:
+    :return:
+    """
+    atomic = transaction.atomic()
+    atomic.__enter__()
+    try:
+        cursor = connection.chunked_cursor()
+        try:
+            cursor.execute(raw_query_string, parameters)
+        except Exception:
+            cursor.close()
+            raise
+    except Exception:
+        atomic.__exit__(*sys.exc_info())
+        raise
+
+    rows = _iter_rows(cursor, settings.STREAMING_BATCH_SIZE, atomic)
+    # started, so the cursor is closed and the transaction ended as well when the rows are never consumed
+    next(rows)
+    return rows
+
+
+def _iter_rows(cursor, batch_size: int, atomic: transaction.Atomic) -> Iterator[tuple]:
+    exc_info = (None, None, None)
+    try:
+        yield
+        while rows := cursor.fetchmany(batch_size):
+            yield from rows
+    except BaseException:
+        # also GeneratorExit, the read only transaction is rolled back when the iterator is closed early
+        exc_info = sys.exc_info()
+        raise
+    finally:
+        cursor.close()
+        atomic.__exit__(*exc_info)
@@ -0,0 +1,97 @@
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.views.decorators.http import condition
+
+from bereikbaarheid.models import (
+    Gebied,
+    Lastbeperking,
+    NetwerkVersie,
+    VenstertijdWeg,
+    VerkeersBord,
+    VerkeersPaal,
+    VerkeersTelling,
+    Verrijking,
+    Vma,
+)
+
+# tables the materialized views and the endpoints are built from
+SOURCE_MODELS = (
+    Vma,
+    Gebied,
+    Verrijking,
+    VerkeersBord,
+    Lastbeperking,
+    VerkeersPaal,
+    VenstertijdWeg,
+    VerkeersTelling,
+)
+
+# the current version is looked up at most once per NETWORK_VERSION_TTL seconds per worker
+_current = None
+_current_expires = 0.0
+_current_lock = threading.Lock()
+
+
+def bump_network_version() -> NetwerkVersie:
+    """
+    Store a new network version with the row counts of the source tables
+    In an import (a transaction) the version of this worker only changes once the import is committed,
+    before that the other requests still read the old network and must cache it under the old version
+    :return:
+    """
+    version = NetwerkVersie.objects.create(
+        aantal_rijen={model._meta.db_table: model.objects.count() for model in SOURCE_MODELS}
+    )
+
+    def set_current():
+        global _current, _current_expires
+
+        with _current_lock:
+            _current = version
+            _current_expires = time.monotonic() + settings.NETWORK_VERSION_TTL
+
+    transaction.on_commit(set_current)
+    return version
+
+
+def current_network_version() -> NetwerkVersie | None:
+    """
+    The latest network version, None when the network has never been refreshed
+    :return:
+    """
+    global _current, _current_expires
+
+    with _current_lock:
+        if time.monotonic() >= _current_expires:
+            _current = NetwerkVersie.objects.order_by("-versie").first()
+            _current_expires = time.monotonic() + settings.NETWORK_VERSION_TTL
+        return _current
+
+
+def current_network_versie() -> int | None:
+    """
+    The number of the latest network version, the in-memory networks and indexes are
+    rebuilt when it changes so a refresh in another process is picked up as well
+    :return:
+    """
+    version = current_network_version()
+    return version.versie if version else None
+
+
+def network_etag(request, *args, **kwargs) -> str | None:
+    version = current_network_version()
+    return f"network-{version.versie}" if version else None
+
+
+def network_last_modified(request, *args, **kwargs) -> datetime | None:
+    version = current_network_version()
+    return version.created_at if version else None
+
+
+# ETag / Last-Modified of the network version, a matching If-None-Match
+# or If-Modified-Since is answered with a 304 before the view is called
+network_condition = condition(etag_func=network_etag, last_modified_func=network_last_modified)
@@ -0,0 +1,112 @@
+import math
+
+from marshmallow import Schema, ValidationError, fields, validate
+
+# below this zoom level the simplified geometries are returned
+SIMPLIFY_ZOOM = 16
+
+MAX_TILE_ZOOM = 22
+
+# the envelope is in EPSG:4326, {column} is transformed to {srid} when it has another srid
+raw_query_bbox_filter = """
+            and {column} && st_transform(
+                st_makeenvelope(%(bbox_xmin)s, %(bbox_ymin)s, %(bbox_xmax)s, %(bbox_ymax)s, 4326),
+                {srid}
+            )
+"""
+
+
+class BoundingBox(fields.Field):
+    """
+    Bounding box as "min_lon,min_lat,max_lon,max_lat" (GET) or a list of the four values (POST)
+    """
+
+    def _deserialize(self, value, attr, data, **kwargs) -> tuple[float, float, float, float]:
+        if isinstance(value, str):
+            value = value.split(",")
+
+        try:
+            xmin, ymin, xmax, ymax = (float(coordinate) for coordinate in value)
+        except (TypeError, ValueError) as e:
+            raise ValidationError("Moet bestaan uit min_lon,min_lat,max_lon,max_lat") from e
+
+        if not (-180 <= xmin < xmax <= 180 and -90 <= ymin < ymax <= 90):
+            raise ValidationError("Ongeldige bounding box")
+
+        return xmin, ymin, xmax, ymax
+
+
+class ViewportSerializer(Schema):
+    """
+    Optional viewport of the map, the roads/signs outside the bounding box are not returned
+    """
+
+    bbox = BoundingBox(load_default=None)
+    zoom = fields.Integer(load_default=None, validate=[validate.Range(min=0, max=MAX_TILE_ZOOM)])
+
+
+def bbox_filter(data: dict, column: str, srid: int = 4326) -> str:
+    """
+    Condition on the bounding box of the column, empty without bbox
+    The && operator is index assisted when the column has a gist index
+    :param data: serialized data with the bbox of ViewportSerializer
+    :param column:
+    :param srid: of the column
+    :return:
+    """
+    if data.get("bbox") is None:
+        return ""
+    return raw_query_bbox_filter.format(column=column, srid=srid)
+
+
+def bbox_parameters(data: dict) -> dict:
+    """
+    The query parameters of bbox_filter
+    :param data:
+    :return:
+    """
+    if data.get("bbox") is None:
+        return {}
+    return dict(zip(("bbox_xmin", "bbox_ymin", "bbox_xmax", "bbox_ymax"), data["bbox"]))
+
+
+def geometry_column(data: dict, column: str = "geom4326") -> str:
+    """
+    The simplified column at a low zoom level, the column itself otherwise
+    :param data: serialized data with the zoom of ViewportSerializer
+    :param column: column of bereikbaarheid_out_vma_directed that has a simplified version
+    :return:
+    """
+    if data.get("zoom") is not None and data["zoom"] < SIMPLIFY_ZOOM:
+        return f"{column}simply"
+    return column
+
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    """
+    The tile exists in the web mercator tile grid
+    :param z:
+    :param x:
+    :param y:
+    :return:
+    """
+    return 0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def tile_bbox(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """
+    Bounding box of the web mercator tile in EPSG:4326, as the bbox of ViewportSerializer
+    :param z:
+    :param x:
+    :param y:
+    :return:
+    """
+    size = 2**z
+
+    def lon(tile_x: int) -> float:
+        return tile_x / size * 360 - 180
+
+    def lat(tile_y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / size))))
+
+    return lon(x), lat(y + 1), lon(x + 1), lat(y)
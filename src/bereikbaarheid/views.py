@@ -1,22 +1,42 @@
 import json
 
+from django.conf import settings
 from django.http import HttpRequest, JsonResponse
+from django.utils.decorators import method_decorator
 from django.views import View
 from marshmallow import ValidationError
 
-from bereikbaarheid.bollards import get_bollards
+from bereikbaarheid.bollards import get_bollards, snapshot_response
 from bereikbaarheid.bollards.serializer import BollardsSerializer
+from bereikbaarheid.cache import prohibitory_cache, tile_cache
 from bereikbaarheid.elements import get_elements
-from bereikbaarheid.isochrones import get_isochrones
+from bereikbaarheid.isochrones import get_isochrone_bands, get_isochrones, iter_isochrones
 from bereikbaarheid.isochrones.serializer import IsochronesSerializer
-from bereikbaarheid.permits import get_permits
-from bereikbaarheid.permits.serializers import PermitSerializer
-from bereikbaarheid.prohibitory import get_prohibitory
-from bereikbaarheid.prohibitory.serializers import ProhibitorySerializer
-from bereikbaarheid.sections import get_sections
+from bereikbaarheid.permits import get_permits, get_permits_batch
+from bereikbaarheid.permits.serializers import PermitsBatchSerializer, PermitSerializer
+from bereikbaarheid.prohibitory import (
+    get_prohibitory,
+    get_prohibitory_profiles,
+    get_prohibitory_tile,
+    iter_prohibitory,
+    iter_prohibitory_profiles,
+)
+from bereikbaarheid.prohibitory.serializers import (
+    ProhibitoryCompareSerializer,
+    ProhibitorySerializer,
+    ProhibitoryVehicleSerializer,
+)
+from bereikbaarheid.sections import get_sections, get_sections_tile
 from bereikbaarheid.traffic_signs import get_traffic_signs
 from bereikbaarheid.traffic_signs.serializers import TrafficSignsSerializer
-from bereikbaarheid.wrapper import extract_parameters, geo_json_response, validate_data
+from bereikbaarheid.versioning import network_condition
+from bereikbaarheid.wrapper import (
+    cached_geo_json_response,
+    cached_tile_response,
+    extract_parameters,
+    geo_json_response,
+    validate_data,
+)
 
 
 class BollardsView(View):
@@ -28,6 +48,7 @@ class BollardsView(View):
     def handle(self, request, data: dict, *args, **kwargs):
         return get_bollards(data)
 
+    @method_decorator(network_condition)
     def get(self, request, *args, **kwargs):
         try:
             _params = extract_parameters(request)
@@ -37,7 +58,8 @@ class BollardsView(View):
                 serialized_data = BollardsSerializer().load(_params)
                 return self.handle(request, serialized_data)
             else:
-                return self.handle(request, None)
+                # all bollards, served from the precomputed snapshot
+                return snapshot_response(request)
 
         except ValidationError as err:
             return JsonResponse(status=400, data=err.messages)
@@ -58,6 +80,7 @@ class TrafficSignsView(View):
     def handle(self, request, data: dict, *args, **kwargs):
         return get_traffic_signs(data)
 
+    @method_decorator(network_condition)
     @validate_data(TrafficSignsSerializer)
     def get(self, request, serialized_data: dict, *args, **kwargs):
         return self.handle(request, serialized_data)
@@ -80,6 +103,7 @@ class PermitsView(View):
             },
         )
 
+    @method_decorator(network_condition)
     @validate_data(PermitSerializer)
     def get(self, request, serialized_data: dict, *args, **kwargs):
         return self.handle(request, serialized_data)
@@ -89,15 +113,33 @@ class PermitsView(View):
         return self.handle(request, serialized_data)
 
 
+class PermitsBatchView(View):
+    """
+    Return the permits of many locations for one vehicle
+    """
+
+    @validate_data(PermitsBatchSerializer)
+    def post(self, request: HttpRequest, serialized_data: dict, *args, **kwargs):
+        return JsonResponse(
+            status=200,
+            data={
+                "data": get_permits_batch(serialized_data),
+            },
+        )
+
+
 class ProhibitorView(View):
     """
     Return prohibitory roads
     """
 
-    @geo_json_response
+    @cached_geo_json_response(prohibitory_cache)
     def handle(self, request, data: dict, *args, **kwargs):
+        if settings.STREAMING_RESPONSES:
+            return iter_prohibitory(data)
         return get_prohibitory(data)
 
+    @method_decorator(network_condition)
     @validate_data(ProhibitorySerializer)
     def get(self, request, serialized_data: dict, *args, **kwargs):
         return self.handle(request, serialized_data)
@@ -107,6 +149,37 @@ class ProhibitorView(View):
         return self.handle(request, serialized_data)
 
 
+class ProhibitoryCompareView(View):
+    """
+    Return prohibitory roads for several vehicles, with a status code per vehicle
+    """
+
+    @geo_json_response
+    def handle(self, request, data: dict, *args, **kwargs):
+        if settings.STREAMING_RESPONSES:
+            return iter_prohibitory_profiles(data)
+        return get_prohibitory_profiles(data)
+
+    @validate_data(ProhibitoryCompareSerializer)
+    def post(self, request: HttpRequest, serialized_data: dict, *args, **kwargs):
+        return self.handle(request, serialized_data)
+
+
+class ProhibitoryTilesView(View):
+    """
+    Return the prohibitory roads of a tile as Mapbox Vector Tile
+    """
+
+    @cached_tile_response(tile_cache)
+    def handle(self, request, data: dict, z: int, x: int, y: int, *args, **kwargs):
+        return get_prohibitory_tile(data, z, x, y)
+
+    @method_decorator(network_condition)
+    @validate_data(ProhibitoryVehicleSerializer)
+    def get(self, request, serialized_data: dict, z: int, x: int, y: int, *args, **kwargs):
+        return self.handle(request, serialized_data, z, x, y)
+
+
 class ElementsView(View):
     """
     Return roads based on the id
@@ -116,6 +189,7 @@ class ElementsView(View):
     def handle(self, request, element_id: int, *args, **kwargs):
         return get_elements(element_id)
 
+    @method_decorator(network_condition)
     def get(self, request, element_id: int, *args, **kwargs):
         return self.handle(request, element_id)
 
@@ -127,8 +201,13 @@ class IsochronesView(View):
 
     @geo_json_response
     def handle(self, request, data: dict, *args, **kwargs):
+        if data["bands"]:
+            return get_isochrone_bands(data)
+        if settings.STREAMING_RESPONSES:
+            return iter_isochrones(data)
         return get_isochrones(data)
 
+    @method_decorator(network_condition)
     @validate_data(IsochronesSerializer)
     def get(self, request, serialized_data: dict, *args, **kwargs):
         return self.handle(request, serialized_data)
@@ -139,6 +218,21 @@ class IsochronesView(View):
 
 
 class SectionsView(View):
+    @method_decorator(network_condition)
     @geo_json_response
     def get(self, request, *args, **kwargs):
         return get_sections()
+
+
+class SectionsTilesView(View):
+    """
+    Return the road sections with load unload data of a tile as Mapbox Vector Tile
+    """
+
+    @cached_tile_response(tile_cache)
+    def handle(self, request, data: dict, z: int, x: int, y: int, *args, **kwargs):
+        return get_sections_tile(z, x, y)
+
+    @method_decorator(network_condition)
+    def get(self, request, z: int, x: int, y: int, *args, **kwargs):
+        return self.handle(request, {}, z, x, y)
@@ -1,9 +1,14 @@
 import json
 import urllib
+from typing import Iterator
 
-from django.http import HttpRequest, JsonResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
 from marshmallow import ValidationError
 
+from bereikbaarheid.cache import ResponseCache
+from bereikbaarheid.geojson_writer import encode_feature_collection, iter_feature_collection
+from bereikbaarheid.viewport import valid_tile
+
 
 def fix_traffic_sign_categories(request) -> dict:
     """
@@ -66,17 +71,104 @@ def validate_data(serializer):
     return decorator
 
 
+def _cache_chunks(cache: ResponseCache, key: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Pass the chunks through, the complete response is stored in the cache
+    :param cache:
+    :param key:
+    :param chunks:
+    :return:
+    """
+    content = []
+    for chunk in chunks:
+        content.append(chunk)
+        yield chunk
+    cache.set(key, b"".join(content))
+
+
 def geo_json_response(func):
     """
     Wrap any dict into a geojson format and return it as a json response
+    RawJSON geometries are written to the response as is, see geojson_writer
+    When func returns an iterator the features are streamed
     :param func:
     :return:
     """
 
     def wrapped(*args, **kwargs):
-        return JsonResponse(
+        features = func(*args, **kwargs)
+
+        if isinstance(features, Iterator):
+            return StreamingHttpResponse(
+                iter_feature_collection(features),
+                status=200,
+                content_type="application/json",
+            )
+
+        return HttpResponse(
+            encode_feature_collection(features),
             status=200,
-            data={"features": func(*args, **kwargs), "type": "FeatureCollection"},
+            content_type="application/json",
         )
 
     return wrapped
+
+
+def cached_geo_json_response(cache: ResponseCache):
+    """
+    Like geo_json_response, but the encoded response is stored in the cache
+    keyed by the serialized data, identical requests are served from the cache
+    :param cache:
+    :return:
+    """
+
+    def decorator(func):
+        def wrapped(view, request, data: dict, *args, **kwargs):
+            key = cache.make_key(data)
+            content = cache.get(key)
+
+            if content is None:
+                features = func(view, request, data, *args, **kwargs)
+
+                if isinstance(features, Iterator):
+                    return StreamingHttpResponse(
+                        _cache_chunks(cache, key, iter_feature_collection(features)),
+                        status=200,
+                        content_type="application/json",
+                    )
+
+                content = encode_feature_collection(features)
+                cache.set(key, content)
+
+            return HttpResponse(content, status=200, content_type="application/json")
+
+        return wrapped
+
+    return decorator
+
+
+def cached_tile_response(cache: ResponseCache):
+    """
+    Return the Mapbox Vector Tile of func, stored in the cache keyed by the path (layer and z/x/y)
+    and the serialized data. A tile outside the tile grid is not found
+    :param cache:
+    :return:
+    """
+
+    def decorator(func):
+        def wrapped(view, request, data: dict, z: int, x: int, y: int, *args, **kwargs):
+            if not valid_tile(z, x, y):
+                return JsonResponse(status=404, data={"error": f"tile {z}/{x}/{y} does not exist"})
+
+            key = cache.make_key({"path": request.path, **data})
+            content = cache.get(key)
+
+            if content is None:
+                content = func(view, request, data, z, x, y, *args, **kwargs)
+                cache.set(key, content)
+
+            return HttpResponse(content, status=200, content_type="application/vnd.mapbox-vector-tile")
+
+        return wrapped
+
+    return decorator
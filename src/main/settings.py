@@ -86,6 +86,51 @@ ADMIN_PATH = make_url_path(os.getenv("ADMIN_PATH", "admin"))
 # Admin excel exports should sanitize formulaes to prevent injection attacks
 IMPORT_EXPORT_ESCAPE_FORMULAE_ON_EXPORT = True
 
+# Routing for the prohibitory, permits and isochrones queries:
+# "pgrouting" calculates the routes in the database with pgr_dijkstraCost,
+# "memory" loads the network once per worker and calculates the routes in python,
+# "precomputed" looks up the reachable nodes per vehicle profile in bereikbaarheid_bereikbareknopen
+# (stored with `manage.py precompute_reachability --all`), other profiles are calculated like "memory"
+ROUTING_ENGINE = os.getenv("ROUTING_ENGINE", "pgrouting")
+
+# Snapping a lat/lon to the nearest node or road of the network:
+# "database" searches the materialized views with the GiST indexes,
+# "memory" builds a grid index of the network once per worker
+SNAPPING_ENGINE = os.getenv("SNAPPING_ENGINE", "database")
+
+# In-process cache of the prohibitory roads responses, per worker (number of responses, seconds)
+PROHIBITORY_CACHE_SIZE = int(os.getenv("PROHIBITORY_CACHE_SIZE", "16"))
+PROHIBITORY_CACHE_TTL = int(os.getenv("PROHIBITORY_CACHE_TTL", "86400"))
+
+# In-process cache of the vector tiles, per worker (number of tiles, seconds)
+TILE_CACHE_SIZE = int(os.getenv("TILE_CACHE_SIZE", "2048"))
+TILE_CACHE_TTL = int(os.getenv("TILE_CACHE_TTL", "86400"))
+# Reachable nodes per vehicle the tiles are clipped from, per worker (number of vehicles)
+REACHABLE_NODES_CACHE_SIZE = int(os.getenv("REACHABLE_NODES_CACHE_SIZE", "64"))
+
+# Cache of the shortest path trees of the isochrone origins (number of trees per worker, 0 disables it).
+# Off by default: with pgRouting a miss is a query for the tree before the isochrone query itself.
+# With an alias of CACHES (e.g. "default") the trees are also stored there for the other workers (seconds)
+SOURCE_TREE_CACHE_SIZE = int(os.getenv("SOURCE_TREE_CACHE_SIZE", "0"))
+SOURCE_TREE_CACHE_ALIAS = os.getenv("SOURCE_TREE_CACHE_ALIAS", "")
+SOURCE_TREE_CACHE_TTL = int(os.getenv("SOURCE_TREE_CACHE_TTL", "86400"))
+
+# Shortest path trees of the bollard routes kept per worker with the memory engine (number of time windows)
+BOLLARD_TREE_CACHE_SIZE = int(os.getenv("BOLLARD_TREE_CACHE_SIZE", "64"))
+
+# Seconds a worker uses the network version (ETag) before looking it up again
+NETWORK_VERSION_TTL = int(os.getenv("NETWORK_VERSION_TTL", "5"))
+
+# Stream the prohibitory roads and isochrones responses from a server-side cursor
+STREAMING_RESPONSES = str_to_bool(os.getenv("STREAMING_RESPONSES", "false"))
+STREAMING_BATCH_SIZE = int(os.getenv("STREAMING_BATCH_SIZE", "2000"))
+
+# Refresh the materialized views with CONCURRENTLY, readers are not blocked during a refresh
+REFRESH_CONCURRENTLY = str_to_bool(os.getenv("REFRESH_CONCURRENTLY", "true"))
+
+# Seconds without admin saves before the materialized views are refreshed in the background, 0 refreshes at once
+REFRESH_DEBOUNCE = float(os.getenv("REFRESH_DEBOUNCE", "5"))
+
 
 # Application definition
 DJANGO_APPS = [
@@ -16,3 +16,8 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "main.settings")
 
 application = get_wsgi_application()
 application = OpenTelemetryMiddleware(application)
+
+# refreshes that were pending when the previous worker stopped, e.g. by harakiri or an autoreload
+from bereikbaarheid.refresh import resume_pending  # noqa: E402
+
+resume_pending()
@@ -71,3 +71,21 @@ class TestBollards:
         """
         result = get_bollards(test_input)
         assert len(result) == 1
+
+    @patch("bereikbaarheid.bollards.bollards.use_memory_snapping", MagicMock(return_value=True))
+    @patch("bereikbaarheid.bollards.bollards.use_memory_engine", MagicMock(return_value=True))
+    @patch("bereikbaarheid.bollards.bollards.nearest_bollard_target", MagicMock(return_value=4))
+    def test_get_bollards_memory_engine(self):
+        with (
+            patch(
+                "bereikbaarheid.bollards.bollards.django_query_db", MagicMock(return_value=QUERY_RESULT[0])
+            ) as mock_query_db,
+            patch("bereikbaarheid.bollards.bollards.bollard_route", MagicMock(return_value=[1, 3])) as bollard_route,
+        ):
+            result = get_bollards({"day_of_the_week": "di", "lat": 52.371198, "lon": 4.8920418})
+
+        assert len(result) == 1
+        bollard_route.assert_called_once_with(4, "di", None, None)
+        query, parameters = mock_query_db.call_args.args
+        assert "pgr_dijkstra" not in query
+        assert parameters["link_nrs"] == [1, 3]
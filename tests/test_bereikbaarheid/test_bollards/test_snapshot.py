@@ -0,0 +1,93 @@
+import gzip
+import json
+from unittest.mock import MagicMock, patch
+
+import brotli
+import pytest
+from django.test.client import RequestFactory
+
+from bereikbaarheid.bollards import snapshot
+from bereikbaarheid.bollards.snapshot import _content_encoding, get_snapshot, snapshot_response
+
+FEATURES = [{"type": "Feature", "properties": {"id": "VC93"}, "geometry": None}]
+
+
+@pytest.fixture
+def get_bollards():
+    with patch("bereikbaarheid.bollards.snapshot.get_bollards", MagicMock(return_value=FEATURES)) as mock:
+        snapshot._snapshot = None
+        yield mock
+        snapshot._snapshot = None
+
+
+def network_version(versie: int):
+    return patch(
+        "bereikbaarheid.bollards.snapshot.current_network_version",
+        MagicMock(return_value=MagicMock(versie=versie)),
+    )
+
+
+class TestSnapshot:
+    def test_built_once_per_network_version(self, get_bollards):
+        with network_version(1):
+            first = get_snapshot()
+            assert get_snapshot() is first
+        with network_version(2):
+            assert get_snapshot() is not first
+
+        assert get_bollards.call_count == 2
+        assert json.loads(gzip.decompress(first.gzip_content)) == json.loads(first.content)
+        assert json.loads(brotli.decompress(first.br_content)) == json.loads(first.content)
+
+    def test_response(self, get_bollards):
+        with network_version(3):
+            response = snapshot_response(RequestFactory().get("/"))
+
+        assert response.status_code == 200
+        assert response["ETag"] == '"network-3"'
+        assert response["Vary"] == "Accept-Encoding"
+        assert not response.has_header("Content-Encoding")
+        assert json.loads(response.content)["features"] == FEATURES
+
+    def test_response_gzip(self, get_bollards):
+        with network_version(3):
+            response = snapshot_response(RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip, deflate"))
+
+        assert response["Content-Encoding"] == "gzip"
+        assert response["ETag"] == '"network-3-gzip"'
+        assert response["Vary"] == "Accept-Encoding"
+        assert json.loads(gzip.decompress(response.content))["features"] == FEATURES
+
+    def test_response_br(self, get_bollards):
+        with network_version(3):
+            response = snapshot_response(RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip, deflate, br"))
+
+        assert response["Content-Encoding"] == "br"
+        assert response["ETag"] == '"network-3-br"'
+        assert response["Vary"] == "Accept-Encoding"
+        assert json.loads(brotli.decompress(response.content))["features"] == FEATURES
+
+    def test_not_modified(self, get_bollards):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH='"network-3-gzip"')
+        with network_version(3):
+            response = snapshot_response(request)
+
+        assert response.status_code == 304
+        assert response["ETag"] == '"network-3-gzip"'
+
+    @pytest.mark.parametrize(
+        "accept_encoding, expected",
+        [
+            ("", None),
+            ("gzip, deflate, br", "br"),
+            ("br;q=0, gzip", "gzip"),
+            ("BR;Q=0.5, gzip;q=0.8", "gzip"),
+            ("gzip;q=0, br;q=0", None),
+            ("*", "br"),
+            ("*;q=0.5, br;q=0", "gzip"),
+            ("identity, gzip;q=0.5", None),
+            ("deflate", None),
+        ],
+    )
+    def test_content_encoding(self, accept_encoding, expected):
+        assert _content_encoding(accept_encoding) == expected
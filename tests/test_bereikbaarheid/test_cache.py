@@ -0,0 +1,134 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from bereikbaarheid.cache import ResponseCache, SourceTreeCache, clear_response_caches
+
+
+@pytest.fixture(autouse=True)
+def network_version():
+    with patch("bereikbaarheid.cache.current_network_version", MagicMock(return_value=None)) as mock:
+        yield mock
+
+
+class TestResponseCache:
+    def test_key_is_canonical(self):
+        cache = ResponseCache(maxsize=2, ttl=60)
+        assert cache.make_key({"a": 1, "b": True}) == cache.make_key({"b": True, "a": 1})
+        assert cache.make_key({"a": 1}) != cache.make_key({"a": 2})
+
+    def test_get_set(self):
+        cache = ResponseCache(maxsize=2, ttl=60)
+        key = cache.make_key({"a": 1})
+        assert cache.get(key) is None
+
+        cache.set(key, b"{}")
+        assert cache.get(key) == b"{}"
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ResponseCache(maxsize=2, ttl=60)
+        keys = [cache.make_key({"a": i}) for i in range(3)]
+        cache.set(keys[0], b"0")
+        cache.set(keys[1], b"1")
+        cache.get(keys[0])
+        cache.set(keys[2], b"2")
+
+        assert len(cache) == 2
+        assert cache.get(keys[0]) == b"0"
+        assert cache.get(keys[1]) is None
+
+    def test_expired(self):
+        cache = ResponseCache(maxsize=2, ttl=60)
+        key = cache.make_key({"a": 1})
+
+        with patch("bereikbaarheid.cache.time.monotonic", return_value=0):
+            cache.set(key, b"{}")
+        with patch("bereikbaarheid.cache.time.monotonic", return_value=61):
+            assert cache.get(key) is None
+
+    def test_clear(self):
+        cache = ResponseCache(maxsize=2, ttl=60)
+        key = cache.make_key({"a": 1})
+        cache.set(key, b"{}")
+
+        clear_response_caches()
+        assert cache.get(key) is None
+
+        # a response computed before the clear is not stored
+        cache.set(key, b"{}")
+        assert len(cache) == 0
+        assert cache.make_key({"a": 1}) != key
+
+    def test_key_holds_the_network_version(self, network_version):
+        cache = ResponseCache(maxsize=2, ttl=60)
+        key = cache.make_key({"a": 1})
+
+        network_version.return_value = MagicMock(versie=2)
+        assert cache.make_key({"a": 1}) != key
+
+
+class TestSourceTreeCache:
+    def test_encode_decode(self):
+        nodes, costs = SourceTreeCache.decode(SourceTreeCache.encode([3, 1, 2], [0.0, 0.25, 0.5]))
+
+        assert nodes.tolist() == [3, 1, 2]
+        assert costs.tolist() == [0.0, 0.25, 0.5]
+        assert costs.dtype == np.float32
+
+    def test_get_set(self):
+        cache = SourceTreeCache(maxsize=2)
+        key = cache.make_key(1, None)
+        assert cache.get(key) is None
+
+        nodes, costs = cache.set(key, [1, 2], [0.0, 0.1])
+        assert nodes.tolist() == [1, 2]
+        assert [nodes.tolist() for nodes, _ in [cache.get(key)]] == [[1, 2]]
+        assert cache.make_key(1, 0.25) != key
+
+    def test_least_recently_used_is_evicted(self):
+        cache = SourceTreeCache(maxsize=2)
+        keys = [cache.make_key(source, None) for source in range(3)]
+        for key in keys:
+            cache.set(key, [key[2]], [0.0])
+
+        assert len(cache) == 2
+        assert cache.get(keys[0]) is None
+
+    def test_clear(self):
+        cache = SourceTreeCache(maxsize=2)
+        key = cache.make_key(1, None)
+
+        clear_response_caches()
+        # a tree computed before the clear is not stored, but still returned
+        nodes, _ = cache.set(key, [1], [0.0])
+        assert nodes.tolist() == [1]
+        assert len(cache) == 0
+
+    def test_persistent(self, network_version):
+        network_version.return_value = MagicMock(versie=2)
+        persistent = MagicMock()
+        persistent.get.return_value = None
+        with patch("bereikbaarheid.cache.caches", {"trees": persistent}):
+            cache = SourceTreeCache(maxsize=2, persistent="trees", timeout=60)
+            key = cache.make_key(1, None)
+            assert cache.get(key) is None
+
+            cache.set(key, [1], [0.0])
+            persistent.set.assert_called_once_with("source-tree:2:1:None", SourceTreeCache.encode([1], [0.0]), 60)
+
+            # another worker
+            persistent.get.return_value = persistent.set.call_args.args[1]
+            other = SourceTreeCache(maxsize=2, persistent="trees", timeout=60)
+            nodes, _ = other.get(other.make_key(1, None))
+
+        assert nodes.tolist() == [1]
+        assert len(other) == 1
+
+    def test_no_persistent_without_network_version(self):
+        persistent = MagicMock()
+        with patch("bereikbaarheid.cache.caches", {"trees": persistent}):
+            cache = SourceTreeCache(maxsize=2, persistent="trees")
+            cache.set(cache.make_key(1, None), [1], [0.0])
+
+        persistent.set.assert_not_called()
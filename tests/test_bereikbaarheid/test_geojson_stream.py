@@ -0,0 +1,41 @@
+import io
+import json
+import os
+
+import pytest
+
+from bereikbaarheid.resources.geojson_stream import iter_features
+
+VMA_FILE = os.path.join(os.path.dirname(__file__), "..", "import_files", "vma_ssmall_testset.geojson")
+
+
+class TestGeojsonStream:
+    @pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+    def test_iter_features(self, chunk_size):
+        with open(VMA_FILE, "rb") as import_file:
+            data = import_file.read()
+
+        members = {}
+        features = list(iter_features(io.BytesIO(data), members, chunk_size=chunk_size))
+
+        assert features == json.loads(data)["features"]
+        assert members["crs"]["properties"]["name"] == "urn:ogc:def:crs:EPSG::28992"
+        assert "features" not in members
+
+    def test_members_before_features(self):
+        members = {}
+        features = iter_features('{"crs": {"type": "name"}, "features": [{"id": 1}, {"id": 2}], "n": 12345}', members)
+
+        assert next(features) == {"id": 1}
+        assert members == {"crs": {"type": "name"}}
+        assert list(features) == [{"id": 2}]
+        assert members["n"] == 12345
+
+    @pytest.mark.parametrize("data", ['{"features": []}', b'\xef\xbb\xbf{"features": []}', "{}"])
+    def test_no_features(self, data):
+        assert list(iter_features(data)) == []
+
+    @pytest.mark.parametrize("data", ["", "[]", '{"features": [{"id": 1}', '{"features": [{"id": 1} {"id": 2}]}'])
+    def test_invalid(self, data):
+        with pytest.raises(ValueError):
+            list(iter_features(data))
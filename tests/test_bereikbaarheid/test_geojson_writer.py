@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from bereikbaarheid.geojson_writer import (
+    RawJSON,
+    encode_feature,
+    encode_feature_collection,
+    iter_feature_collection,
+)
+
+GEOMETRY = '{"type":"Point","coordinates":[4.9,52.37]}'
+
+
+class TestGeojsonWriter:
+    @pytest.mark.parametrize(
+        "feature",
+        [
+            {"type": "Feature", "properties": {"id": 1}, "geometry": RawJSON(GEOMETRY)},
+            {"geometry": RawJSON(GEOMETRY)},
+            {"type": "Feature", "properties": {"id": 1}, "geometry": json.loads(GEOMETRY)},
+        ],
+    )
+    def test_encode_feature(self, feature):
+        expected = {**feature, "geometry": json.loads(GEOMETRY)}
+        assert json.loads(encode_feature(feature)) == expected
+
+    def test_raw_geometry_is_not_reencoded(self):
+        geometry = '{"type": "Point", "coordinates": [4.90000000001, 52.37]}'
+        assert geometry in encode_feature({"geometry": RawJSON(geometry)})
+
+    def test_encode_raw_feature(self):
+        feature = json.dumps({"type": "Feature", "properties": {}, "geometry": None})
+        assert encode_feature(RawJSON(feature)) == feature
+
+    @pytest.mark.parametrize(
+        "features, expected",
+        [
+            ([], []),
+            ([{"geometry": RawJSON(GEOMETRY)}] * 2, [{"geometry": json.loads(GEOMETRY)}] * 2),
+            ({"some": "fake_data"}, {"some": "fake_data"}),
+        ],
+    )
+    def test_encode_feature_collection(self, features, expected):
+        assert json.loads(encode_feature_collection(features)) == {
+            "features": expected,
+            "type": "FeatureCollection",
+        }
+
+    @pytest.mark.parametrize("count", [0, 1, 5])
+    def test_iter_feature_collection(self, count):
+        features = ({"geometry": RawJSON(GEOMETRY), "properties": {"id": i}} for i in range(count))
+        chunks = list(iter_feature_collection(features, batch_size=2))
+
+        assert len(chunks) == 2 + (count + 1) // 2
+        assert json.loads(b"".join(chunks)) == json.loads(
+            encode_feature_collection([{"geometry": RawJSON(GEOMETRY), "properties": {"id": i}} for i in range(count)])
+        )
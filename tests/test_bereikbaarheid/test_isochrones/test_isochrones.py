@@ -1,8 +1,11 @@
 from unittest.mock import MagicMock, patch
 
 import pytest
+from marshmallow import ValidationError
 
-from bereikbaarheid.isochrones.isochrones import _transform_results, get_isochrones
+from bereikbaarheid.cache import source_tree_cache
+from bereikbaarheid.isochrones.isochrones import _transform_results, get_isochrone_bands, get_isochrones
+from bereikbaarheid.isochrones.serializer import IsochronesSerializer
 
 QUERY_RESULT = [
     (
@@ -19,6 +22,19 @@ QUERY_RESULT = [
 ]
 
 
+@pytest.fixture(autouse=True)
+def tree_cache():
+    """
+    The source tree cache is disabled, unless a test sets its maxsize
+    """
+    with (
+        patch("bereikbaarheid.cache.current_network_version", MagicMock(return_value=None)),
+        patch.object(source_tree_cache, "maxsize", 0),
+    ):
+        source_tree_cache.clear()
+        yield source_tree_cache
+
+
 class TestIsochrones:
     @pytest.mark.parametrize(
         "query_results, expected_result",
@@ -56,3 +72,115 @@ class TestIsochrones:
         serialized_data = {"lat": 52.363066102529295, "lon": 4.907205867943042}
         result = get_isochrones(serialized_data)
         assert len(result) == 1
+
+    def test_get_isochrone_bands(self):
+        polygon = {
+            "type": "Polygon",
+            "coordinates": [[[120912.8, 490748.2], [120955.3, 490802.1], [120912.8, 490802.1]]],
+        }
+        with patch(
+            "bereikbaarheid.isochrones.isochrones.django_query_db",
+            MagicMock(return_value=[(5, polygon), (10, polygon)]),
+        ) as mock_query_db:
+            result = get_isochrone_bands({"lat": 52.363066102529295, "lon": 4.907205867943042, "bands": [5, 10]})
+
+        query, parameters = mock_query_db.call_args.args
+        assert "ST_ConcaveHull(ST_Collect(isochrones.geometry)" in query
+        assert "geom::json" not in query
+        assert parameters["bands"] == [5, 10]
+        assert result == [
+            {"properties": {"minutes": 5}, "geometry": polygon, "type": "Feature"},
+            {"properties": {"minutes": 10}, "geometry": polygon, "type": "Feature"},
+        ]
+
+    @patch("bereikbaarheid.isochrones.isochrones.use_memory_snapping", MagicMock(return_value=False))
+    @patch("bereikbaarheid.isochrones.isochrones.use_memory_engine", MagicMock(return_value=False))
+    def test_get_isochrones_max_minutes(self):
+        with patch("bereikbaarheid.isochrones.isochrones.django_query_db", MagicMock(return_value=[])) as mock_query_db:
+            get_isochrones({"lat": 52.363066102529295, "lon": 4.907205867943042, "max_minutes": 15})
+
+        query, parameters = mock_query_db.call_args.args
+        assert "pgr_drivingDistance" in query
+        assert "pgr_dijkstraCost" not in query
+        assert "left join (" not in query.split("as source")[0]
+        assert parameters["max_cost"] == 0.25
+
+    @patch("bereikbaarheid.isochrones.isochrones.use_memory_snapping", MagicMock(return_value=True))
+    @patch("bereikbaarheid.isochrones.isochrones.use_memory_engine", MagicMock(return_value=True))
+    @patch("bereikbaarheid.isochrones.isochrones.nearest_node", MagicMock(return_value=2))
+    def test_get_isochrones_max_minutes_memory_engine(self):
+        with (
+            patch("bereikbaarheid.isochrones.isochrones.django_query_db", MagicMock(return_value=[])),
+            patch(
+                "bereikbaarheid.isochrones.isochrones.aggregated_costs", MagicMock(return_value=([2], [0.0]))
+            ) as aggregated_costs,
+        ):
+            get_isochrones({"lat": 52.363066102529295, "lon": 4.907205867943042, "max_minutes": 15})
+
+        aggregated_costs.assert_called_once_with(2, max_cost=0.25)
+
+    @patch("bereikbaarheid.isochrones.isochrones.use_memory_snapping", MagicMock(return_value=True))
+    @patch("bereikbaarheid.isochrones.isochrones.use_memory_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.isochrones.isochrones.nearest_node", MagicMock(return_value=2))
+    def test_source_tree_is_reused(self, tree_cache):
+        tree_cache.maxsize = 2
+        with patch(
+            "bereikbaarheid.isochrones.isochrones.django_query_db",
+            MagicMock(side_effect=lambda query, parameters: [(2, 0.0), (3, 0.5)] if "pgr_" in query else QUERY_RESULT),
+        ) as mock_query_db:
+            for _ in range(2):
+                get_isochrones({"lat": 52.363066102529295, "lon": 4.907205867943042})
+
+        # the tree is computed once, the second request only joins the costs with the links
+        tree_queries = [call.args for call in mock_query_db.call_args_list if "pgr_dijkstraCost" in call.args[0]]
+        assert tree_queries == [(tree_queries[0][0], {"start_node": 2, "max_cost": None})]
+        query, parameters = mock_query_db.call_args.args
+        assert "unnest(%(nodes)s::integer[]" in query
+        assert parameters["nodes"] == [2, 3]
+        assert parameters["agg_costs"] == [0.0, 0.5]
+
+    @patch("bereikbaarheid.isochrones.isochrones.use_memory_snapping", MagicMock(return_value=True))
+    @patch("bereikbaarheid.isochrones.isochrones.use_memory_engine", MagicMock(return_value=True))
+    @patch("bereikbaarheid.isochrones.isochrones.nearest_node", MagicMock(return_value=2))
+    def test_source_tree_is_reused_memory_engine(self, tree_cache):
+        tree_cache.maxsize = 2
+        with (
+            patch("bereikbaarheid.isochrones.isochrones.django_query_db", MagicMock(return_value=[])),
+            patch(
+                "bereikbaarheid.isochrones.isochrones.aggregated_costs", MagicMock(return_value=([2], [0.0]))
+            ) as aggregated_costs,
+        ):
+            get_isochrones({"lat": 52.363066102529295, "lon": 4.907205867943042, "max_minutes": 15})
+            get_isochrones({"lat": 52.363066102529295, "lon": 4.907205867943042, "max_minutes": 15})
+            get_isochrones({"lat": 52.363066102529295, "lon": 4.907205867943042, "max_minutes": 30})
+
+        assert aggregated_costs.call_count == 2
+
+    def test_get_isochrone_bands_bounded(self):
+        with patch("bereikbaarheid.isochrones.isochrones.django_query_db", MagicMock(return_value=[])) as mock_query_db:
+            get_isochrone_bands({"lat": 52.363066102529295, "lon": 4.907205867943042, "bands": [5, 30]})
+
+        assert mock_query_db.call_args.args[1]["max_cost"] == 0.5
+
+
+class TestIsochronesSerializer:
+    LOCATION = {"lat": 52.363066102529295, "lon": 4.907205867943042}
+
+    @pytest.mark.parametrize(
+        "bands, expected",
+        [(None, None), ("15,5,10", [5, 10, 15]), ([10, 5, 5], [5, 10])],
+    )
+    def test_bands(self, bands, expected):
+        data = {**self.LOCATION, "bands": bands} if bands is not None else self.LOCATION
+        assert IsochronesSerializer().load(data)["bands"] == expected
+
+    def test_max_minutes(self):
+        assert IsochronesSerializer().load({**self.LOCATION, "maxMinutes": "15"})["max_minutes"] == 15
+        with pytest.raises(ValidationError):
+            IsochronesSerializer().load({**self.LOCATION, "maxMinutes": 121})
+
+    @pytest.mark.parametrize("bands", ["", "5,a", [0, 5], [121], list(range(1, 12))])
+    def test_invalid_bands(self, bands):
+        with pytest.raises(ValidationError) as error:
+            IsochronesSerializer().load({**self.LOCATION, "bands": bands})
+        assert "bands" in error.value.messages
@@ -1,8 +1,11 @@
+import json
 from unittest.mock import MagicMock, patch
 
 import pytest
+from marshmallow import ValidationError
 
-from bereikbaarheid.permits.permits import _transform_results, get_permits
+from bereikbaarheid.permits.permits import _transform_results, get_permits, get_permits_batch
+from bereikbaarheid.permits.serializers import MAX_LOCATIONS, PermitsBatchSerializer
 
 QUERY_RESULT = (
     1234,
@@ -71,3 +74,70 @@ class TestPermits:
         result = get_permits(serialized_data)
         assert "id" in result
         assert "attributes" in result
+
+    @patch("bereikbaarheid.permits.permits.use_memory_snapping", MagicMock(return_value=False))
+    @patch("bereikbaarheid.permits.permits.use_memory_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.permits.permits.use_precomputed_engine", MagicMock(return_value=False))
+    def test_get_permits_batch(self):
+        no_road = (1,) + (None,) + QUERY_RESULT[1:]
+        with patch(
+            "bereikbaarheid.permits.permits.django_query_db",
+            MagicMock(return_value=[(0,) + QUERY_RESULT, no_road]),
+        ) as query_db:
+            result = get_permits_batch(
+                {
+                    "aanhanger": False,
+                    "locations": [{"lat": 52.37, "lon": 4.89}, {"lat": 52.38, "lon": 4.9}],
+                }
+            )
+
+        query, parameters = query_db.call_args.args
+        # the routing is done once, for all locations
+        assert query.count("pgr_dijkstraCost") == 1
+        assert json.loads(parameters["locations"]) == [
+            {"nr": 0, "lat": 52.37, "lon": 4.89},
+            {"nr": 1, "lat": 52.38, "lon": 4.9},
+        ]
+        assert result == [_transform_results(QUERY_RESULT), {}]
+
+    @patch("bereikbaarheid.permits.permits.use_memory_snapping", MagicMock(return_value=True))
+    @patch("bereikbaarheid.permits.permits.use_memory_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.permits.permits.use_precomputed_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.permits.permits.nearest_link", MagicMock(side_effect=[10, None]))
+    def test_get_permits_batch_memory_snapping(self):
+        with patch("bereikbaarheid.permits.permits.django_query_db", MagicMock(return_value=[])) as query_db:
+            get_permits_batch({"locations": [{"lat": 52.37, "lon": 4.89}, {"lat": 52.38, "lon": 4.9}]})
+
+        query, parameters = query_db.call_args.args
+        assert "(l.link_id) as link_id" in query
+        assert [location["link_id"] for location in json.loads(parameters["locations"])] == [10, None]
+
+
+class TestPermitsBatchSerializer:
+    VEHICLE = {
+        "permitLowEmissionZone": False,
+        "permitZzv": True,
+        "vehicleAxleWeight": 10000,
+        "vehicleHasTrailer": False,
+        "vehicleHeight": 2.65,
+        "vehicleLength": 8.23,
+        "vehicleTotalWeight": 26500,
+        "vehicleType": "Bedrijfsauto",
+        "vehicleWidth": 2.55,
+        "vehicleMaxAllowedWeight": 26500,
+    }
+
+    def test_load(self):
+        data = PermitsBatchSerializer().load({**self.VEHICLE, "locations": [{"lat": 52.37, "lon": 4.89}]})
+
+        assert data["locations"] == [{"lat": 52.37, "lon": 4.89}]
+        assert data["bedrijfsauto"] is True
+
+    @pytest.mark.parametrize(
+        "locations",
+        [[], [{"lat": 50.0, "lon": 4.89}], [{"lat": 52.37, "lon": 4.89}] * (MAX_LOCATIONS + 1)],
+    )
+    def test_invalid_locations(self, locations):
+        with pytest.raises(ValidationError) as error:
+            PermitsBatchSerializer().load({**self.VEHICLE, "locations": locations})
+        assert "locations" in error.value.messages
@@ -1,8 +1,16 @@
+import json
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from bereikbaarheid.prohibitory.prohibitory import _transform_results, get_prohibitory
+from bereikbaarheid.cache import ResponseCache
+from bereikbaarheid.prohibitory.prohibitory import (
+    _transform_results,
+    get_prohibitory,
+    get_prohibitory_profiles,
+    get_prohibitory_tile,
+    iter_prohibitory,
+)
 
 QUERY_RESULT = [(123, 456, '{"geom":[4.12, 52.9]}')]
 
@@ -17,7 +25,7 @@ class TestProhibitory:
                     {
                         "type": "Feature",
                         "properties": {"bereikbaar_status_code": 456, "id": 123},
-                        "geometry": {"geom": [4.12, 52.9]},
+                        "geometry": '{"geom":[4.12, 52.9]}',
                     }
                 ],
             )
@@ -54,3 +62,187 @@ class TestProhibitory:
         }
         result = get_prohibitory(serialized_data)
         assert len(result) == 1
+
+    @patch("bereikbaarheid.prohibitory.prohibitory.reachable_nodes", MagicMock(return_value=[1, 2]))
+    def test_get_prohibitory_memory_engine(self, settings):
+        """
+        With the in-memory routing engine the reachable nodes are passed to the query
+        instead of running pgr_dijkstraCost
+        :return:
+        """
+        settings.ROUTING_ENGINE = "memory"
+        with patch(
+            "bereikbaarheid.prohibitory.prohibitory.django_query_db",
+            MagicMock(return_value=QUERY_RESULT),
+        ) as mock_query_db:
+            result = get_prohibitory({"lengte": 6.2})
+
+        query, parameters = mock_query_db.call_args.args
+        assert "pgr_dijkstraCost" not in query
+        assert parameters["reachable_nodes"] == [1, 2]
+        assert len(result) == 1
+
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_memory_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_precomputed_engine", MagicMock(return_value=True))
+    @patch("bereikbaarheid.prohibitory.prohibitory.reachability_profile", MagicMock(return_value=None))
+    @patch("bereikbaarheid.prohibitory.prohibitory.reachable_nodes", MagicMock(return_value=[1, 2]))
+    def test_get_prohibitory_not_precomputed(self):
+        """
+        A profile that is not precomputed is calculated in memory, it is not stored
+        :return:
+        """
+        with patch(
+            "bereikbaarheid.prohibitory.prohibitory.django_query_db",
+            MagicMock(return_value=QUERY_RESULT),
+        ) as mock_query_db:
+            get_prohibitory({"lengte": 6.2})
+
+        query, parameters = mock_query_db.call_args.args
+        assert "bereikbaarheid_bereikbareknopen" not in query
+        assert parameters["reachable_nodes"] == [1, 2]
+
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_memory_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_precomputed_engine", MagicMock(return_value=False))
+    def test_get_prohibitory_viewport(self):
+        with patch(
+            "bereikbaarheid.prohibitory.prohibitory.django_query_db",
+            MagicMock(return_value=QUERY_RESULT),
+        ) as mock_query_db:
+            get_prohibitory({"lengte": 6.2, "bbox": (4.85, 52.35, 4.95, 52.4), "zoom": 12})
+
+        query, parameters = mock_query_db.call_args.args
+        assert "n.geom4326 && st_transform(" in query
+        assert "ST_AsGeoJSON(g.geom4326simply)" in query
+        assert parameters["bbox_xmin"] == 4.85
+
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_memory_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_precomputed_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.cache.current_network_version", MagicMock(return_value=None))
+    @patch("bereikbaarheid.prohibitory.prohibitory.reachable_nodes_cache", ResponseCache(4, 60))
+    def test_get_prohibitory_tile(self):
+        with patch(
+            "bereikbaarheid.prohibitory.prohibitory.django_query_db",
+            MagicMock(
+                side_effect=lambda query, *args, **kwargs: (
+                    [(902205, 1, 0.0), (902205, 2, 10.0)] if "pgr_dijkstraCost" in query else (memoryview(b"tile"),)
+                )
+            ),
+        ) as mock_query_db:
+            result = get_prohibitory_tile({"lengte": 6.2}, 12, 2103, 1346)
+            get_prohibitory_tile({"lengte": 6.2}, 12, 2103, 1347)
+
+        query, parameters = mock_query_db.call_args.args
+        assert result == b"tile"
+        assert "ST_AsMVT(tile, 'prohibitory'" in query
+        assert "ST_AsMVTGeom(st_transform(g.geom4326simply, 3857)" in query
+        assert "n.geom4326 && st_transform(" in query
+        assert (parameters["z"], parameters["x"], parameters["y"]) == (12, 2103, 1347)
+        # the network is routed once for both tiles, a tile only filters the reachable nodes
+        assert "pgr_dijkstraCost" not in query
+        assert parameters["reachable_nodes"] == [1, 2]
+        assert sum("pgr_dijkstraCost" in call.args[0] for call in mock_query_db.call_args_list) == 1
+
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_memory_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_precomputed_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.cache.current_network_version", MagicMock(return_value=None))
+    @patch("bereikbaarheid.prohibitory.prohibitory.reachable_nodes_cache", ResponseCache(4, 60))
+    def test_get_prohibitory_tile_empty(self):
+        with patch(
+            "bereikbaarheid.prohibitory.prohibitory.django_query_db",
+            MagicMock(side_effect=lambda query, *args, **kwargs: [] if "pgr_dijkstraCost" in query else (None,)),
+        ):
+            result = get_prohibitory_tile({"lengte": 6.2}, 12, 2103, 1346)
+
+        assert result == b""
+
+    @patch(
+        "bereikbaarheid.prohibitory.prohibitory.django_query_db_iter",
+        MagicMock(return_value=iter(QUERY_RESULT)),
+    )
+    def test_iter_prohibitory(self):
+        result = iter_prohibitory({"lengte": 6.2})
+        assert list(result) == _transform_results(QUERY_RESULT)
+
+
+class TestProhibitoryProfiles:
+    PROFILES = {"profiles": [{"lengte": 6.2, "bus": False}, {"lengte": 12.0, "bus": True}]}
+
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_memory_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_precomputed_engine", MagicMock(return_value=False))
+    def test_get_prohibitory_profiles(self):
+        with patch(
+            "bereikbaarheid.prohibitory.prohibitory.django_query_db",
+            MagicMock(return_value=[(123, [999, 11001], '{"geom":[4.12, 52.9]}')]),
+        ) as mock_query_db:
+            result = get_prohibitory_profiles(self.PROFILES)
+
+        query, parameters = mock_query_db.call_args.args
+        # one query, the network is searched per graph
+        assert query.count("pgr_dijkstraCost") == 1
+        assert "p.permit_zone_milieu" in query
+        assert "%(" not in query.replace("%(profiles)s", "").replace("%(graphs)s", "")
+        assert json.loads(parameters["profiles"]) == [
+            {"nr": 0, "lengte": 6.2, "bus": False, "graph": 0},
+            {"nr": 1, "lengte": 12.0, "bus": True, "graph": 1},
+        ]
+        assert [graph["graph"] for graph in json.loads(parameters["graphs"])] == [0, 1]
+        assert result == [
+            {
+                "type": "Feature",
+                "properties": {"bereikbaar_status_codes": [999, 11001], "id": 123},
+                "geometry": '{"geom":[4.12, 52.9]}',
+            }
+        ]
+
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_memory_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_precomputed_engine", MagicMock(return_value=False))
+    def test_get_prohibitory_profiles_same_graph(self):
+        profiles = {"profiles": [{"lengte": 6.2, "bus": False}, {"lengte": 12.0}, {"lengte": 6.2, "bus": False}]}
+        with patch(
+            "bereikbaarheid.prohibitory.prohibitory.django_query_db", MagicMock(return_value=[])
+        ) as mock_query_db:
+            get_prohibitory_profiles(profiles)
+
+        _, parameters = mock_query_db.call_args.args
+        assert [profile["graph"] for profile in json.loads(parameters["profiles"])] == [0, 1, 0]
+        assert len(json.loads(parameters["graphs"])) == 2
+
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_memory_engine", MagicMock(return_value=True))
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_precomputed_engine", MagicMock(return_value=False))
+    @patch(
+        "bereikbaarheid.prohibitory.prohibitory.reachable_nodes_per_graph",
+        MagicMock(return_value=([0, 0], [[1, 2]])),
+    )
+    def test_get_prohibitory_profiles_memory_engine(self):
+        with patch(
+            "bereikbaarheid.prohibitory.prohibitory.django_query_db", MagicMock(return_value=[])
+        ) as mock_query_db:
+            get_prohibitory_profiles(self.PROFILES)
+
+        query, parameters = mock_query_db.call_args.args
+        assert "pgr_dijkstraCost" not in query
+        assert [profile["graph"] for profile in json.loads(parameters["profiles"])] == [0, 0]
+        assert json.loads(parameters["graphs"]) == [{"graph": 0, "reachable_nodes": [1, 2]}]
+
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_memory_engine", MagicMock(return_value=False))
+    @patch("bereikbaarheid.prohibitory.prohibitory.use_precomputed_engine", MagicMock(return_value=True))
+    @patch("bereikbaarheid.prohibitory.prohibitory.reachability_profile", MagicMock(side_effect=["key", None]))
+    def test_get_prohibitory_profiles_precomputed_engine(self):
+        with (
+            patch(
+                "bereikbaarheid.prohibitory.prohibitory.reachable_nodes_per_graph",
+                MagicMock(return_value=([0], [[1]])),
+            ) as reachable_nodes_per_graph,
+            patch(
+                "bereikbaarheid.prohibitory.prohibitory.django_query_db", MagicMock(return_value=[])
+            ) as mock_query_db,
+        ):
+            get_prohibitory_profiles(self.PROFILES)
+
+        query, parameters = mock_query_db.call_args.args
+        assert "bereikbaarheid_bereikbareknopen" in query
+        # only the profile that is not precomputed is routed
+        assert reachable_nodes_per_graph.call_args.args[0] == [
+            {"nr": 1, "lengte": 12.0, "bus": True, "profile_key": None, "graph": 0}
+        ]
+        assert [profile.get("graph") for profile in json.loads(parameters["profiles"])] == [None, 0]
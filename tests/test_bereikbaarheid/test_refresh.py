@@ -0,0 +1,135 @@
+import time
+from unittest.mock import MagicMock, patch
+
+from bereikbaarheid.models import Lastbeperking, VerkeersBord, Vma
+from bereikbaarheid.refresh import RefreshScheduler
+
+
+def wait_for(scheduler: RefreshScheduler, timeout: float = 2):
+    end = time.monotonic() + timeout
+    while scheduler.stats()["running"] and time.monotonic() < end:
+        time.sleep(0.01)
+
+
+@patch("bereikbaarheid.refresh.connections", MagicMock())
+class TestRefreshScheduler:
+    def test_burst_is_coalesced(self):
+        refresh = MagicMock()
+        scheduler = RefreshScheduler("test", refresh, delay=0.05)
+
+        for _ in range(10):
+            scheduler._request(Vma if _ % 2 else Lastbeperking)
+        assert scheduler.stats()["pending"] == 10
+        assert scheduler.stats()["dirty"] == ["Lastbeperking", "Vma"]
+        refresh.assert_not_called()
+
+        wait_for(scheduler)
+        refresh.assert_called_once_with(Lastbeperking, Vma, link_nrs=None)
+        assert scheduler.stats()["pending"] == 0
+        assert scheduler.last_duration is not None
+
+    def test_request_during_refresh(self):
+        scheduler = RefreshScheduler("test", None, delay=0.01)
+        scheduler.refresh = MagicMock(
+            side_effect=lambda *models, **kwargs: scheduler.refresh.call_count == 1 and scheduler._request(Vma)
+        )
+
+        scheduler._request(Vma)
+        wait_for(scheduler)
+        assert scheduler.refresh.call_count == 2
+
+    def test_failed_refresh(self):
+        scheduler = RefreshScheduler("test", MagicMock(side_effect=Exception("error")), delay=0.01)
+
+        scheduler._request(Vma)
+        wait_for(scheduler)
+        assert not scheduler.stats()["running"]
+        assert scheduler.last_duration is None
+
+    def test_no_delay(self):
+        refresh = MagicMock()
+        scheduler = RefreshScheduler("test", refresh, delay=0)
+
+        scheduler._request(Vma)
+        refresh.assert_called_once()
+        assert not scheduler.stats()["running"]
+
+    def test_flush(self):
+        refresh = MagicMock()
+        scheduler = RefreshScheduler("test", refresh, delay=60)
+
+        scheduler._request(Vma)
+        scheduler._request(Vma)
+        scheduler.flush()
+        refresh.assert_called_once()
+        assert scheduler.stats()["pending"] == 0
+
+    def test_link_nrs_are_collected(self):
+        refresh = MagicMock()
+        scheduler = RefreshScheduler("test", refresh, delay=60)
+
+        scheduler._request(Lastbeperking, {1, 2})
+        scheduler._request(VerkeersBord, {-2, 3})
+        assert scheduler.stats()["link_nrs"] == 4
+        scheduler.flush()
+        refresh.assert_called_once_with(Lastbeperking, VerkeersBord, link_nrs={1, 2, -2, 3})
+
+    def test_all_links(self):
+        refresh = MagicMock()
+        scheduler = RefreshScheduler("test", refresh, delay=60)
+
+        scheduler._request(Lastbeperking, {1})
+        scheduler._request(Vma)
+        scheduler._request(Lastbeperking, {2})
+        scheduler.flush()
+        refresh.assert_called_once_with(Lastbeperking, Vma, link_nrs=None)
+
+
+@patch("bereikbaarheid.refresh.connections", MagicMock())
+@patch("bereikbaarheid.refresh.RefreshOpdracht")
+class TestRefreshJobs:
+    def test_schedule_stores_a_job(self, refresh_opdracht):
+        scheduler = RefreshScheduler("test", MagicMock(), delay=60)
+
+        with patch("bereikbaarheid.refresh.transaction") as transaction:
+            scheduler.schedule(Lastbeperking, {12.0, None})
+
+        refresh_opdracht.objects.create.assert_called_once_with(
+            naam="test", model="bereikbaarheid.Lastbeperking", link_nrs=[12]
+        )
+        # the refresh is requested once the change is committed
+        transaction.on_commit.call_args.args[0]()
+        assert scheduler.stats()["pending"] == 1
+        assert scheduler.jobs == {refresh_opdracht.objects.create.return_value.pk}
+
+    def test_jobs_are_deleted_after_the_refresh(self, refresh_opdracht):
+        scheduler = RefreshScheduler("test", MagicMock(), delay=60)
+
+        scheduler._request(Vma, None, 1)
+        scheduler._request(Vma, None, 2)
+        scheduler.flush()
+        refresh_opdracht.objects.filter.assert_called_once_with(pk__in={1, 2})
+        refresh_opdracht.objects.filter.return_value.delete.assert_called_once()
+
+    def test_jobs_are_kept_after_a_failed_refresh(self, refresh_opdracht):
+        scheduler = RefreshScheduler("test", MagicMock(side_effect=Exception("error")), delay=60)
+
+        scheduler._request(Vma, None, 1)
+        scheduler.flush()
+        refresh_opdracht.objects.filter.assert_not_called()
+
+    def test_resume(self, refresh_opdracht):
+        refresh = MagicMock()
+        scheduler = RefreshScheduler("test", refresh, delay=60)
+        refresh_opdracht.objects.filter.return_value.order_by.return_value = [
+            MagicMock(pk=1, model="bereikbaarheid.Lastbeperking", link_nrs=[12]),
+            MagicMock(pk=2, model="bereikbaarheid.VerkeersBord", link_nrs=[-3]),
+        ]
+
+        with patch("bereikbaarheid.refresh.apps.get_model", MagicMock(side_effect=[Lastbeperking, VerkeersBord])):
+            assert scheduler.resume() == 2
+
+        refresh_opdracht.objects.filter.assert_called_once_with(naam="test")
+        scheduler.flush()
+        refresh.assert_called_once_with(Lastbeperking, VerkeersBord, link_nrs={12, -3})
+        refresh_opdracht.objects.filter.assert_called_with(pk__in={1, 2})
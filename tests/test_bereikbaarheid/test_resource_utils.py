@@ -1,21 +1,32 @@
 import datetime
+import io
+from unittest.mock import MagicMock, patch
 
 import pandas as pd
 import pytest
 from django.core.exceptions import ValidationError
+from django.db import DatabaseError, IntegrityError
+from import_export.resources import ModelResource
+from import_export.results import Result, RowResult
 from model_bakery import baker
 
-from bereikbaarheid.models import Gebied, VerkeersPaal, Verrijking, Vma
+from bereikbaarheid.models import Gebied, Lastbeperking, VerkeersPaal, Verrijking, Vma
 from bereikbaarheid.resources.utils import (
     GEOJSON,
     SCSV,
+    VIEW_DEPENDENCIES,
+    ImportDiffMixin,
     clean_dataset_headers,
     convert_str,
     convert_to_date,
     convert_to_time,
+    dependent_views,
+    import_has_changes,
     refresh_materialized,
+    refresh_network,
     remove_chars_from_value,
     truncate,
+    update_directed,
 )
 from bereikbaarheid.utils import django_query_db
 
@@ -219,6 +230,31 @@ class TestUtils:
         ds = gj.create_dataset(testgeojson)
         assert ds.headers == ["code", "geom"]
 
+    def test_GEOJSON_properties_of_all_features(self):
+        gj = GEOJSON()
+        ds = gj.create_dataset(
+            b'{"type": "FeatureCollection", "features": ['
+            b'{"type": "Feature", "properties": {"code": "a"}, "geometry": {"type": "Point", "coordinates": [1, 2]}},'
+            b'{"type": "Feature", "properties": {"code": "b", "naam": "c"},'
+            b' "geometry": {"type": "Point", "coordinates": [3, 4]}}'
+            b"]}"
+        )
+        assert ds.headers == ["code", "naam", "geom"]
+        assert ds["naam"] == [None, "c"]
+
+    def test_GEOJSON_crs_after_features(self):
+        crs = {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::4326"}}
+        gj = GEOJSON()
+        # a file is read twice, for the headers and crs and then for the rows
+        ds = gj.create_dataset(
+            io.BytesIO(
+                b'{"type": "FeatureCollection", "features": ['
+                b'{"type": "Feature", "properties": {"code": "a"}, "geometry": {"type": "Point", "coordinates": [1, 2]}}'
+                b'], "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::4326"}}}'
+            )
+        )
+        assert ds["geom"] == [str({"type": "Point", "coordinates": [1, 2], "crs": crs})]
+
     def test_SCSV_raise(self, csv_file):
         sc = SCSV()
         with pytest.raises(ValidationError) as e:
@@ -242,3 +278,171 @@ class TestUtils:
             """
         result = django_query_db(raw_query, {})
         assert len(result) == 1
+
+    @pytest.mark.django_db
+    def test_refresh_materialized_concurrently(self, vma, gebied, verrijking):
+        vma.save()
+        gebied.save()
+        verrijking.save()
+        refresh_materialized("bereikbaarheid_out_vma_undirected", concurrently=True)
+
+        raw_query = """
+            SELECT indexname FROM pg_indexes
+            WHERE tablename = 'bereikbaarheid_out_vma_undirected' AND indexdef LIKE 'CREATE UNIQUE INDEX%%'
+            """
+        assert django_query_db(raw_query, {}) == [("bereikbaarheid_out_vma_undirected_link_nr_uniq",)]
+
+    @pytest.mark.parametrize(
+        "side_effect, expected",
+        [
+            ([None], ["REFRESH MATERIALIZED VIEW CONCURRENTLY some_view"]),
+            (
+                [DatabaseError("no unique index"), None],
+                ["REFRESH MATERIALIZED VIEW CONCURRENTLY some_view", "REFRESH MATERIALIZED VIEW some_view"],
+            ),
+        ],
+    )
+    def test_refresh_materialized_fallback(self, side_effect, expected):
+        cursor = MagicMock()
+        cursor.execute.side_effect = side_effect
+
+        with (
+            patch("bereikbaarheid.resources.utils.connection") as connection,
+            patch("bereikbaarheid.resources.utils.transaction") as transaction,
+        ):
+            connection.cursor.return_value.__enter__.return_value = cursor
+            connection.cursor.return_value.__exit__.return_value = False
+            transaction.atomic.return_value.__exit__.return_value = False
+            refresh_materialized("some_view", concurrently=True)
+
+        assert [c.args[0].strip() for c in cursor.execute.call_args_list] == expected
+
+    def test_refresh_materialized_not_unique(self):
+        cursor = MagicMock()
+        cursor.execute.side_effect = [IntegrityError("duplicate key"), None, None]
+        cursor.fetchone.return_value = ("SELECT 1 AS link_nr;",)
+        cursor.fetchall.return_value = [(12,)]
+
+        with (
+            patch("bereikbaarheid.resources.utils.connection") as connection,
+            patch("bereikbaarheid.resources.utils.transaction") as transaction,
+            patch("bereikbaarheid.resources.utils.log") as log,
+            pytest.raises(IntegrityError),
+        ):
+            connection.cursor.return_value.__enter__.return_value = cursor
+            connection.cursor.return_value.__exit__.return_value = False
+            transaction.atomic.return_value.__exit__.return_value = False
+            refresh_materialized("bereikbaarheid_out_vma_undirected", concurrently=False)
+
+        # the schema is not changed, the duplicate keys are logged
+        queries = [c.args[0].strip() for c in cursor.execute.call_args_list]
+        assert queries[0] == "REFRESH MATERIALIZED VIEW bereikbaarheid_out_vma_undirected"
+        assert queries[2] == "SELECT link_nr FROM (SELECT 1 AS link_nr) v GROUP BY link_nr HAVING count(*) > 1 LIMIT 20"
+        assert not any("DROP" in query for query in queries)
+        assert "[(12,)]" in log.error.call_args.args[0]
+
+    @pytest.mark.parametrize(
+        "db_tables, expected",
+        [
+            (
+                ["bereikbaarheid_vma"],
+                [
+                    "bereikbaarheid_out_vma_undirected",
+                    "bereikbaarheid_out_vma_directed",
+                    "bereikbaarheid_out_vma_node",
+                    "bereikbaarheid_out_load_unload",
+                ],
+            ),
+            (["bereikbaarheid_lastbeperking"], ["bereikbaarheid_out_vma_directed", "bereikbaarheid_out_vma_node"]),
+            (
+                ["bereikbaarheid_verkeersbord"],
+                ["bereikbaarheid_out_vma_directed", "bereikbaarheid_out_vma_node", "bereikbaarheid_out_load_unload"],
+            ),
+            (["bereikbaarheid_venstertijdweg"], ["bereikbaarheid_out_load_unload"]),
+            (["bereikbaarheid_verkeerspaal"], []),
+        ],
+    )
+    def test_dependent_views(self, db_tables, expected):
+        views = dependent_views(db_tables)
+        assert sorted(views) == sorted(expected)
+        # in order of dependency
+        for view in views:
+            for dependency in VIEW_DEPENDENCIES[view]:
+                assert dependency not in views or views.index(dependency) < views.index(view)
+
+    @pytest.mark.parametrize("checksums, skipped", [(["a", "a"], True), (["a", "b"], False), ([None, None], False)])
+    def test_refresh_network_skips_unchanged_topology(self, checksums, skipped):
+        with (
+            patch("bereikbaarheid.resources.utils.topology_checksum", MagicMock(side_effect=checksums)),
+            patch("bereikbaarheid.resources.utils.refresh_materialized") as refresh_materialized,
+            patch("bereikbaarheid.resources.utils.rebuild_directed") as rebuild_directed,
+            patch("bereikbaarheid.refresh.reachability_scheduler") as reachability_scheduler,
+            patch("bereikbaarheid.resources.utils.bump_network_version"),
+        ):
+            refreshed = refresh_network(Verrijking)
+
+        node = [] if skipped else ["bereikbaarheid_out_vma_node"]
+        assert sorted(refreshed) == sorted(
+            ["bereikbaarheid_out_vma_undirected", "bereikbaarheid_out_vma_directed", "bereikbaarheid_out_load_unload"]
+            + node
+        )
+        assert "bereikbaarheid_out_vma_directed" not in [c.args[0] for c in refresh_materialized.call_args_list]
+        rebuild_directed.assert_called_once()
+        reachability_scheduler.schedule.assert_called_once()
+
+    def test_refresh_network_links(self):
+        with (
+            patch("bereikbaarheid.resources.utils.topology_checksum") as topology_checksum,
+            patch("bereikbaarheid.resources.utils.refresh_materialized") as refresh_materialized,
+            patch("bereikbaarheid.resources.utils.update_directed") as update_directed,
+            patch("bereikbaarheid.refresh.reachability_scheduler"),
+            patch("bereikbaarheid.resources.utils.bump_network_version"),
+        ):
+            refreshed = refresh_network(Lastbeperking, link_nrs={12})
+
+        # the topology can not have changed, the node view is skipped
+        assert refreshed == ["bereikbaarheid_out_vma_directed"]
+        update_directed.assert_called_once_with({12})
+        refresh_materialized.assert_not_called()
+        topology_checksum.assert_not_called()
+
+    def test_update_directed(self):
+        cursor = MagicMock()
+
+        with (
+            patch("bereikbaarheid.resources.utils.connection") as connection,
+            patch("bereikbaarheid.resources.utils.transaction"),
+            patch("bereikbaarheid.resources.utils._reset_derived") as reset_derived,
+        ):
+            connection.cursor.return_value.__enter__.return_value = cursor
+            update_directed([12, -12, 0, 7])
+
+        assert cursor.execute.call_args.args[1] == {"ids": [-12, -7, 7, 12]}
+        reset_derived.assert_called_once()
+
+    def test_import_has_changes(self):
+        result = Result()
+        assert not import_has_changes(result)
+
+        result.totals[RowResult.IMPORT_TYPE_SKIP] = 10
+        assert not import_has_changes(result)
+
+        result.totals[RowResult.IMPORT_TYPE_UPDATE] = 1
+        assert import_has_changes(result)
+
+    def test_import_diff_mixin(self):
+        class Resource(ImportDiffMixin, ModelResource):
+            link_field = "link_gevalideerd"
+
+        resource = Resource()
+        for import_type, link_nr, original in [
+            (RowResult.IMPORT_TYPE_NEW, 1, None),
+            (RowResult.IMPORT_TYPE_UPDATE, -2, MagicMock(link_gevalideerd=3)),
+            (RowResult.IMPORT_TYPE_SKIP, 4, MagicMock(link_gevalideerd=4)),
+        ]:
+            row_result = RowResult()
+            row_result.import_type = import_type
+            row_result.original = original
+            resource.after_import_row({"link_gevalideerd": link_nr}, row_result)
+
+        assert resource.changed_link_nrs == {1, -2, 3}
@@ -0,0 +1,93 @@
+from datetime import time
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from bereikbaarheid.routing.bollards import NO_CAR_COST, BollardNetwork, get_bollard_network, reset_bollard_network
+from bereikbaarheid.routing.engine import START_NODE
+from bereikbaarheid.routing.network import Network
+
+DAYS = ["ma", "di", "wo", "do", "vr", "za", "zo"]
+
+
+def objects(*values) -> np.ndarray:
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+# START_NODE -> 2 -> 4 is a car road with a bollard (link 3),
+# START_NODE -> 3 -> 4 is not accessible for cars and has a bollard on weekdays 8:00 - 12:00 (link 5)
+NETWORK = Network(
+    {
+        "id": np.array([1, -3, 4, 5]),
+        "source": np.array([START_NODE, 2, START_NODE, 3]),
+        "target": np.array([2, 4, 3, 4]),
+        "cost": np.array([1.0, 1.0, 1.0, 1.0]),
+        "car": np.array([True, True, False, False]),
+        "no_car": np.array([False, False, True, True]),
+        "bollard": np.array([False, True, False, True]),
+        "dagen": objects(None, DAYS, None, DAYS[:5]),
+        "begin_tijd": objects(None, time(0, 0), None, time(8, 0)),
+        "eind_tijd": objects(None, time(23, 59), None, time(12, 0)),
+    }
+)
+
+
+@pytest.fixture
+def bollard_network():
+    return BollardNetwork(NETWORK, maxsize=2)
+
+
+class TestBollardNetwork:
+    def test_costs(self, bollard_network):
+        # the edges in CSR order: -3, 5, 1, 4
+        assert bollard_network.costs((None, None, None)).tolist() == [10000.0, NO_CAR_COST, 1.0, NO_CAR_COST]
+        assert bollard_network.costs(("za", None, None)).tolist()[1] == 2 * NO_CAR_COST
+        assert bollard_network.costs((None, time(7, 0), time(12, 0))).tolist()[1] == 2 * NO_CAR_COST
+
+    @pytest.mark.parametrize(
+        "window, expected",
+        [
+            ((None, None, None), [1, 3]),
+            (("di", time(9, 0), time(11, 0)), [1, 3]),
+        ],
+    )
+    def test_route(self, bollard_network, window, expected):
+        assert bollard_network.route(4, window) == expected
+
+    def test_route_unreachable(self, bollard_network):
+        assert bollard_network.route(5, (None, None, None)) == []
+        assert bollard_network.route(START_NODE, (None, None, None)) == []
+
+    def test_trees_are_reused(self, bollard_network):
+        tree = bollard_network.tree(("di", time(9, 0), time(11, 0)))
+        # other windows that block the same bollards share the tree
+        assert bollard_network.tree(("di", time(9, 30), time(10, 0))) is tree
+        assert bollard_network.tree(("za", time(9, 0), time(11, 0))) is tree
+        assert bollard_network.tree((None, None, None)) is not tree
+
+    def test_trees_are_evicted(self, bollard_network):
+        bollard_network.maxsize = 1
+        tree = bollard_network.tree(("di", time(9, 0), time(11, 0)))
+        bollard_network.tree((None, None, None))
+        assert bollard_network.tree(("di", time(9, 0), time(11, 0))) is not tree
+
+    def test_blocked(self, bollard_network):
+        # the edges in CSR order: -3, 5, 1, 4
+        assert bollard_network.blocked((None, None, None)).tolist() == []
+        assert bollard_network.blocked(("za", None, None)).tolist() == [1]
+
+
+@patch("bereikbaarheid.routing.bollards._load_bollard_network", MagicMock(side_effect=lambda: MagicMock()))
+def test_get_bollard_network_is_reloaded_for_a_new_network_version():
+    reset_bollard_network()
+    with patch("bereikbaarheid.routing.bollards.current_network_versie", MagicMock(return_value=1)) as versie:
+        bollard_network = get_bollard_network()
+        assert get_bollard_network() is bollard_network
+
+        # e.g. the bollards are imported
+        versie.return_value = 2
+        assert get_bollard_network() is not bollard_network
+    reset_bollard_network()
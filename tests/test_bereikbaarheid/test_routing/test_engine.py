@@ -0,0 +1,123 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from bereikbaarheid.routing.engine import (
+    START_NODE,
+    aggregated_costs,
+    get_network,
+    profile_reachable_nodes,
+    reachable_nodes,
+    reachable_nodes_per_graph,
+    reset_network,
+    restriction_mask,
+    vehicle_profile,
+)
+from bereikbaarheid.routing.network import Network
+
+NAN = np.nan
+
+# START_NODE -> 2 -> 3, the edge to 3 has a height restriction of 3 meters
+# and the edge 2 -> 4 is closed for trailers
+NETWORK = Network(
+    {
+        "id": np.array([1, 2, 3]),
+        "source": np.array([START_NODE, 2, 2]),
+        "target": np.array([2, 3, 4]),
+        "cost": np.array([1.0, 1.0, 1.0]),
+        "c01": np.array([False, False, False]),
+        "c07": np.array([False, False, False]),
+        "c07a": np.array([False, False, False]),
+        "c10": np.array([False, False, True]),
+        "c17": np.array([NAN, NAN, NAN]),
+        "c18": np.array([NAN, NAN, NAN]),
+        "c19": np.array([NAN, 3.0, NAN]),
+        "c20": np.array([NAN, NAN, NAN]),
+        "c21": np.array([NAN, NAN, NAN]),
+    }
+)
+
+VEHICLE = {
+    "aslast_gewicht": 3175,
+    "aanhanger": False,
+    "hoogte": 2.5,
+    "lengte": 6.2,
+    "totaal_gewicht": 4899,
+    "breedte": 2.05,
+    "max_massa": 4899,
+    "bedrijfsauto": True,
+    "bus": False,
+}
+
+
+@patch("bereikbaarheid.routing.engine.get_network", MagicMock(return_value=NETWORK))
+class TestEngine:
+    @pytest.mark.parametrize(
+        "vehicle, expected_result",
+        [
+            ({}, [2, 3, 4]),
+            ({"hoogte": 3.0}, [2, 4]),
+            ({"aanhanger": True}, [2, 3]),
+        ],
+    )
+    def test_reachable_nodes(self, vehicle, expected_result):
+        # the start node itself is not returned, like pgr_dijkstraCost
+        result = reachable_nodes({**VEHICLE, **vehicle})
+        assert sorted(result) == expected_result
+
+    def test_reachable_nodes_per_graph(self):
+        vehicles = [VEHICLE, {**VEHICLE, "hoogte": 3.5}, {**VEHICLE, "hoogte": 2.0}, {**VEHICLE, "hoogte": 3.0}]
+        with patch("bereikbaarheid.routing.engine.profile_reachable_nodes", wraps=profile_reachable_nodes) as search:
+            graphs, nodes = reachable_nodes_per_graph(vehicles)
+
+        # the vehicles below and above the 3 meters restriction share a graph
+        assert graphs == [0, 1, 0, 1]
+        assert [sorted(graph) for graph in nodes] == [[2, 3, 4], [2, 4]]
+        assert search.call_count == 2
+
+    def test_restriction_mask_margin(self):
+        mask = restriction_mask(NETWORK.edges, {**VEHICLE, "hoogte": 3.005}, dimension_margin=0.01)
+        assert mask.all()
+
+    def test_restriction_mask_c07(self):
+        edges = {**NETWORK.edges, "c07": NETWORK.edges["id"] == 1}
+        assert restriction_mask(edges, VEHICLE).tolist() == (NETWORK.edges["id"] != 1).tolist()
+        assert restriction_mask(edges, {**VEHICLE, "max_massa": 3500}).all()
+
+    def test_aggregated_costs(self):
+        nodes, agg_costs = aggregated_costs(2)
+        assert dict(zip(nodes, agg_costs)) == {3: 1.0, 4: 1.0}
+
+    def test_aggregated_costs_max_cost(self):
+        # like pgr_drivingDistance the start node is included
+        nodes, agg_costs = aggregated_costs(START_NODE, max_cost=1.5)
+        assert dict(zip(nodes, agg_costs)) == {START_NODE: 0.0, 2: 1.0}
+
+    @pytest.mark.parametrize(
+        "vehicle, expected_c19",
+        [
+            ({"hoogte": 2.5}, None),
+            ({"hoogte": 3.0}, 3.0),
+            ({"hoogte": 3.5}, 3.0),
+        ],
+    )
+    def test_vehicle_profile(self, vehicle, expected_c19):
+        profile = vehicle_profile(NETWORK.edges, {**VEHICLE, **vehicle})
+        assert profile["c19"] == expected_c19
+        assert profile["c17"] is None
+        assert profile["c07"] is True
+        assert profile["c10"] is False
+
+
+@patch("bereikbaarheid.routing.engine._load_network", MagicMock(side_effect=lambda: MagicMock()))
+def test_get_network_is_reloaded_for_a_new_network_version():
+    reset_network()
+    with patch("bereikbaarheid.routing.engine.current_network_versie", MagicMock(return_value=1)) as versie:
+        network = get_network()
+        assert get_network() is network
+
+        # refreshed in another process
+        versie.return_value = 2
+        assert get_network() is not network
+    reset_network()
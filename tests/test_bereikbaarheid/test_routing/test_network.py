@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pytest
+
+from bereikbaarheid.routing.network import Network
+
+# 1 -> 2 -> 3 -> 4 and a shortcut 1 -> 3, node 5 only has an outgoing edge
+EDGES = {
+    "id": np.array([10, 11, 12, 13, 14]),
+    "source": np.array([1, 2, 3, 1, 5]),
+    "target": np.array([2, 3, 4, 3, 1]),
+    "cost": np.array([1.0, 1.0, 1.0, 5.0, 1.0]),
+}
+
+
+@pytest.fixture
+def network():
+    return Network(EDGES)
+
+
+class TestNetwork:
+    def test_csr_layout(self, network):
+        assert network.nodes.tolist() == [1, 2, 3, 4, 5]
+        assert network.offsets.tolist() == [0, 2, 3, 4, 4, 5]
+        # the outgoing edges of node 1 are stored first, in their original order
+        assert network.edges["id"].tolist() == [10, 13, 11, 12, 14]
+        assert network.nodes[network.targets].tolist() == [2, 3, 3, 4, 1]
+
+    def test_node_index(self, network):
+        assert network.node_index(3) == 2
+        assert network.node_index(6) is None
+
+    def test_shortest_path_tree(self, network):
+        agg_costs, predecessors = network.shortest_path_tree(1)
+        assert agg_costs.tolist() == [0.0, 1.0, 2.0, 3.0, math.inf]
+        assert network.edges["id"][predecessors[3]] == 12
+        assert predecessors[0] == -1
+
+    def test_shortest_path_tree_mask(self, network):
+        mask = network.edges["id"] != 11
+        agg_costs, _ = network.shortest_path_tree(1, mask)
+        assert agg_costs.tolist() == [0.0, 1.0, 5.0, 6.0, math.inf]
+
+    def test_shortest_path_tree_max_cost(self, network):
+        agg_costs, _ = network.shortest_path_tree(1, max_cost=2)
+        assert agg_costs.tolist() == [0.0, 1.0, 2.0, math.inf, math.inf]
+
+    def test_shortest_path_tree_negative_cost(self):
+        network = Network({**EDGES, "cost": np.array([1.0, -1.0, 1.0, 5.0, 1.0])})
+        agg_costs, _ = network.shortest_path_tree(1)
+        assert agg_costs.tolist() == [0.0, 1.0, 5.0, 6.0, math.inf]
+
+    def test_shortest_path_tree_unknown_source(self, network):
+        agg_costs, predecessors = network.shortest_path_tree(6)
+        assert np.isinf(agg_costs).all()
+        assert (predecessors == -1).all()
+
+    def test_shortest_path_tree_costs(self, network):
+        # the edges in CSR order: 10, 13, 11, 12, 14
+        agg_costs, _ = network.shortest_path_tree(1, costs=np.array([1.0, 1.0, 1.0, 1.0, 1.0]))
+        assert agg_costs.tolist() == [0.0, 1.0, 1.0, 2.0, math.inf]
+
+    def test_path(self, network):
+        _, predecessors = network.shortest_path_tree(1)
+        assert network.edges["id"][network.path(predecessors, 4)].tolist() == [10, 11, 12]
+        assert network.path(predecessors, 1) == []
+        assert network.path(predecessors, 5) == []
+        assert network.path(predecessors, 6) == []
@@ -0,0 +1,67 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from bereikbaarheid.models import BereikbareKnopen
+from bereikbaarheid.routing.reachability import (
+    all_profiles,
+    count_profiles,
+    precompute_reachability,
+    profile_key,
+    reachability_profile,
+    refresh_reachability,
+)
+
+from .test_engine import NETWORK, VEHICLE
+
+
+@patch("bereikbaarheid.routing.engine.get_network", MagicMock(return_value=NETWORK))
+@patch("bereikbaarheid.routing.reachability.get_network", MagicMock(return_value=NETWORK))
+@patch("bereikbaarheid.routing.reachability.current_network_versie", MagicMock(return_value=1))
+class TestReachability:
+    def test_all_profiles(self):
+        profiles = list(all_profiles(NETWORK.edges))
+        # c19 has one threshold (None or 3.0), four boolean flags
+        assert len(profiles) == count_profiles(NETWORK.edges) == 2 * 2**4
+        assert len({profile_key(p) for p in profiles}) == len(profiles)
+
+    @pytest.mark.django_db
+    def test_reachability_profile(self):
+        # a request never stores a profile
+        assert reachability_profile({**VEHICLE, "hoogte": 3.2}) is None
+        assert not BereikbareKnopen.objects.exists()
+
+        precompute_reachability(all_profiles(NETWORK.edges))
+        key = reachability_profile({**VEHICLE, "hoogte": 3.2})
+        assert json.loads(key)["c19"] == 3.0
+        assert sorted(BereikbareKnopen.objects.get(profiel=key).knopen) == [2, 4]
+
+        # a vehicle in the same bucket uses the same stored nodes
+        assert reachability_profile({**VEHICLE, "hoogte": 3.9}) == key
+
+    @pytest.mark.django_db
+    def test_reachability_profile_stale(self):
+        precompute_reachability(all_profiles(NETWORK.edges))
+        assert reachability_profile(VEHICLE) is not None
+
+        # the network has changed, the profiles are not used until they are recomputed
+        with patch("bereikbaarheid.routing.reachability.current_network_versie", MagicMock(return_value=2)):
+            assert reachability_profile(VEHICLE) is None
+
+            precompute_reachability(all_profiles(NETWORK.edges))
+            assert reachability_profile(VEHICLE) is not None
+
+    @pytest.mark.django_db
+    def test_refresh_reachability(self, settings):
+        settings.ROUTING_ENGINE = "precomputed"
+        precompute_reachability(all_profiles(NETWORK.edges))
+        key = reachability_profile(VEHICLE)
+        BereikbareKnopen.objects.filter(profiel=key).update(knopen=[])
+
+        refresh_reachability()
+        assert sorted(BereikbareKnopen.objects.get(profiel=key).knopen) == [2, 3, 4]
+
+        settings.ROUTING_ENGINE = "pgrouting"
+        refresh_reachability()
+        assert not BereikbareKnopen.objects.exists()
@@ -0,0 +1,105 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from bereikbaarheid.routing.snapping import SegmentIndex, Snapper, get_snapper, reset_snapper
+
+# a horizontal, a vertical and a diagonal segment, and a point
+SEGMENTS = {
+    "values": np.array([1, 2, 3, 4]),
+    "x1": np.array([0.0, 500.0, 1000.0, 250.0]),
+    "y1": np.array([0.0, 0.0, 1000.0, 750.0]),
+    "x2": np.array([400.0, 500.0, 1400.0, 250.0]),
+    "y2": np.array([0.0, 400.0, 1400.0, 750.0]),
+}
+
+
+@pytest.fixture
+def index():
+    return SegmentIndex(cell_size=100, **SEGMENTS)
+
+
+class TestSegmentIndex:
+    @pytest.mark.parametrize(
+        "x, y, expected",
+        [
+            (200, 10, 1),
+            (520, 200, 2),
+            (1300, 1250, 3),
+            (260, 760, 4),
+            # far outside the grid
+            (-5000, -5000, 1),
+            (9000, 9000, 3),
+        ],
+    )
+    def test_nearest(self, index, x, y, expected):
+        assert index.nearest(x, y) == expected
+
+    def test_long_segments_are_registered_in_every_cell(self, index):
+        # the horizontal segment is found from the cell above its middle
+        assert index.nearest(200, 60) == 1
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(1)
+        x1, y1 = rng.uniform(0, 5000, 500), rng.uniform(0, 5000, 500)
+        x2, y2 = x1 + rng.uniform(-300, 300, 500), y1 + rng.uniform(-300, 300, 500)
+        index = SegmentIndex(np.arange(500), x1, y1, x2, y2, 100)
+
+        for x, y in rng.uniform(-1000, 6000, (200, 2)):
+            distances = index.distances(np.arange(500), x, y)
+            assert distances[index.nearest(x, y)] == pytest.approx(distances.min())
+
+    def test_empty(self):
+        index = SegmentIndex(np.array([]), [], [], [], [], 100)
+        assert index.nearest(1, 1) is None
+
+
+class TestSnapper:
+    nodes = [(1, 4.90, 52.37), (2, 4.91, 52.36)]
+    # Amsterdam Centraal and the Dam, in RD
+    segments = [
+        (10, 2, True, False, 121700.0, 488000.0, 121900.0, 488000.0),
+        (-10, 1, False, True, 121900.0, 488000.0, 121700.0, 488000.0),
+        (11, 3, False, True, 121300.0, 487300.0, 121400.0, 487300.0),
+    ]
+
+    def test_nearest_node(self):
+        snapper = Snapper(self.nodes, self.segments)
+        assert snapper.nearest_node(52.369, 4.901) == 1
+        assert snapper.nearest_node(52.361, 4.909) == 2
+
+    def test_nearest_link_only_uses_the_permit_network(self):
+        snapper = Snapper(self.nodes, self.segments)
+        # near the Dam, where only the bollard network has a road
+        assert snapper.nearest_link(52.3731, 4.8926) == 10
+
+    def test_nearest_bollard_target(self):
+        snapper = Snapper(self.nodes, self.segments)
+        assert snapper.nearest_bollard_target(52.3731, 4.8926) == 3
+        assert snapper.nearest_bollard_target(52.3789, 4.9003) == 1
+
+    def test_empty_network(self):
+        snapper = Snapper([], [])
+        assert snapper.nearest_node(52.37, 4.90) is None
+        assert snapper.nearest_link(52.37, 4.90) is None
+
+
+@patch("bereikbaarheid.routing.snapping.django_query_db", MagicMock(return_value=[]))
+@patch("bereikbaarheid.routing.snapping.current_network_versie", MagicMock(return_value=1))
+def test_get_snapper_is_built_once():
+    reset_snapper()
+    assert get_snapper() is get_snapper()
+    reset_snapper()
+
+
+@patch("bereikbaarheid.routing.snapping.django_query_db", MagicMock(return_value=[]))
+def test_get_snapper_is_rebuilt_for_a_new_network_version():
+    reset_snapper()
+    with patch("bereikbaarheid.routing.snapping.current_network_versie", MagicMock(return_value=1)) as versie:
+        snapper = get_snapper()
+
+        # refreshed in another process
+        versie.return_value = 2
+        assert get_snapper() is not snapper
+    reset_snapper()
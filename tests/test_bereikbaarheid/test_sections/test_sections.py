@@ -1,24 +1,25 @@
+import json
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from bereikbaarheid.sections.sections import _transform_results, get_sections, raw_query
+from bereikbaarheid.sections.sections import _transform_results, get_sections, get_sections_tile, raw_query
 from bereikbaarheid.utils import django_query_db
 
-QUERY_RESULT = [
-    (
-        {
-            "type": "MultiLineString",
-            "coordinates": [
-                [
-                    [4.824582988284092, 52.39014691501629],
-                    [4.824627745093572, 52.3901471276253],
-                ]
-            ],
-        },
-        10537,
-        "Rhôneweg",
-        [
+FEATURE = {
+    "geometry": {
+        "type": "MultiLineString",
+        "coordinates": [
+            [
+                [4.824582988284092, 52.39014691501629],
+                [4.824627745093572, 52.3901471276253],
+            ]
+        ],
+    },
+    "properties": {
+        "id": 10537,
+        "street_name": "Rhôneweg",
+        "load_unload": [
             {
                 "road_section_id": 10537,
                 "direction": "oost",
@@ -28,8 +29,11 @@ QUERY_RESULT = [
                 "end_time": "06:00:00",
             }
         ],
-    )
-]
+    },
+    "type": "Feature",
+}
+
+QUERY_RESULT = [(json.dumps(FEATURE),)]
 
 
 class TestSections:
@@ -46,26 +50,11 @@ class TestSections:
 
     @pytest.mark.parametrize(
         "query_results, expected_result",
-        [
-            (
-                QUERY_RESULT,
-                [
-                    {
-                        "type": "Feature",
-                        "geometry": QUERY_RESULT[0][0],
-                        "properties": {
-                            "id": QUERY_RESULT[0][1],
-                            "street_name": QUERY_RESULT[0][2],
-                            "load_unload": QUERY_RESULT[0][3],
-                        },
-                    }
-                ],
-            )
-        ],
+        [(QUERY_RESULT, [FEATURE]), ([], [])],
     )
     def test__transform_results(self, query_results, expected_result):
         result = _transform_results(query_results)
-        assert result == expected_result
+        assert [json.loads(feature) for feature in result] == expected_result
 
     @patch(
         "bereikbaarheid.sections.sections.django_query_db",
@@ -81,3 +70,18 @@ class TestSections:
 
         result = get_sections()
         assert len(result) == 1
+
+    def test_get_sections_tile(self):
+        with patch(
+            "bereikbaarheid.sections.sections.django_query_db",
+            MagicMock(return_value=(memoryview(b"tile"),)),
+        ) as mock_query_db:
+            result = get_sections_tile(14, 8414, 5384)
+
+        assert result == b"tile"
+        assert mock_query_db.call_args.args[1] == {"z": 14, "x": 8414, "y": 5384}
+
+    @pytest.mark.parametrize("query_result", [(None,), None])
+    def test_get_sections_tile_empty(self, query_result):
+        with patch("bereikbaarheid.sections.sections.django_query_db", MagicMock(return_value=query_result)):
+            assert get_sections_tile(14, 8414, 5384) == b""
@@ -1,6 +1,8 @@
+from unittest.mock import MagicMock, patch
+
 import pytest
 
-from bereikbaarheid.utils import convert_to_bool, django_query_db
+from bereikbaarheid.utils import convert_to_bool, django_query_db, django_query_db_iter
 
 
 class TestUtils:
@@ -10,6 +12,46 @@ class TestUtils:
         result = django_query_db(query, {})
         assert result == [(1,)]
 
+    @pytest.mark.django_db
+    def test_django_query_db_iter(self, settings):
+        settings.STREAMING_BATCH_SIZE = 2
+        query = "select generate_series(1, 5)"
+        result = django_query_db_iter(query, {})
+        assert list(result) == [(1,), (2,), (3,), (4,), (5,)]
+
+    @pytest.mark.django_db
+    def test_django_query_db_iter_closed_early(self, settings):
+        settings.STREAMING_BATCH_SIZE = 2
+        result = django_query_db_iter("select generate_series(1, 5)", {})
+        assert next(result) == (1,)
+        result.close()
+        assert django_query_db("select 1", {}) == [(1,)]
+
+    @pytest.mark.parametrize("consume", [list, lambda rows: rows.close()])
+    def test_django_query_db_iter_transaction(self, settings, consume):
+        """the server-side cursor is not WITH HOLD: it lives in a transaction until the rows are consumed"""
+        settings.STREAMING_BATCH_SIZE = 2
+        events = []
+        cursor = MagicMock()
+        cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)], []]
+        cursor.close.side_effect = lambda: events.append("close")
+
+        with (
+            patch("bereikbaarheid.utils.transaction") as transaction,
+            patch("bereikbaarheid.utils.connection") as connection,
+        ):
+            atomic = transaction.atomic.return_value
+            atomic.__enter__.side_effect = lambda: events.append("begin")
+            atomic.__exit__.side_effect = lambda *exc_info: events.append(("end", exc_info[0]))
+            connection.chunked_cursor.side_effect = lambda: events.append("cursor") or cursor
+
+            rows = django_query_db_iter("select", {})
+            assert events == ["begin", "cursor"]
+            consume(rows)
+
+        expected = None if consume is list else GeneratorExit
+        assert events == ["begin", "cursor", "close", ("end", expected)]
+
     @pytest.mark.parametrize(
         "value, expected_value",
         [("true", True), ("false", False), (1, True), (0, False), ("gibberish", False)],
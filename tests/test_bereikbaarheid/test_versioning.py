@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.http import HttpResponse
+from django.test.client import RequestFactory
+
+from bereikbaarheid.versioning import (
+    bump_network_version,
+    current_network_version,
+    network_condition,
+    network_etag,
+)
+
+
+@network_condition
+def fake_view(request):
+    fake_view.calls += 1
+    return HttpResponse()
+
+
+fake_view.calls = 0
+
+
+class TestVersioning:
+    @pytest.mark.django_db
+    def test_bump_network_version(self, settings, django_capture_on_commit_callbacks):
+        settings.NETWORK_VERSION_TTL = 60
+        with django_capture_on_commit_callbacks(execute=True):
+            first = bump_network_version()
+            second = bump_network_version()
+
+        assert second.versie > first.versie
+        assert current_network_version() == second
+        assert second.aantal_rijen["bereikbaarheid_vma"] == 0
+
+    @pytest.mark.django_db
+    def test_bump_network_version_on_commit(self, settings, django_capture_on_commit_callbacks):
+        settings.NETWORK_VERSION_TTL = 60
+        with django_capture_on_commit_callbacks(execute=True):
+            first = bump_network_version()
+        assert current_network_version() == first
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            second = bump_network_version()
+            # the import is not committed yet, this worker keeps the old version
+            assert current_network_version() == first
+
+        callbacks[0]()
+        assert current_network_version() == second
+
+    @pytest.mark.django_db
+    def test_network_etag(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            version = bump_network_version()
+        assert network_etag(None) == f"network-{version.versie}"
+
+    @patch(
+        "bereikbaarheid.versioning.current_network_version",
+        MagicMock(return_value=MagicMock(versie=3, created_at=None)),
+    )
+    def test_if_none_match(self):
+        calls = fake_view.calls
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH='"network-3"')
+        response = fake_view(request)
+
+        assert response.status_code == 304
+        assert fake_view.calls == calls
+
+    @patch("bereikbaarheid.versioning.current_network_version", MagicMock(return_value=None))
+    def test_no_network_version(self):
+        calls = fake_view.calls
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH='"network-3"')
+        fake_view(request)
+
+        assert fake_view.calls == calls + 1
+
+    @patch(
+        "bereikbaarheid.versioning.current_network_version",
+        MagicMock(return_value=MagicMock(versie=4, created_at=None)),
+    )
+    def test_etag_header(self):
+        response = fake_view(RequestFactory().get("/", HTTP_IF_NONE_MATCH='"network-3"'))
+
+        assert response.status_code == 200
+        assert response["ETag"] == '"network-4"'
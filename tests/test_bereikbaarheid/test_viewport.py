@@ -0,0 +1,69 @@
+import pytest
+from marshmallow import ValidationError
+
+from bereikbaarheid.viewport import (
+    SIMPLIFY_ZOOM,
+    ViewportSerializer,
+    bbox_filter,
+    bbox_parameters,
+    geometry_column,
+    tile_bbox,
+    valid_tile,
+)
+
+
+class TestViewport:
+    @pytest.mark.parametrize(
+        "bbox",
+        ["4.85,52.35,4.95,52.4", [4.85, 52.35, 4.95, 52.4], ["4.85", "52.35", "4.95", "52.4"]],
+    )
+    def test_bbox(self, bbox):
+        assert ViewportSerializer().load({"bbox": bbox})["bbox"] == (4.85, 52.35, 4.95, 52.4)
+
+    @pytest.mark.parametrize(
+        "bbox",
+        ["4.85,52.35,4.95", "a,b,c,d", [4.95, 52.35, 4.85, 52.4], [4.85, 52.35, 4.95, 95], 4.85],
+    )
+    def test_invalid_bbox(self, bbox):
+        with pytest.raises(ValidationError) as error:
+            ViewportSerializer().load({"bbox": bbox})
+        assert "bbox" in error.value.messages
+
+    def test_defaults(self):
+        assert ViewportSerializer().load({}) == {"bbox": None, "zoom": None}
+
+    def test_bbox_filter(self):
+        data = {"bbox": (4.85, 52.35, 4.95, 52.4)}
+
+        assert bbox_filter({"bbox": None}, "geom") == ""
+        assert "m.geometry && st_transform(" in bbox_filter(data, "m.geometry", srid=28992)
+        assert "28992" in bbox_filter(data, "m.geometry", srid=28992)
+        assert bbox_parameters(data) == {
+            "bbox_xmin": 4.85,
+            "bbox_ymin": 52.35,
+            "bbox_xmax": 4.95,
+            "bbox_ymax": 52.4,
+        }
+        assert bbox_parameters({}) == {}
+
+    @pytest.mark.parametrize(
+        "zoom, expected",
+        [(None, "geom4326"), (SIMPLIFY_ZOOM - 1, "geom4326simply"), (SIMPLIFY_ZOOM, "geom4326")],
+    )
+    def test_geometry_column(self, zoom, expected):
+        assert geometry_column({"zoom": zoom}) == expected
+
+    def test_tile_bbox(self):
+        assert tile_bbox(0, 0, 0) == pytest.approx((-180, -85.0511, 180, 85.0511), abs=1e-4)
+
+        # the tile of the Dam in Amsterdam
+        xmin, ymin, xmax, ymax = tile_bbox(14, 8414, 5384)
+        assert xmin < 4.8927 < xmax
+        assert ymin < 52.3731 < ymax
+
+    @pytest.mark.parametrize(
+        "z, x, y, expected",
+        [(0, 0, 0, True), (14, 8414, 5384, True), (1, 2, 0, False), (1, 0, -1, False), (23, 0, 0, False)],
+    )
+    def test_valid_tile(self, z, x, y, expected):
+        assert valid_tile(z, x, y) is expected
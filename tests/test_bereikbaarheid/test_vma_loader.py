@@ -0,0 +1,103 @@
+import os
+from unittest.mock import patch
+
+import pytest
+from import_export.results import RowResult
+
+from bereikbaarheid.models import Vma
+from bereikbaarheid.resources.geojson_stream import iter_features
+from bereikbaarheid.resources.vma_loader import (
+    _copy_lines,
+    _copy_value,
+    _LinesFile,
+    load_vma,
+)
+
+VMA_FILE = os.path.join(os.path.dirname(__file__), "..", "import_files", "vma_ssmall_testset.geojson")
+
+
+@pytest.fixture
+def features():
+    with open(VMA_FILE, "rb") as import_file:
+        return list(iter_features(import_file))
+
+
+class TestVmaLoader:
+    @pytest.mark.parametrize(
+        "value, expected",
+        [(None, r"\N"), ("", r"\N"), (1.5, "1.5"), ("a\tb\\c\n", "a\\tb\\\\c\\n")],
+    )
+    def test_copy_value(self, value, expected):
+        assert _copy_value(value) == expected
+
+    def test_copy_lines(self, features):
+        progress = []
+        lines = list(_copy_lines(features[:2], progress.append))
+
+        assert progress == [2]
+        values = lines[0].rstrip("\n").split("\t")
+        assert values[:4] == ["1", "7252", r"\N", "3"]
+        assert values[-1].startswith('{"type": "MultiLineString"')
+
+    def test_lines_file(self):
+        lines_file = _LinesFile(iter(["abc\n", "de\n", "f\n"]))
+
+        assert lines_file.read(5) == "abc\nd"
+        assert lines_file.read() == "e\nf\n"
+        assert lines_file.read(5) == ""
+
+    @pytest.mark.django_db
+    def test_load_vma(self, features):
+        with patch("bereikbaarheid.resources.vma_loader.refresh_network") as refresh_network:
+            result = load_vma(features)
+
+        assert not result.has_errors()
+        assert result.total_rows == len(features)
+        assert result.totals[RowResult.IMPORT_TYPE_NEW] == len(features)
+        assert Vma.objects.count() == len(features)
+        assert Vma.objects.get(link_nr=7252).speedab == 20.0
+        assert len(refresh_network.call_args.kwargs["link_nrs"]) == len(features)
+
+    @pytest.mark.django_db
+    def test_load_vma_diff(self, features):
+        with patch("bereikbaarheid.resources.vma_loader.refresh_network") as refresh_network:
+            load_vma(features)
+            refresh_network.reset_mock()
+
+            # unchanged
+            result = load_vma(features)
+            assert result.totals[RowResult.IMPORT_TYPE_SKIP] == len(features)
+            refresh_network.assert_not_called()
+
+            features[0]["properties"]["SPEEDAB"] = 30.0
+            result = load_vma(features[:-1])
+
+        assert result.totals[RowResult.IMPORT_TYPE_UPDATE] == 1
+        assert result.totals[RowResult.IMPORT_TYPE_DELETE] == 1
+        assert result.totals[RowResult.IMPORT_TYPE_NEW] == 0
+        assert refresh_network.call_args.kwargs["link_nrs"] == {
+            features[0]["properties"]["LINKNR"],
+            features[-1]["properties"]["LINKNR"],
+        }
+        assert Vma.objects.get(link_nr=7252).speedab == 30.0
+
+    @pytest.mark.django_db
+    def test_load_vma_dry_run(self, features):
+        result = load_vma(features, dry_run=True)
+
+        assert not result.has_errors()
+        assert result.total_rows == len(features)
+        assert Vma.objects.count() == 0
+
+    @pytest.mark.django_db
+    def test_load_vma_errors(self, features):
+        del features[1]["properties"]["LINKNR"]
+        features[2]["properties"]["LINKNR"] = 7252
+
+        result = load_vma(features)
+
+        assert [str(error.error.message) for error in result.base_errors] == [
+            "feature 1: link_nr 7252 is not unique",
+            "feature 2: link_nr is missing",
+        ]
+        assert Vma.objects.count() == 0
@@ -1,9 +1,19 @@
 import json
+from unittest.mock import MagicMock, patch
 
 from django.test.client import RequestFactory
 from marshmallow import Schema, fields
 
-from bereikbaarheid.wrapper import extract_parameters, geo_json_response, validate_data
+from bereikbaarheid.cache import ResponseCache
+from bereikbaarheid.wrapper import (
+    cached_geo_json_response,
+    cached_tile_response,
+    extract_parameters,
+    geo_json_response,
+    validate_data,
+)
+
+CACHE = ResponseCache(maxsize=2, ttl=60)
 
 
 class MockValidation(Schema):
@@ -24,6 +34,17 @@ class TestWrappers:
     def fake_view_geo(self, request, data):
         return data
 
+    @geo_json_response
+    def fake_view_stream(self, request, data):
+        return iter(data)
+
+    calls = 0
+
+    @cached_geo_json_response(CACHE)
+    def fake_view_cached(self, request, data):
+        TestWrappers.calls += 1
+        return data
+
     def test_validate_data(self):
         request = RequestFactory().post("/", data={"message": "test", "code": 111}, content_type="application/json")
         response = self.fake_view_post(request)
@@ -79,3 +100,67 @@ class TestWrappers:
             "features": data,
             "type": "FeatureCollection",
         }
+
+    @patch("bereikbaarheid.cache.current_network_version", MagicMock(return_value=None))
+    def test_cached_geo_json_response(self):
+        data = {"some": "fake_data"}
+        calls = TestWrappers.calls
+        for _ in range(2):
+            result = self.fake_view_cached(request="fake", data=data)
+            assert result.status_code == 200
+            assert result["Content-Type"] == "application/json"
+            assert json.loads(result.content) == {
+                "features": data,
+                "type": "FeatureCollection",
+            }
+
+        assert TestWrappers.calls == calls + 1
+
+    def test_geo_json_response_streaming(self):
+        data = [{"type": "Feature", "geometry": None}]
+        result = self.fake_view_stream(request="fake", data=data)
+        assert result.streaming
+        assert json.loads(b"".join(result.streaming_content)) == {
+            "features": data,
+            "type": "FeatureCollection",
+        }
+
+    @patch("bereikbaarheid.cache.current_network_version", MagicMock(return_value=None))
+    def test_cached_geo_json_response_streaming(self):
+        cache = ResponseCache(maxsize=2, ttl=60)
+
+        @cached_geo_json_response(cache)
+        def fake_view(view, request, data):
+            return iter([data])
+
+        data = {"type": "Feature", "geometry": None}
+        result = fake_view(None, "fake", data)
+        content = b"".join(result.streaming_content)
+
+        # the streamed response is cached once it is complete
+        assert cache.get(cache.make_key(data)) == content
+        assert not fake_view(None, "fake", data).streaming
+
+    @patch("bereikbaarheid.cache.current_network_version", MagicMock(return_value=None))
+    def test_cached_tile_response(self):
+        cache = ResponseCache(maxsize=2, ttl=60)
+        tiles = []
+
+        @cached_tile_response(cache)
+        def fake_view(view, request, data, z, x, y):
+            tiles.append((z, x, y))
+            return b"tile"
+
+        request = RequestFactory().get("/api/v1/roads/prohibitory/tiles/14/8414/5384.pbf")
+        for _ in range(2):
+            result = fake_view(None, request, {"lengte": 6.2}, 14, 8414, 5384)
+            assert result.status_code == 200
+            assert result["Content-Type"] == "application/vnd.mapbox-vector-tile"
+            assert result.content == b"tile"
+        assert tiles == [(14, 8414, 5384)]
+
+        # another vehicle is another tile
+        fake_view(None, request, {"lengte": 12}, 14, 8414, 5384)
+        assert len(tiles) == 2
+
+        assert fake_view(None, request, {}, 14, 2**14, 5384).status_code == 404
@@ -74,7 +74,7 @@ class TestTrafficSign:
                             "traffic_decree_id": 555,
                             "view_direction_in_degrees": "oost",
                         },
-                        "geometry": {"geom": [4.12, 52.9]},
+                        "geometry": '{"geom":[4.12, 52.9]}',
                     }
                 ],
             )
@@ -108,3 +108,15 @@ class TestTrafficSign:
         }
         result = get_traffic_signs(serialized_data)
         assert len(result) == 1
+
+    def test_get_traffic_signs_bbox(self):
+        with patch(
+            "bereikbaarheid.traffic_signs.traffic_signs.django_query_db",
+            MagicMock(return_value=QUERY_RESULT),
+        ) as mock_query_db:
+            get_traffic_signs({"verkeersborden_categorieen": ["prohibition"], "bbox": (4.85, 52.35, 4.95, 52.4)})
+
+        query, parameters = mock_query_db.call_args.args
+        assert query.startswith(raw_query)
+        assert "m.geometry && st_transform(" in query
+        assert parameters["bbox_ymax"] == 52.4